@@ -1,9 +1,14 @@
 import logging
 import sqlite3
 import os
-import uuid
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, stream_with_context
 from flask_cors import CORS
+from response_cache import invalidate_source
+from checkout_pipeline import CartError, GroupCommitWriter, parse_cart, checkout as checkout_order
+from db_pool import get_pool
+from menu_catalog import MenuCatalog
+from event_feed import broker, format_event, TooManySubscribers
+from sales_projection import SalesProjector, daily_sales
 
 app = Flask(__name__)
 CORS(app)
@@ -12,42 +17,75 @@ CORS(app)
 logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(message)s')
 logger = logging.getLogger("Ironclad_POS")
 
-DB_NAME = "pos_system.db"
+# POS_DB points the app at another database (e.g. a benchmark copy)
+DB_NAME = os.environ.get("POS_DB", "pos_system.db")
+
+# Shared pool: one writer connection + reusable read-only connections,
+# WAL mode and foreign_keys enforced (see db_pool.PRAGMAS)
+pool = get_pool(DB_NAME)
 
 def get_db():
+    """Standalone connection (scripts/one-offs); request handlers use `pool`."""
     conn = sqlite3.connect(DB_NAME)
     conn.row_factory = sqlite3.Row
     # Enforce foreign key constraints
     conn.execute("PRAGMA foreign_keys = ON")
     return conn
 
+# Menu/stock snapshots, invalidated by the catalog_meta version triggers
+catalog = MenuCatalog(pool)
+
+# Set POS_GROUP_COMMIT=1 to batch concurrent checkouts into one writer transaction
+GROUP_COMMIT = os.environ.get("POS_GROUP_COMMIT", "0") == "1"
+group_writer = GroupCommitWriter(pool.writer) if GROUP_COMMIT else None
+
+# Captured order lines -> transactions + sales_daily (see sales_projection.py).
+# POS_SALES_PROJECTION=0 leaves the outbox to `python sales_projection.py`.
+SALES_PROJECTION = os.environ.get("POS_SALES_PROJECTION", "1") == "1"
+projector = SalesProjector(pool)
+
+@app.before_request
+def start_projector():
+    # started on the first request, not at import: installing capture takes the write lock
+    if not SALES_PROJECTION:
+        return
+    try:
+        projector.start()
+    except Exception as e:
+        # capture isn't installed yet; the next request tries again
+        logger.error(f"Sales projector start failed: {e}")
+
 # ==========================================
 # 1. READ MENU (With Stock Levels)
 # ==========================================
 @app.route('/api/menu', methods=['GET'])
 def get_menu():
-    conn = get_db()
     try:
-        cursor = conn.cursor()
-        # We send price back as Rupees (float) for display, but keep logic internal as integers
-        cursor.execute("SELECT id, name, price_in_paise, category, stock FROM menu_items WHERE is_available = 1")
-        rows = cursor.fetchall()
-        
-        menu_list = []
-        for row in rows:
-            menu_list.append({
-                "id": row['id'],
-                "name": row['name'],
-                "price": row['price_in_paise'] / 100.0, # Convert back to Float for UI
-                "category": row['category'],
-                "stock": row['stock'] # UI needs to know if sold out
-            })
-        return jsonify(menu_list)
+        # Served from the in-process catalog: pre-serialized bytes, rebuilt only
+        # when the menu or stock version in catalog_meta moves.
+        # Price is sent as Rupees (float) for display; logic stays in paise.
+        return app.response_class(catalog.menu_body(), mimetype="application/json")
     except Exception as e:
         logger.error(f"Menu Fetch Error: {e}")
         return jsonify({"error": "System Error"}), 500
-    finally:
-        conn.close()
+
+@app.route('/api/menu/stock', methods=['GET'])
+def get_stock():
+    # Lightweight stock feed: {"version": n, "stock": {id: qty}}.
+    # Terminals pass ?since=<version> and get 304 while nothing was sold.
+    try:
+        stock = catalog.stock()
+    except Exception as e:
+        logger.error(f"Stock Fetch Error: {e}")
+        return jsonify({"error": "System Error"}), 500
+    if request.args.get('since') == str(stock.version):
+        return app.response_class(status=304)
+    return app.response_class(stock.body, mimetype="application/json")
+
+@app.route('/api/pool_stats', methods=['GET'])
+def pool_stats():
+    # connection pool hit/miss and wait-time counters
+    return jsonify(pool.metrics())
 
 # ==========================================
 # 2. IRONCLAD CHECKOUT (Atomic Transaction)
@@ -61,74 +99,101 @@ def checkout():
     if not cart:
         return jsonify({"error": "Cart is empty"}), 400
 
-    conn = get_db()
-    
     try:
-        # START TRANSACTION (Exclusive Lock)
-        # This prevents other writes while we are calculating
-        conn.execute("BEGIN IMMEDIATE") 
-        cursor = conn.cursor()
-
-        total_paise = 0
-        order_uuid = str(uuid.uuid4())
-        
-        # 1. CREATE ORDER HEADER FIRST (Pending)
-        cursor.execute("""
-            INSERT INTO orders (order_uuid, total_amount_in_paise, payment_mode, order_status)
-            VALUES (?, 0, ?, 'PENDING')
-        """, (order_uuid, payment_mode))
-        
-        order_db_id = cursor.lastrowid
-
-        # 2. PROCESS ITEMS & DEDUCT STOCK
-        for item in cart:
-            p_id = item['id']
-            qty = int(item['qty'])
-            
-            if qty <= 0: continue
-
-            # CHECK STOCK & PRICE ATOMICALLY
-            cursor.execute("SELECT name, price_in_paise, stock FROM menu_items WHERE id = ?", (p_id,))
-            product = cursor.fetchone()
-
-            if not product:
-                raise Exception(f"Item ID {p_id} invalid.")
-            
-            if product['stock'] < qty:
-                # ROLLBACK TRIGGER
-                raise Exception(f"Stock Error: Only {product['stock']} left for {product['name']}")
-
-            # DEDUCT STOCK
-            cursor.execute("UPDATE menu_items SET stock = stock - ? WHERE id = ?", (qty, p_id))
-
-            # CALCULATE
-            line_total = product['price_in_paise'] * qty
-            total_paise += line_total
-
-            # INSERT LINE ITEM
-            cursor.execute("""
-                INSERT INTO order_items (order_id, menu_item_id, item_name, quantity, price_at_sale_in_paise)
-                VALUES (?, ?, ?, ?, ?)
-            """, (order_db_id, p_id, product['name'], qty, product['price_in_paise']))
-
-        # 3. UPDATE ORDER TOTAL & FINALIZE
-        cursor.execute("UPDATE orders SET total_amount_in_paise = ?, order_status = 'COMPLETED' WHERE id = ?", (total_paise, order_db_id))
-
-        conn.commit() # ALL CHANGES SAVED HERE
-        logger.info(f"Order #{order_db_id} processed. Total: {total_paise/100}")
-        
-        return jsonify({
-            "success": True,
-            "orderId": order_db_id,
-            "total": total_paise / 100.0
-        }), 201
+        lines = parse_cart(cart)
+    except CartError as e:
+        return jsonify({"error": str(e)}), 400
 
+    try:
+        if group_writer is not None:
+            # concurrent checkouts share one writer transaction (one lock, one fsync)
+            result = group_writer.submit(lines, payment_mode)
+        else:
+            with pool.writer() as conn:
+                # BEGIN IMMEDIATE: exclusive write lock for the whole order,
+                # all-or-nothing; see checkout_pipeline.apply_checkout
+                result = checkout_order(conn, lines, payment_mode)
     except Exception as e:
-        conn.rollback() # UNDO EVERYTHING IF ERROR
+        # UNDO EVERYTHING IF ERROR (already rolled back by the pipeline)
         logger.error(f"Transaction Failed: {e}")
         return jsonify({"error": str(e)}), 409 # 409 = Conflict
-    finally:
-        conn.close()
+
+    invalidate_source(DB_NAME) # cached analytics for this DB are now stale
+    projector.notify()         # project the new order lines into the analytics tables
+    order_db_id = result["orderId"]
+    total_paise = result["total_paise"]
+    logger.info(f"Order #{order_db_id} processed. Total: {total_paise/100}")
+    publish_checkout(result)
+
+    return jsonify({
+        "success": True,
+        "orderId": order_db_id,
+        "total": total_paise / 100.0
+    }), 201
+
+@app.route('/api/sales/daily', methods=['GET'])
+def sales_daily():
+    # per-day POS totals from the pre-aggregated buckets: ?from=YYYY-MM-DD&to=YYYY-MM-DD
+    try:
+        with pool.reader() as conn:
+            try:
+                days = daily_sales(conn, request.args.get('from'), request.args.get('to'))
+            except sqlite3.OperationalError:
+                days = []   # projection schema not created yet
+        projection = projector.metrics()
+    except Exception as e:
+        logger.error(f"Daily Sales Error: {e}")
+        return jsonify({"error": "System Error"}), 500
+    return jsonify({"days": days, "projection": projection})
+
+# ==========================================
+# 3. LIVE FEED (Server-Sent Events)
+# ==========================================
+def publish_checkout(result):
+    # push the new stock levels + the completed order to connected terminals
+    if not broker.has_subscribers():
+        return
+    # the version read inside the checkout transaction: orders can publish out of order
+    broker.publish_stock(result["stock"], result["stock_version"])
+    broker.publish_order({
+        "orderId": result["orderId"],
+        "total": result["total_paise"] / 100.0,
+        "items": {str(k): v for k, v in result["items"].items()}
+    })
+
+def _stock_event(stock):
+    return format_event("stock", {"version": stock.version, "stock": {str(k): v for k, v in stock.stock.items()}})
+
+def _poll_stock(sub):
+    # on idle heartbeats, catch changes made outside this process (seed.py, admin edits)
+    try:
+        stock = catalog.stock()
+    except Exception:
+        return None
+    if sub.sent_stock_version is not None and stock.version > sub.sent_stock_version:
+        sub.sent_snapshot(stock.version)
+        return _stock_event(stock)
+    return None
+
+@app.route('/api/events', methods=['GET'])
+def events():
+    try:
+        sub = broker.subscribe()
+    except TooManySubscribers:
+        return jsonify({"error": "Too many live clients"}), 503
+    try:
+        stock = catalog.stock()
+    except Exception as e:
+        broker.unsubscribe(sub)
+        logger.error(f"Event Feed Error: {e}")
+        return jsonify({"error": "System Error"}), 500
+    sub.sent_snapshot(stock.version)
+    resp = app.response_class(
+        stream_with_context(broker.stream(sub, initial=_stock_event(stock), poll=_poll_stock)),
+        mimetype="text/event-stream")
+    resp.headers["Cache-Control"] = "no-cache"
+    resp.headers["X-Accel-Buffering"] = "no"   # don't let a proxy buffer the stream
+    return resp
 
 if __name__ == '__main__':
     # In production, use Gunicorn. For dev, this is fine.
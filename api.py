@@ -1,9 +1,14 @@
 # api.py
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request
 from flask_cors import CORS
 import logging
 import os
 from statistics_service import StatisticsService
+from surplus_engine import SurplusEngine
+from nearby_listings import DEFAULT_LIMIT, MAX_RADIUS_KM, ListingLocator
+from surplus_claims import DEFAULT_HOLD_SECONDS, SurplusClaims
+from stats_snapshot import default_snapshot_dir
+from response_cache import cached_json, csv_source
 
 logging.basicConfig(level=logging.INFO)
 app = Flask(__name__)
@@ -11,63 +16,118 @@ CORS(app)
 
 # resolve csv path relative to this file
 BASE_DIR = os.path.dirname(__file__)
-CSV_PATH = os.path.join(BASE_DIR, "canteen_data.csv")
+CSV_PATH = os.environ.get("CANTEEN_CSV") or os.path.join(BASE_DIR, "canteen_data.csv")
+# preprocessed binary copy of the CSV for fast restarts (rebuilt when the CSV is rewritten)
+SNAPSHOT_DIR = default_snapshot_dir(CSV_PATH)
+# STATS_COMPACT=1: categorical / float32 storage for large CSVs (same API output)
+COMPACT = os.environ.get("STATS_COMPACT", "0") == "1"
+# responses are cached until the CSV changes (or the TTL runs out)
+CSV_SOURCE = csv_source(CSV_PATH)
+MAX_BATCH_DATES = 366
+# threshold_configs / surplus_listings (see init_db.py)
+FOODIQ_DB = os.environ.get("FOODIQ_DB") or os.path.join(BASE_DIR, "foodiq.db")
+
+def _canteen_location():
+    # where NGOs collect this canteen's surplus: CANTEEN_LAT / CANTEEN_LNG in decimal degrees
+    lat, lng = os.environ.get("CANTEEN_LAT"), os.environ.get("CANTEEN_LNG")
+    if lat is None and lng is None:
+        return None
+    try:
+        return float(lat), float(lng)
+    except (TypeError, ValueError):
+        logging.error("CANTEEN_LAT / CANTEEN_LNG must both be numbers, got %r / %r", lat, lng)
+        return None
+
+# listings without a position never show up in /api/listings/nearby,
+# so /api/surplus/evaluate refuses to publish until the location is set
+CANTEEN_LOCATION = _canteen_location()
+surplus_engine = SurplusEngine(FOODIQ_DB, location=CANTEEN_LOCATION)
+listing_locator = ListingLocator(FOODIQ_DB)
+MAX_NEARBY_LIMIT = 200
+# NGO reservations on surplus_listings (see surplus_claims.py).
+# SURPLUS_CLAIM_SWEEPER=0 leaves expiry to `python surplus_claims.py --sweep`.
+surplus_claims = SurplusClaims(FOODIQ_DB, hold_seconds=int(os.environ.get("SURPLUS_HOLD_SECONDS", DEFAULT_HOLD_SECONDS)))
+if os.environ.get("SURPLUS_CLAIM_SWEEPER", "1") == "1":
+    try:
+        surplus_claims.start()
+    except Exception as e:
+        logging.exception("Failed to start reservation sweeper: %s", e)
 
 svc = None
 try:
-    svc = StatisticsService(csv_path=CSV_PATH)
-    logging.info("StatisticsService loaded. rows=%d", len(svc.df))
+    svc = StatisticsService(csv_path=CSV_PATH, snapshot_dir=SNAPSHOT_DIR, compact=COMPACT)
+    logging.info("StatisticsService loaded from %s. rows=%d", svc.loaded_from, len(svc.df))
 except Exception as e:
     logging.exception("Failed to initialize StatisticsService: %s", e)
 
+@app.before_request
+def pick_up_new_rows():
+    # cheap stat() when nothing changed; otherwise merges only the appended CSV tail
+    if svc is None:
+        return
+    try:
+        added = svc.refresh()
+        if added:
+            logging.info("StatisticsService refreshed. new_rows=%d rows=%d", added, len(svc.df))
+    except Exception as e:
+        logging.exception("StatisticsService refresh failed: %s", e)
+
+def _jsonify_bytes(data):
+    # the body jsonify(data) would send, so cached rollups match it byte for byte (ETags included)
+    return app.json.response(data).get_data()
+
 @app.route("/")
 def index():
     return jsonify({"message":"Canteen stats API. Try /api/overall, /api/daily, /api/dishes, /api/weekday"})
 
 @app.route("/api/overall")
+@cached_json(sources=[CSV_SOURCE])
 def overall():
     if svc is None:
         return jsonify({"error":"backend not initialized - check server logs"}), 500
     try:
-        return jsonify(svc.overall_summary())
+        return Response(svc.rollup_json("overall", encode=_jsonify_bytes), mimetype="application/json")
     except Exception as e:
         logging.exception("overall endpoint error: %s", e)
         return jsonify({"error":"internal error"}), 500
 
 @app.route("/api/daily")
+@cached_json(sources=[CSV_SOURCE])
 def daily():
     if svc is None:
         return jsonify({"error":"backend not initialized - check server logs"}), 500
     try:
-        return jsonify(svc.daily_stats())
+        return Response(svc.rollup_json("daily", encode=_jsonify_bytes), mimetype="application/json")
     except Exception as e:
         logging.exception("daily endpoint error: %s", e)
         return jsonify({"error":"internal error"}), 500
 
 @app.route("/api/dishes")
+@cached_json(sources=[CSV_SOURCE])
 def dishes():
     if svc is None:
         return jsonify({"error":"backend not initialized - check server logs"}), 500
     try:
         top = request.args.get("top", None)
-        if top:
-            return jsonify(svc.dish_wise_stats(top_n=int(top)))
-        return jsonify(svc.dish_wise_stats())
+        top_n = int(top) if top else None
+        return Response(svc.rollup_json("dishes", top_n=top_n, encode=_jsonify_bytes), mimetype="application/json")
     except Exception as e:
         logging.exception("dishes endpoint error: %s", e)
         return jsonify({"error":"internal error"}), 500
 
 @app.route("/api/weekday")
+@cached_json(sources=[CSV_SOURCE])
 def weekday():
     if svc is None:
         return jsonify({"error":"backend not initialized - check server logs"}), 500
     try:
-        return jsonify(svc.weekday_trends())
+        return Response(svc.rollup_json("weekday", encode=_jsonify_bytes), mimetype="application/json")
     except Exception as e:
         logging.exception("weekday endpoint error: %s", e)
         return jsonify({"error":"internal error"}), 500
 
 @app.route("/api/threshold")
+@cached_json(sources=[CSV_SOURCE])
 def threshold():
     if svc is None:
         return jsonify({"error":"backend not initialized - check server logs"}), 500
@@ -84,6 +144,143 @@ def threshold():
         logging.exception("threshold endpoint error: %s", e)
         return jsonify({"error":"internal error"}), 500
 
+@app.route("/api/threshold/range")
+@cached_json(sources=[CSV_SOURCE])
+def threshold_range():
+    if svc is None:
+        return jsonify({"error":"backend not initialized - check server logs"}), 500
+    start = request.args.get("from")
+    end = request.args.get("to")
+    try:
+        threshold = float(request.args.get("threshold", 0))
+    except Exception:
+        threshold = 0.0
+    if not start or not end:
+        return jsonify({"error":"provide from and to params YYYY-MM-DD"}), 400
+    try:
+        return jsonify(svc.surplus_exceeds_threshold_range(start, end, threshold))
+    except ValueError:
+        return jsonify({"error":"invalid date"}), 400
+    except Exception as e:
+        logging.exception("threshold range endpoint error: %s", e)
+        return jsonify({"error":"internal error"}), 500
+
+@app.route("/api/threshold/batch")
+@cached_json(sources=[CSV_SOURCE])
+def threshold_batch():
+    if svc is None:
+        return jsonify({"error":"backend not initialized - check server logs"}), 500
+    dates = [d.strip() for d in request.args.get("dates", "").split(",") if d.strip()]
+    try:
+        threshold = float(request.args.get("threshold", 0))
+    except Exception:
+        threshold = 0.0
+    if not dates:
+        return jsonify({"error":"provide dates param YYYY-MM-DD,YYYY-MM-DD,..."}), 400
+    if len(dates) > MAX_BATCH_DATES:
+        return jsonify({"error":f"at most {MAX_BATCH_DATES} dates per request"}), 400
+    try:
+        return jsonify(svc.surplus_exceeds_threshold_batch(dates, threshold))
+    except ValueError:
+        return jsonify({"error":"invalid date"}), 400
+    except Exception as e:
+        logging.exception("threshold batch endpoint error: %s", e)
+        return jsonify({"error":"internal error"}), 500
+
+@app.route("/api/surplus/evaluate", methods=["POST"])
+def evaluate_surplus():
+    # end-of-shift run: threshold_configs vs the day's surplus -> urgent surplus_listings
+    if svc is None:
+        return jsonify({"error":"backend not initialized - check server logs"}), 500
+    if svc.df.empty:
+        return jsonify({"error":"no data"}), 400
+    if CANTEEN_LOCATION is None:
+        return jsonify({"error":"canteen location not configured - set CANTEEN_LAT and CANTEEN_LNG"}), 500
+    start = request.args.get("date") or svc.df["date"].max()
+    try:
+        report = surplus_engine.evaluate_statistics(svc, start, request.args.get("to"))
+        return jsonify(report._asdict())
+    except ValueError:
+        return jsonify({"error":"invalid date"}), 400
+    except Exception as e:
+        logging.exception("surplus evaluate endpoint error: %s", e)
+        return jsonify({"error":"internal error"}), 500
+
+@app.route("/api/listings/nearby")
+def listings_nearby():
+    # NGO portal: AVAILABLE listings within radius_km of the NGO, urgent first, then nearest
+    try:
+        lat = float(request.args["lat"])
+        lng = float(request.args["lng"])
+        radius_km = float(request.args.get("radius_km", 10))
+        limit = int(request.args.get("limit", DEFAULT_LIMIT))
+    except (KeyError, ValueError):
+        return jsonify({"error":"provide numeric lat and lng params (radius_km, limit optional)"}), 400
+    if not 0 < radius_km <= MAX_RADIUS_KM or not 0 < limit <= MAX_NEARBY_LIMIT:
+        return jsonify({"error":f"radius_km must be in (0, {MAX_RADIUS_KM:g}] and limit in [1, {MAX_NEARBY_LIMIT}]"}), 400
+    try:
+        return jsonify(listing_locator.nearby(lat, lng, radius_km, limit))
+    except ValueError:
+        return jsonify({"error":"lat/lng out of range"}), 400
+    except Exception as e:
+        logging.exception("nearby listings endpoint error: %s", e)
+        return jsonify({"error":"internal error"}), 500
+
+def _claim_request():
+    body = request.get_json(silent=True) or {}
+    ngo_id = body.get("ngo_id")
+    listing_ids = body.get("listing_ids")
+    if not ngo_id or not isinstance(listing_ids, list):
+        raise ValueError("provide JSON {ngo_id, listing_ids: [...]}")
+    return str(ngo_id), listing_ids, bool(body.get("all_or_nothing"))
+
+@app.route("/api/listings/reserve", methods=["POST"])
+def reserve_listings():
+    # 200 with what this NGO won (possibly partial); 409 when it won nothing
+    try:
+        ngo_id, listing_ids, all_or_nothing = _claim_request()
+        result = surplus_claims.reserve(ngo_id, listing_ids, all_or_nothing)
+    except (TypeError, ValueError) as e:
+        return jsonify({"error":str(e)}), 400
+    except Exception as e:
+        logging.exception("reserve endpoint error: %s", e)
+        return jsonify({"error":"internal error"}), 500
+    return jsonify(result._asdict()), 200 if result.claimed else 409
+
+@app.route("/api/listings/confirm", methods=["POST"])
+def confirm_listings():
+    try:
+        ngo_id, listing_ids, _ = _claim_request()
+        result = surplus_claims.confirm(ngo_id, listing_ids)
+    except (TypeError, ValueError) as e:
+        return jsonify({"error":str(e)}), 400
+    except Exception as e:
+        logging.exception("confirm endpoint error: %s", e)
+        return jsonify({"error":"internal error"}), 500
+    return jsonify(result._asdict()), 200 if result.claimed else 409
+
+@app.route("/api/listings/release", methods=["POST"])
+def release_listings():
+    try:
+        ngo_id, listing_ids, _ = _claim_request()
+        result = surplus_claims.release(ngo_id, listing_ids)
+    except (TypeError, ValueError) as e:
+        return jsonify({"error":str(e)}), 400
+    except Exception as e:
+        logging.exception("release endpoint error: %s", e)
+        return jsonify({"error":"internal error"}), 500
+    return jsonify(result._asdict()), 200 if result.claimed else 409
+
+@app.route("/api/memory")
+def memory():
+    if svc is None:
+        return jsonify({"error":"backend not initialized - check server logs"}), 500
+    try:
+        return jsonify(svc.memory_report())
+    except Exception as e:
+        logging.exception("memory endpoint error: %s", e)
+        return jsonify({"error":"internal error"}), 500
+
 if __name__ == "__main__":
     logging.info("Starting Flask app. CSV_PATH=%s", CSV_PATH)
     app.run(debug=True, port=5000)
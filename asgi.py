@@ -0,0 +1,398 @@
+# asgi.py
+"""
+Production serving mode: one ASGI application in front of the three Flask apps.
+
+    uvicorn asgi:application --host 0.0.0.0 --port 5000
+
+Each Flask app runs in its own "lane": a bounded thread pool plus an admission
+queue. Blocking sqlite3/pandas work happens on the lane's threads, never on
+the event loop, and lanes don't share threads, so a slow /api/business_stats
+or pandas query can no longer stall checkouts.
+
+    lane      app                      serves
+    pos       Billing_app.py           /api/checkout, /api/menu, ...
+    events    Billing_app.py           /api/events (long-lived SSE streams)
+    stats     app.py                   /api/business_stats, /health, /
+    canteen   api.py                   /api/overall, /api/daily, /api/dishes, ...
+
+Per lane, at most `workers` requests run at once and at most `queue` more
+wait for a slot. A request that finds the queue full is shed immediately
+with 503 + Retry-After; one that waits longer than `queue_timeout` seconds
+also gets 503. Limits can be overridden with environment variables, e.g.
+ASGI_POS_WORKERS=16 ASGI_STATS_QUEUE=8 ASGI_CANTEEN_QUEUE_TIMEOUT=2.
+
+GET /asgi/metrics returns per-lane counters. Startup fails if two apps define
+the same route, unless SHADOWED says which one gives way.
+"""
+import asyncio
+import io
+import json
+import logging
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from werkzeug.exceptions import MethodNotAllowed, NotFound
+from werkzeug.routing import RequestRedirect
+
+logger = logging.getLogger("Ironclad_POS")
+
+# lane -> (workers, queue, queue_timeout seconds)
+LANE_DEFAULTS = {
+    "pos": (8, 64, 5.0),
+    "events": (200, 0, 0.0),
+    "stats": (4, 16, 10.0),
+    "canteen": (4, 16, 10.0),
+}
+MAX_BODY_BYTES = 1024 * 1024
+STREAM_BUFFER = 16      # response chunks queued between a worker thread and the client
+
+
+def _lane_config(name: str) -> Tuple[int, int, float]:
+    workers, queue, timeout = LANE_DEFAULTS[name]
+    prefix = f"ASGI_{name.upper()}_"
+    return (int(os.environ.get(prefix + "WORKERS", workers)),
+            int(os.environ.get(prefix + "QUEUE", queue)),
+            float(os.environ.get(prefix + "QUEUE_TIMEOUT", timeout)))
+
+
+# ---- ASGI <-> WSGI plumbing ----
+def _build_environ(scope: Dict[str, Any], body: bytes) -> Dict[str, Any]:
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode("utf8").decode("latin1"),
+        "PATH_INFO": scope["path"].encode("utf8").decode("latin1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin1"),
+        "SERVER_NAME": str(server[0]),
+        "SERVER_PORT": str(server[1]),
+        "REMOTE_ADDR": str(client[0]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+    }
+    for raw_name, raw_value in scope.get("headers", []):
+        name = raw_name.decode("latin1")
+        value = raw_value.decode("latin1")
+        if name == "content-type":
+            key = "CONTENT_TYPE"
+        elif name == "content-length":
+            key = "CONTENT_LENGTH"
+        else:
+            key = "HTTP_" + name.upper().replace("-", "_")
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+async def _read_body(receive) -> Optional[bytes]:
+    """Whole request body, or None if it exceeds MAX_BODY_BYTES."""
+    chunks: List[bytes] = []
+    size = 0
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            break
+        chunk = message.get("body", b"")
+        size += len(chunk)
+        if size > MAX_BODY_BYTES:
+            return None
+        chunks.append(chunk)
+        if not message.get("more_body", False):
+            break
+    return b"".join(chunks)
+
+
+async def _send_json(send, status: int, payload: Dict[str, Any], headers: Optional[List] = None) -> None:
+    body = json.dumps(payload).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode())] + (headers or []),
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class Lane:
+    """Bounded thread pool + admission queue in front of one WSGI app."""
+
+    def __init__(self, name: str, wsgi_app, workers: int, queue: int, queue_timeout: float):
+        self.name = name
+        self.wsgi_app = wsgi_app
+        self.workers = workers
+        self.queue = queue
+        self.queue_timeout = queue_timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"asgi-{name}")
+        self._slots = asyncio.Semaphore(workers)
+        self.active = 0
+        self.waiting = 0
+        self.served = 0
+        self.shed = 0
+        self.timed_out = 0
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {"workers": self.workers, "queue": self.queue, "queue_timeout": self.queue_timeout,
+                "active": self.active, "waiting": self.waiting, "served": self.served,
+                "shed": self.shed, "timed_out": self.timed_out}
+
+    async def __call__(self, scope, receive, send) -> None:
+        # admission: run now, wait in the bounded queue, or shed
+        if self._slots.locked():
+            if self.waiting >= self.queue:
+                self.shed += 1
+                await _send_json(send, 503, {"error": "Server busy, retry shortly"}, [(b"retry-after", b"1")])
+                return
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._slots.acquire(), timeout=self.queue_timeout or None)
+            except asyncio.TimeoutError:
+                self.timed_out += 1
+                await _send_json(send, 503, {"error": "Server busy, retry shortly"}, [(b"retry-after", b"1")])
+                return
+            finally:
+                self.waiting -= 1
+        else:
+            await self._slots.acquire()
+
+        self.active += 1
+        try:
+            body = await _read_body(receive)
+            if body is None:
+                await _send_json(send, 413, {"error": "Request body too large"})
+                return
+            await self._run(scope, body, receive, send)
+            self.served += 1
+        finally:
+            self.active -= 1
+            self._slots.release()
+
+    async def _run(self, scope, body: bytes, receive, send) -> None:
+        loop = asyncio.get_running_loop()
+        messages: asyncio.Queue = asyncio.Queue()
+        # body chunks in flight between the worker thread and the client (backpressure)
+        credits = threading.Semaphore(STREAM_BUFFER)
+        cancelled = threading.Event()
+        environ = _build_environ(scope, body)
+
+        def post(item) -> None:
+            loop.call_soon_threadsafe(messages.put_nowait, item)
+
+        def worker() -> None:
+            pending_start = []
+
+            def write(data: bytes) -> bool:
+                # headers go out with the first body chunk, so start_response can still be redone until then
+                if pending_start:
+                    post(("start",) + tuple(pending_start))
+                    pending_start.clear()
+                if not data:
+                    return True
+                while not credits.acquire(timeout=1.0):
+                    if cancelled.is_set():
+                        return False
+                post(("body", data))
+                return not cancelled.is_set()
+
+            def start_response(status, headers, exc_info=None):
+                pending_start[:] = [status, headers]
+                return write
+
+            result = None
+            try:
+                result = self.wsgi_app(environ, start_response)
+                for data in result:
+                    if data and not write(data):
+                        break
+                write(b"")
+            except Exception as e:
+                post(("error", e))
+            finally:
+                try:
+                    if hasattr(result, "close"):
+                        result.close()
+                finally:
+                    post(("end",))
+
+        async def watch_disconnect():
+            while True:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    cancelled.set()
+                    return
+
+        loop.run_in_executor(self._executor, worker)
+        watcher = asyncio.ensure_future(watch_disconnect())
+        response_started = False
+        try:
+            while True:
+                item = await messages.get()
+                kind = item[0]
+                if kind == "end":
+                    break
+                if cancelled.is_set():
+                    # client is gone: keep draining until the worker has cleaned up
+                    if kind == "body":
+                        credits.release()
+                    continue
+                try:
+                    if kind == "start":
+                        status, headers = item[1], item[2]
+                        await send({
+                            "type": "http.response.start",
+                            "status": int(status.split(" ", 1)[0]),
+                            "headers": [(k.lower().encode("latin1"), v.encode("latin1")) for k, v in headers],
+                        })
+                        response_started = True
+                    elif kind == "body":
+                        await send({"type": "http.response.body", "body": item[1], "more_body": True})
+                        credits.release()
+                    elif kind == "error":
+                        logger.exception("[asgi:%s] unhandled error", self.name, exc_info=item[1])
+                        if not response_started:
+                            await _send_json(send, 500, {"error": "internal error"})
+                            response_started = None     # already complete
+                except OSError:
+                    cancelled.set()
+            if response_started:
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            cancelled.set()
+            watcher.cancel()
+
+
+class Router:
+    """Dispatches each request to the first lane whose app has a matching route."""
+
+    def __init__(self, lanes: Dict[str, Lane], routes: List[Tuple[str, Callable[[str, str], bool]]], default: str):
+        self.lanes = lanes
+        self._routes = routes       # [(lane name, matcher(path, method))] in priority order
+        self._default = default
+        self._cache: Dict[Tuple[str, str], str] = {}
+
+    def _lane_for(self, path: str, method: str) -> Lane:
+        key = (path, method)
+        name = self._cache.get(key)
+        if name is None:
+            name = next((lane for lane, matches in self._routes if matches(path, method)), self._default)
+            if len(self._cache) < 4096:
+                self._cache[key] = name
+        return self.lanes[name]
+
+    def metrics(self) -> Dict[str, Any]:
+        return {name: lane.metrics() for name, lane in self.lanes.items()}
+
+    def shutdown(self) -> None:
+        for lane in self.lanes.values():
+            lane.shutdown()
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                if message["type"] == "lifespan.startup":
+                    await send({"type": "lifespan.startup.complete"})
+                elif message["type"] == "lifespan.shutdown":
+                    self.shutdown()
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+        if scope["type"] != "http":
+            return
+        if scope["path"] == "/asgi/metrics":
+            await _send_json(send, 200, self.metrics())
+            return
+        await self._lane_for(scope["path"], scope["method"])(scope, receive, send)
+
+
+def flask_routes(flask_app, only: Optional[Set[str]] = None, exclude: Set[str] = frozenset()) -> Callable[[str, str], bool]:
+    """
+    Matcher for the routes a Flask app defines (optionally just the rules in
+    `only`), minus the rules in `exclude`.
+    """
+    def matches(path: str, method: str) -> bool:
+        try:
+            rule, _ = flask_app.url_map.bind("localhost").match(path, method, return_rule=True)
+        except NotFound:
+            return False
+        except (MethodNotAllowed, RequestRedirect):
+            # the app owns the path; let it answer 405 / redirect itself
+            return only is None
+        return (only is None or rule.rule in only) and rule.rule not in exclude
+    return matches
+
+
+def route_collisions(apps: List[Tuple[str, Any, Set[str]]]) -> List[str]:
+    """
+    Routes that more than one of `apps` ([(lane, flask app, excluded rules)])
+    would answer. The Router sends such a request to the first matching lane,
+    so the other app's view could never be reached.
+    """
+    collisions = []
+    for i, (name, flask_app, exclude) in enumerate(apps):
+        for rule in flask_app.url_map.iter_rules():
+            if rule.rule in exclude:
+                continue
+            for other, other_app, other_exclude in apps[:i]:
+                other_rules = {r.rule for r in other_app.url_map.iter_rules()} - other_exclude
+                # a fixed path is checked against the other app's converters too
+                # (the method doesn't matter: the Router hands a path to the first app that has it)
+                claimed = rule.rule in other_rules or (
+                    not rule.arguments and flask_routes(other_app, exclude=other_exclude)(rule.rule, "GET"))
+                if claimed:
+                    collisions.append(f"{rule.rule} ({other} and {name})")
+    return collisions
+
+
+# rules an app defines but the Router deliberately leaves to an earlier lane
+SHADOWED = {
+    # none of the apps has a static/ folder; every Flask app still registers the rule
+    "stats": {"/static/<path:filename>"},
+    # app.py's dashboard owns "/"; api.py's only lists its endpoints
+    "canteen": {"/", "/static/<path:filename>"},
+}
+
+
+def build_application() -> Router:
+    import Billing_app
+    import app as business_app
+    import api as canteen_api
+
+    apps = [
+        ("pos", Billing_app.app, SHADOWED.get("pos", set())),
+        ("stats", business_app.app, SHADOWED.get("stats", set())),
+        ("canteen", canteen_api.app, SHADOWED.get("canteen", set())),
+    ]
+    collisions = route_collisions(apps)
+    if collisions:
+        raise RuntimeError("Routes served by more than one app (rename one or add it to asgi.SHADOWED): "
+                           + ", ".join(collisions))
+
+    lanes = {
+        "pos": Lane("pos", Billing_app.app.wsgi_app, *_lane_config("pos")),
+        "events": Lane("events", Billing_app.app.wsgi_app, *_lane_config("events")),
+        "stats": Lane("stats", business_app.app.wsgi_app, *_lane_config("stats")),
+        "canteen": Lane("canteen", canteen_api.app.wsgi_app, *_lane_config("canteen")),
+    }
+    routes = [
+        # long-lived SSE streams get their own lane so they never hold POS workers
+        ("events", flask_routes(Billing_app.app, only={"/api/events"})),
+    ] + [(name, flask_routes(flask_app, exclude=exclude)) for name, flask_app, exclude in apps]
+    return Router(lanes, routes, default="stats")
+
+
+application = build_application()
+
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(application, host="0.0.0.0", port=int(os.environ.get("PORT", 5000)))
@@ -0,0 +1,137 @@
+# bench_business_stats.py
+"""
+Benchmark: single-pass compute_business_stats vs the original five-pass version.
+
+    python bench_business_stats.py                      # 1M rows
+    python bench_business_stats.py --rows 1000000 10000000
+
+The 10M run needs several GB of RAM just to hold the synthetic dict rows.
+"""
+import argparse
+import random
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+from statistics import mean
+
+from business_stats import compute_business_stats
+
+
+# ---- reference: the original implementation, kept verbatim for comparison ----
+def legacy_compute_business_stats(transactions, expenses):
+    total_revenue = sum(t["price"] for t in transactions)
+    total_cost = sum(t["cost"] for t in transactions)
+    total_expenses = sum(e.get("expense", 0) for e in expenses)
+
+    net_profit = total_revenue - total_cost - total_expenses
+    profit_margin = (net_profit / total_revenue * 100) if total_revenue else 0.0
+    avg_order_value = mean([t["price"] for t in transactions]) if transactions else 0.0
+
+    monthly = defaultdict(float)
+    for t in transactions:
+        key = t["date"].strftime("%Y-%m")
+        monthly[key] += t["price"]
+    period_labels = sorted(monthly.keys())
+    period_values = [monthly[k] for k in period_labels]
+
+    revenue_by_category = defaultdict(float)
+    for t in transactions:
+        revenue_by_category[t["category"]] += t["price"]
+
+    product_map = defaultdict(lambda: {"rev": 0.0, "cost": 0.0})
+    for t in transactions:
+        product_map[t["item"]]["rev"] += t["price"]
+        product_map[t["item"]]["cost"] += t["cost"]
+
+    top_products = []
+    for name, d in product_map.items():
+        rev = d["rev"]
+        cost = d["cost"]
+        profit = rev - cost
+        margin = (profit / rev * 100) if rev else 0.0
+        top_products.append({"name": name, "revenue": rev, "profit": profit, "margin": margin})
+    top_products = sorted(top_products, key=lambda x: x["profit"], reverse=True)[:20]
+
+    customer_map = defaultdict(float)
+    for t in transactions:
+        customer_map[t["customer"]] += t["price"]
+    top_customers = [{"name": n, "spend": s} for n, s in customer_map.items()]
+    top_customers = sorted(top_customers, key=lambda x: x["spend"], reverse=True)[:12]
+
+    return {
+        "total_revenue": total_revenue,
+        "total_expenses": total_expenses,
+        "net_profit": net_profit,
+        "profit_margin": profit_margin,
+        "avg_order_value": avg_order_value,
+        "period_labels": period_labels,
+        "period_values": period_values,
+        "revenue_by_category": dict(revenue_by_category),
+        "top_products": top_products,
+        "top_customers": top_customers
+    }
+
+
+# ---- synthetic data ----
+def make_transactions(n, seed=42, items=300, customers=5000, days=730):
+    rnd = random.Random(seed)
+    start = date(2023, 1, 1)
+    dates = [start + timedelta(days=i) for i in range(days)]
+    item_names = [f"Item {i}" for i in range(items)]
+    categories = ["breakfast", "lunch", "dinner", "drinks", "snacks"]
+    customer_names = [f"Customer {i}" for i in range(customers)]
+    rows = []
+    for _ in range(n):
+        price = rnd.randint(10, 400) * 1.0
+        rows.append({
+            "date": rnd.choice(dates),
+            "item": rnd.choice(item_names),
+            "category": rnd.choice(categories),
+            "price": price,
+            "cost": price * rnd.uniform(0.2, 0.7),
+            "customer": rnd.choice(customer_names),
+        })
+    rows.sort(key=lambda r: r["date"])
+    return rows
+
+
+def _close(a, b, rel=1e-9):
+    if isinstance(a, dict):
+        return a.keys() == b.keys() and all(_close(a[k], b[k], rel) for k in a)
+    if isinstance(a, list):
+        return len(a) == len(b) and all(_close(x, y, rel) for x, y in zip(a, b))
+    if isinstance(a, float):
+        return abs(a - b) <= rel * max(1.0, abs(a), abs(b))
+    return a == b
+
+
+def _best_of(fn, repeat):
+    best = None
+    result = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    expenses = [{"date": date(2023, 1, 1), "expense": 5000.0}]
+    print(f"{'rows':>12} {'legacy s':>10} {'single s':>10} {'speedup':>8}  equal")
+    for n in args.rows:
+        transactions = make_transactions(n, seed=args.seed)
+        legacy_t, legacy = _best_of(lambda: legacy_compute_business_stats(transactions, expenses), args.repeat)
+        new_t, new = _best_of(lambda: compute_business_stats(transactions, expenses), args.repeat)
+        print(f"{n:>12,} {legacy_t:>10.3f} {new_t:>10.3f} {legacy_t / new_t:>7.2f}x  {_close(legacy, new)}")
+        del transactions
+
+
+if __name__ == "__main__":
+    main()
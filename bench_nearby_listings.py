@@ -0,0 +1,129 @@
+# bench_nearby_listings.py
+"""
+Benchmark: nearby_listings.nearby() (R*Tree on AVAILABLE listings) vs the
+full-table scan with per-row distance it replaces.
+
+    python bench_nearby_listings.py                             # 1M listings
+    python bench_nearby_listings.py --listings 100000 1000000 --radius 1 2 5
+
+Listings are clustered around canteens in a handful of Indian cities (normal
+spread of a few km per city), so query density matches a real deployment
+rather than a uniform grid. Each query point is a random NGO location near one
+of those cities. Every R*Tree result is checked against the scan for a sample
+of queries.
+"""
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from nearby_listings import GEO_TABLES, KM_PER_DEGREE, NEARBY_COLUMNS, ensure_geo_schema, nearby
+
+# (lat, lng, weight, spread in km)
+CITIES = [
+    (19.07, 72.88, 5, 12), (19.03, 73.03, 3, 8), (18.52, 73.86, 3, 10), (28.61, 77.21, 5, 15),
+    (12.97, 77.59, 4, 12), (13.08, 80.27, 3, 10), (17.39, 78.49, 3, 10), (22.57, 88.36, 3, 10),
+    (23.02, 72.57, 2, 8), (26.91, 75.79, 1, 6), (21.15, 79.09, 1, 6), (15.50, 73.83, 1, 4),
+]
+
+SCHEMA = """
+CREATE TABLE surplus_listings (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    item_name TEXT,
+    qty_kg REAL,
+    lat REAL,
+    lng REAL,
+    is_urgent BOOLEAN DEFAULT 0,
+    status TEXT DEFAULT 'AVAILABLE',
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+)
+"""
+SCAN_SQL = f"""
+    SELECT {", ".join("s." + c for c in NEARBY_COLUMNS[:-1])},
+           {2 * 6371.0088} * asin(min(1.0, sqrt(pow(sin(radians(s.lat - :lat) / 2), 2)
+               + cos(radians(:lat)) * cos(radians(s.lat)) * pow(sin(radians(s.lng - :lng) / 2), 2)))) AS distance_km
+    FROM surplus_listings s
+    WHERE s.status = 'AVAILABLE' AND distance_km <= :radius_km
+    ORDER BY s.is_urgent DESC, distance_km, s.id
+    LIMIT :limit
+"""
+
+
+# ---- synthetic data ----
+def _point(rnd):
+    lat, lng, _, spread = rnd.choices(CITIES, weights=[c[2] for c in CITIES])[0]
+    return (lat + rnd.gauss(0, spread) / KM_PER_DEGREE, lng + rnd.gauss(0, spread) / KM_PER_DEGREE)
+
+
+def build_db(path, n, available, seed=42):
+    rnd = random.Random(seed)
+    conn = sqlite3.connect(path, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(SCHEMA)
+    conn.execute("BEGIN")
+    conn.executemany("INSERT INTO surplus_listings (item_name, qty_kg, lat, lng, is_urgent, status) VALUES (?, ?, ?, ?, ?, ?)",
+                     ((f"Dish {rnd.randrange(60)}", round(rnd.uniform(1, 40), 1), *_point(rnd),
+                       int(rnd.random() < 0.2), "AVAILABLE" if rnd.random() < available else "COLLECTED")
+                      for _ in range(n)))
+    conn.commit()
+    t0 = time.perf_counter()
+    ensure_geo_schema(conn)
+    return conn, time.perf_counter() - t0
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--listings", type=int, nargs="+", default=[1_000_000])
+    parser.add_argument("--radius", type=float, nargs="+", default=[1.0, 2.0, 5.0])
+    parser.add_argument("--available", type=float, default=1.0,
+                        help="fraction of listings still AVAILABLE, i.e. in the index (default 1.0, the worst case)")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--scans", type=int, default=5, help="full-scan queries per radius (they are slow)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    print(f"{'listings':>10} {'indexed':>9} {'backfill s':>10} {'radius km':>9} {'hits':>6} "
+          f"{'p50 ms':>8} {'p99 ms':>8} {'scan ms':>9} {'speedup':>8}  equal")
+    for n in args.listings:
+        tmp = tempfile.mkdtemp(prefix="nearby_bench_")
+        try:
+            conn, backfill = build_db(os.path.join(tmp, "foodiq.db"), n, args.available, args.seed)
+            indexed = sum(conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] for table in GEO_TABLES.values())
+            rnd = random.Random(args.seed + 1)
+            points = [_point(rnd) for _ in range(args.queries)]
+            for radius in args.radius:
+                timings, hits = [], 0
+                for lat, lng in points:
+                    t0 = time.perf_counter()
+                    rows = nearby(conn, lat, lng, radius, args.limit)
+                    timings.append(time.perf_counter() - t0)
+                    hits += len(rows)
+                scan_times, equal = [], True
+                for lat, lng in points[:args.scans]:
+                    t0 = time.perf_counter()
+                    expected = conn.execute(SCAN_SQL, {"lat": lat, "lng": lng, "radius_km": radius,
+                                                       "limit": args.limit}).fetchall()
+                    scan_times.append(time.perf_counter() - t0)
+                    got = [tuple(r[c] for c in NEARBY_COLUMNS) for r in nearby(conn, lat, lng, radius, args.limit)]
+                    equal &= got == expected
+                p50 = statistics.median(timings) * 1000
+                scan = statistics.median(scan_times) * 1000
+                print(f"{n:>10,} {indexed:>9,} {backfill:>10.2f} {radius:>9.1f} {hits / len(points):>6.1f} "
+                      f"{p50:>8.3f} {_percentile(timings, 0.99) * 1000:>8.3f} {scan:>9.1f} {scan / p50:>7.0f}x  {equal}")
+            conn.close()
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
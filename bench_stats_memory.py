@@ -0,0 +1,94 @@
+# bench_stats_memory.py
+"""
+Memory and equivalence check: StatisticsService standard vs compact dtypes.
+
+    python bench_stats_memory.py                        # 1M CSV rows
+    python bench_stats_memory.py --rows 1000000 --dishes 2000 --days 3650
+    python bench_stats_memory.py --csv canteen_data.csv
+
+Loads the same CSV in both modes, prints df.memory_usage(deep=True) per
+column, and compares every API output (the pre-serialized JSON of each
+rollup plus threshold point / range / batch lookups). Exits non-zero on any
+mismatch.
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+from bench_stats_startup import write_csv
+from statistics_service import StatisticsService
+
+
+def api_outputs(svc, seed=7, samples=50):
+    out = {name: svc.rollup_json(name) for name in ("overall", "daily", "dishes", "weekday")}
+    out["dishes_top5"] = svc.rollup_json("dishes", top_n=5)
+    days = [d["date"] for d in svc.daily_stats()]
+    if not days:
+        return out
+    rnd = random.Random(seed)
+    for i in range(samples):
+        day = rnd.choice(days)
+        threshold = rnd.choice([0, 10, 25.5, 80, 150])
+        out[f"threshold {day} {threshold}"] = json.dumps(svc.surplus_exceeds_threshold(day, threshold), default=str)
+    start, end = sorted(rnd.sample(days, 2)) if len(days) > 1 else (days[0], days[0])
+    out["range"] = json.dumps(svc.surplus_exceeds_threshold_range(start, end, 50), default=str)
+    out["batch"] = json.dumps(svc.surplus_exceeds_threshold_batch(rnd.sample(days, min(10, len(days))), 20), default=str)
+    return out
+
+
+def _load(csv_path, compact):
+    t0 = time.perf_counter()
+    svc = StatisticsService(csv_path, compact=compact)
+    return svc, time.perf_counter() - t0
+
+
+def check(csv_path):
+    standard, standard_s = _load(csv_path, compact=False)
+    compact, compact_s = _load(csv_path, compact=True)
+    std_mem, cmp_mem = standard.memory_report(), compact.memory_report()
+
+    print(f"rows in frame: {std_mem['rows']:,}   load: standard {standard_s:.2f}s, compact {compact_s:.2f}s")
+    print(f"{'column':>20} {'standard':>16} {'compact':>16} {'bytes':>12} {'bytes':>12}")
+    for col, n in std_mem["columns"].items():
+        print(f"{col:>20} {std_mem['dtypes'].get(col, 'index'):>16} {cmp_mem['dtypes'].get(col, 'index'):>16} "
+              f"{n:>12,} {cmp_mem['columns'][col]:>12,}")
+    print(f"{'total':>20} {'':>16} {'':>16} {std_mem['total_bytes']:>12,} {cmp_mem['total_bytes']:>12,}"
+          f"   ({std_mem['total_bytes'] / max(cmp_mem['total_bytes'], 1):.1f}x smaller)")
+
+    a, b = api_outputs(standard), api_outputs(compact)
+    mismatches = [k for k in a if a[k] != b[k]]
+    print(f"API outputs compared: {len(a)}, mismatches: {len(mismatches)}")
+    for k in mismatches[:10]:
+        print("  differs:", k)
+    return not mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--csv", help="existing CSV instead of synthetic data")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--dishes", type=int, default=600)
+    parser.add_argument("--days", type=int, default=1095)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    if args.csv:
+        ok = check(args.csv)
+    else:
+        tmp = tempfile.mkdtemp(prefix="stats_bench_")
+        try:
+            csv_path = os.path.join(tmp, "canteen_data.csv")
+            write_csv(csv_path, args.rows, seed=args.seed, dishes=args.dishes, days=args.days)
+            ok = check(csv_path)
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
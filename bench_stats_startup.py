@@ -0,0 +1,91 @@
+# bench_stats_startup.py
+"""
+Benchmark: StatisticsService startup from canteen_data.csv vs from the binary
+columnar snapshot (stats_snapshot.py).
+
+    python bench_stats_startup.py                       # 1M CSV rows
+    python bench_stats_startup.py --rows 100000 1000000 5000000
+
+Every load runs in a fresh interpreter so timings are real cold starts and
+peak RSS (ru_maxrss) covers only that load.
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+from datetime import date, timedelta
+
+CHILD = """
+import json, resource, sys, time
+import pandas, numpy
+from statistics_service import StatisticsService
+base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+t0 = time.perf_counter()
+svc = StatisticsService(sys.argv[1], snapshot_dir=sys.argv[2] or None)
+elapsed = time.perf_counter() - t0
+peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({"seconds": elapsed, "peak_mb": (peak - base) / 1024, "rows": len(svc.df),
+                  "loaded_from": svc.loaded_from, "overall": svc.overall_summary()}))
+"""
+
+
+# ---- synthetic data ----
+def write_csv(path, n, seed=42, dishes=60, days=1095):
+    rnd = random.Random(seed)
+    start = date(2022, 1, 1)
+    dish_names = [f" Dish {i} " if i % 7 == 0 else f"Dish {i}" for i in range(dishes)]   # exercises strip/lower
+    with open(path, "w") as f:
+        f.write("date,dish_name,quantity_prepared,quantity_consumed\n")
+        for _ in range(n):
+            prepared = rnd.randint(20, 200)
+            f.write(f"{start + timedelta(days=rnd.randrange(days))},{rnd.choice(dish_names)},"
+                    f"{prepared},{rnd.randint(0, prepared)}\n")
+
+
+def _load(csv_path, snapshot_dir):
+    here = os.path.dirname(os.path.abspath(__file__))
+    out = subprocess.run([sys.executable, "-c", CHILD, csv_path, snapshot_dir or ""],
+                         cwd=here, check=True, capture_output=True, text=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def _best_of(csv_path, snapshot_dir, repeat):
+    runs = [_load(csv_path, snapshot_dir) for _ in range(repeat)]
+    return min(runs, key=lambda r: r["seconds"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    print(f"{'csv rows':>12} {'agg rows':>10} {'csv s':>8} {'csv MB':>8} {'snap s':>8} {'snap MB':>8} "
+          f"{'speedup':>8} {'snap size MB':>13}  equal")
+    for n in args.rows:
+        tmp = tempfile.mkdtemp(prefix="stats_bench_")
+        try:
+            csv_path = os.path.join(tmp, "canteen_data.csv")
+            snapshot_dir = csv_path + ".snapshot"
+            write_csv(csv_path, n, seed=args.seed)
+            csv_run = _best_of(csv_path, None, args.repeat)
+            _load(csv_path, snapshot_dir)       # writes the snapshot
+            snap_run = _best_of(csv_path, snapshot_dir, args.repeat)
+            assert snap_run["loaded_from"] == "snapshot"
+            snap_mb = sum(os.path.getsize(os.path.join(snapshot_dir, f))
+                          for f in os.listdir(snapshot_dir)) / 2 ** 20
+            print(f"{n:>12,} {csv_run['rows']:>10,} {csv_run['seconds']:>8.3f} {csv_run['peak_mb']:>8.1f} "
+                  f"{snap_run['seconds']:>8.3f} {snap_run['peak_mb']:>8.1f} "
+                  f"{csv_run['seconds'] / snap_run['seconds']:>7.1f}x {snap_mb:>13.1f}  "
+                  f"{csv_run['overall'] == snap_run['overall']}")
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+# bench_surplus_claims.py
+"""
+Load test: many NGOs racing to reserve the same surplus listings through
+surplus_claims, from several processes (like several app workers) with
+several threads each.
+
+    python bench_surplus_claims.py                          # 4 procs x 8 NGOs, 200 hot listings
+    python bench_surplus_claims.py --processes 16 --threads 4 --hot 50 --seconds 20
+
+Every client reserves random batches of 1-3 hot listings, and gives back
+(release) a share of what it wins so the same rows are fought over again.
+At the end the run is checked for double allocation:
+
+  - per listing: successful reserves - successful releases is 1 if it is
+    RESERVED in the database and 0 if it is AVAILABLE
+  - the listings each client still holds are disjoint across clients and
+    match claimed_by in the database
+
+It then times one expiry sweep over --listings rows, a share of them holding
+expired reservations.
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import tempfile
+import time
+from collections import Counter
+
+from nearby_listings import ensure_geo_schema
+from db_pool import PoolTimeout
+from surplus_claims import SurplusClaims, ensure_claim_schema, sweep
+
+SCHEMA = """
+CREATE TABLE surplus_listings (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    item_name TEXT,
+    qty_kg REAL,
+    lat REAL,
+    lng REAL,
+    is_urgent BOOLEAN DEFAULT 0,
+    status TEXT DEFAULT 'AVAILABLE',
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+
+def build_db(path, n, seed=42):
+    rnd = random.Random(seed)
+    conn = sqlite3.connect(path, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(SCHEMA)
+    conn.execute("BEGIN")
+    conn.executemany("INSERT INTO surplus_listings (item_name, qty_kg, lat, lng, is_urgent, status) VALUES (?, ?, ?, ?, ?, ?)",
+                     ((f"Dish {rnd.randrange(60)}", round(rnd.uniform(1, 40), 1),
+                       19.0 + rnd.uniform(-0.3, 0.3), 73.0 + rnd.uniform(-0.3, 0.3), int(rnd.random() < 0.2),
+                       "AVAILABLE" if rnd.random() < 0.3 else "COLLECTED") for _ in range(n)))
+    conn.commit()
+    ensure_geo_schema(conn)
+    ensure_claim_schema(conn)
+    return conn
+
+
+def _retry(call, *args):
+    # a release must go through for the bookkeeping below to add up
+    while True:
+        try:
+            return call(*args)
+        except (sqlite3.OperationalError, PoolTimeout):
+            pass
+
+
+# ---- one worker process: `threads` NGOs sharing a pool ----
+def _client(claims, ngo_id, hot, deadline, release_share, think, seed, out):
+    rnd = random.Random(seed)
+    held, wins, releases, latencies, errors = set(), Counter(), Counter(), [], 0
+    while time.perf_counter() < deadline:
+        time.sleep(rnd.expovariate(1 / think) if think else 0)
+        t0 = time.perf_counter()
+        try:
+            r = claims.reserve(ngo_id, rnd.sample(hot, rnd.randint(1, 3)))
+        except (sqlite3.OperationalError, PoolTimeout):
+            # lock wait ran out (busy_timeout / pool timeout); nothing changed
+            errors += 1
+            continue
+        finally:
+            latencies.append(time.perf_counter() - t0)
+        wins.update(r.claimed)
+        held.update(r.claimed)
+        give_back = [i for i in r.claimed if rnd.random() < release_share]
+        if give_back:
+            t0 = time.perf_counter()
+            released = _retry(claims.release, ngo_id, give_back).claimed
+            latencies.append(time.perf_counter() - t0)
+            assert released == give_back, "release of an own reservation failed"
+            releases.update(released)
+            held.difference_update(released)
+    out.append((ngo_id, held, wins, releases, latencies, errors))
+
+
+def _worker(args):
+    import threading
+    db_path, proc, threads, hot, seconds, release_share, think, seed = args
+    claims = SurplusClaims(db_path)
+    deadline = time.perf_counter() + seconds
+    out = []
+    clients = [threading.Thread(target=_client, args=(claims, f"ngo-{proc}-{t}", hot, deadline, release_share, think,
+                                                      seed * 1000 + proc * 100 + t, out))
+               for t in range(threads)]
+    for c in clients:
+        c.start()
+    for c in clients:
+        c.join()
+    return out
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--listings", type=int, default=100_000)
+    parser.add_argument("--hot", type=int, default=200, help="urgent listings every NGO goes after")
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=8, help="NGO clients per process")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--release", type=float, default=0.5, help="share of won listings given back")
+    parser.add_argument("--think", type=float, default=5.0,
+                        help="mean pause between a client's calls, ms (0 = hammer the database)")
+    parser.add_argument("--expired", type=float, default=0.05, help="share of listings with expired holds to sweep")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="claims_bench_")
+    try:
+        db_path = os.path.join(tmp, "foodiq.db")
+        conn = build_db(db_path, args.listings, args.seed)
+        hot = [row[0] for row in conn.execute("SELECT id FROM surplus_listings WHERE status = 'AVAILABLE' "
+                                              "ORDER BY is_urgent DESC, id LIMIT ?", (args.hot,))]
+
+        jobs = [(db_path, p, args.threads, hot, args.seconds, args.release, args.think / 1000, args.seed) for p in range(args.processes)]
+        t0 = time.perf_counter()
+        with multiprocessing.Pool(args.processes) as pool:
+            results = [client for out in pool.map(_worker, jobs) for client in out]
+        elapsed = time.perf_counter() - t0
+
+        wins, releases, latencies, holder = Counter(), Counter(), [], {}
+        doubles = errors = 0
+        for ngo_id, held, w, r, lat, err in results:
+            errors += err
+            wins.update(w)
+            releases.update(r)
+            latencies.extend(lat)
+            for listing_id in held:
+                doubles += listing_id in holder
+                holder[listing_id] = ngo_id
+        db = dict(((i, (s, c)) for i, s, c in conn.execute(
+            f"SELECT id, status, claimed_by FROM surplus_listings WHERE id IN ({', '.join('?' * len(hot))})", hot)))
+        for listing_id in hot:
+            status, claimed_by = db[listing_id]
+            balance = wins[listing_id] - releases[listing_id]
+            doubles += balance != (status == "RESERVED") or holder.get(listing_id) != claimed_by
+
+        print(f"{len(results)} NGOs in {args.processes} processes, {len(hot)} hot listings, {elapsed:.1f} s")
+        print(f"  calls {len(latencies):,} ({len(latencies) / elapsed:,.0f}/s)  reserved {sum(wins.values()):,}  "
+              f"released {sum(releases.values()):,}  held at end {len(holder):,}")
+        print(f"  latency ms  p50 {statistics.median(latencies) * 1000:.2f}  p99 {_percentile(latencies, 0.99) * 1000:.2f}"
+              f"  max {max(latencies) * 1000:.2f}  lock timeouts {errors}")
+        print(f"  double allocations: {doubles}")
+
+        # ---- expiry sweep ----
+        conn.execute("UPDATE surplus_listings SET status = 'RESERVED', claimed_by = 'bench', "
+                     "reserved_until = datetime('now', '-1 minute') WHERE status = 'AVAILABLE' AND id % ? = 0",
+                     (max(1, round(1 / args.expired)),))
+        t0 = time.perf_counter()
+        n = sweep(conn)
+        print(f"  sweep: {n:,} expired reservations of {args.listings:,} listings in {(time.perf_counter() - t0) * 1000:.1f} ms")
+        conn.close()
+        assert doubles == 0, "double allocation detected"
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+# benchmarks/__init__.py
+"""
+Repeatable benchmarks on seeded synthetic data, with results that can be
+diffed between commits.
+
+    python -m benchmarks run --scale 100k --out head.json
+    python -m benchmarks run --scale 10k 1m --suite loaders aggregations
+    python -m benchmarks compare base.json head.json --fail
+    python -m benchmarks generate --scale 10m          # build datasets ahead of time
+
+Suites (each runs in a fresh interpreter, see harness.run_isolated):
+
+    loaders        SQLite / CSV -> analytics structures (loaders.py)
+    aggregations   business stats, StatisticsService, surplus, nearby (aggregations.py)
+    endpoints      every API endpoint via the Flask test client (endpoints.py)
+    checkout       concurrent /api/checkout, direct and group-commit (checkout.py)
+
+Datasets come from generators.py and are cached in generators.DEFAULT_DATA_DIR
+(override with --data-dir), keyed by kind, scale, seed and generator version,
+so the first run at a scale pays for generation and later runs don't. The
+10m scale needs several GB of disk for the cached files.
+"""
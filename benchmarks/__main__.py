@@ -0,0 +1,129 @@
+# benchmarks/__main__.py
+"""Runs the benchmark suites, diffs result files and pre-builds datasets (see benchmarks/__init__.py)."""
+import argparse
+import importlib
+import json
+import sys
+import tempfile
+import time
+
+from benchmarks import compare as compare_mod
+from benchmarks.generators import DATASETS, dataset
+from benchmarks.harness import RESULTS_FORMAT, Config, environment, run_isolated
+
+SUITES = ("loaders", "aggregations", "endpoints", "checkout")
+SCALES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000, "10m": 10_000_000}
+
+
+def parse_scale(value: str) -> int:
+    value = value.strip().lower()
+    if value in SCALES:
+        return SCALES[value]
+    try:
+        return int(value.replace("_", ""))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"scale must be one of {', '.join(SCALES)} or a row count, got {value!r}")
+
+
+def _suite_runs(suite: str):
+    """(options, env) per isolated run of a suite: checkout runs once per writer mode."""
+    if suite != "checkout":
+        return [(None, {})]
+    from benchmarks.checkout import MODES
+    return [({"mode": mode}, {"POS_GROUP_COMMIT": flag}) for mode, flag in MODES.items()]
+
+
+def cmd_run(args) -> int:
+    results = []
+    for rows in args.scale:
+        for suite in args.suite:
+            for options, env in _suite_runs(suite):
+                label = f"{suite}{'/' + options['mode'] if options else ''} @ {rows:,} rows"
+                print(f"== {label}", file=sys.stderr, flush=True)
+                t0 = time.perf_counter()
+                with tempfile.TemporaryDirectory(prefix="bench-") as work_dir:
+                    cfg = Config(rows, args.seed, args.repeat, args.data_dir, work_dir, options)
+                    suite_results = run_isolated(suite, cfg, env)
+                for r in suite_results:
+                    print(f"   {r['name']:<60}{r['value']:>12,.3f} {r['unit']}", file=sys.stderr)
+                print(f"   ({time.perf_counter() - t0:.1f}s)", file=sys.stderr, flush=True)
+                results.extend(suite_results)
+
+    doc = {
+        "format": RESULTS_FORMAT,
+        "environment": environment(),
+        "config": {"scales": args.scale, "suites": args.suite, "seed": args.seed, "repeat": args.repeat},
+        "results": sorted(results, key=lambda r: (r["suite"], r["name"], r["rows"])),
+    }
+    with open(args.out, "w") as f:
+        json.dump(doc, f, indent=1, sort_keys=True)
+        f.write("\n")
+    print(f"{len(results)} results -> {args.out}", file=sys.stderr)
+    return 0
+
+
+def cmd_compare(args) -> int:
+    base, head = compare_mod.load(args.base), compare_mod.load(args.head)
+    changes = compare_mod.compare(base, head, args.threshold)
+    print(compare_mod.report(base, head, changes))
+    regressed = any(c.verdict == "regression" for c in changes)
+    return 1 if args.fail and regressed else 0
+
+
+def cmd_generate(args) -> int:
+    for rows in args.scale:
+        for kind in DATASETS:
+            t0 = time.perf_counter()
+            path = dataset(kind, rows, args.seed, args.data_dir)
+            print(f"{kind:<18}{rows:>12,}  {time.perf_counter() - t0:7.1f}s  {path}")
+    dataset("foodiq", 0, args.seed, args.data_dir)     # aggregations' surplus evaluation target
+    return 0
+
+
+def cmd_suite(args) -> int:
+    # internal: one suite in this interpreter, results as JSON on the last stdout line
+    cfg = Config(**json.loads(args.config))
+    results = importlib.import_module(f"benchmarks.{args.name}").run(cfg)
+    sys.stdout.write("\n" + json.dumps(results) + "\n")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="run suites and write a result file")
+    run.add_argument("--scale", nargs="+", type=parse_scale, default=[SCALES["100k"]],
+                     help="dataset sizes: 10k, 100k, 1m, 10m or a row count (default 100k)")
+    run.add_argument("--suite", nargs="+", choices=SUITES, default=list(SUITES))
+    run.add_argument("--repeat", type=int, default=5, help="timed runs per benchmark (default 5)")
+    run.add_argument("--seed", type=int, default=42)
+    run.add_argument("--data-dir", default=None, help="dataset cache directory")
+    run.add_argument("--out", default="bench_results.json")
+    run.set_defaults(func=cmd_run)
+
+    cmp = sub.add_parser("compare", help="diff two result files")
+    cmp.add_argument("base")
+    cmp.add_argument("head")
+    cmp.add_argument("--threshold", type=float, default=compare_mod.DEFAULT_THRESHOLD,
+                     help="relative change that counts as a regression (default 0.10)")
+    cmp.add_argument("--fail", action="store_true", help="exit 1 if anything regressed")
+    cmp.set_defaults(func=cmd_compare)
+
+    gen = sub.add_parser("generate", help="build the cached datasets for a scale")
+    gen.add_argument("--scale", nargs="+", type=parse_scale, default=[SCALES["100k"]])
+    gen.add_argument("--seed", type=int, default=42)
+    gen.add_argument("--data-dir", default=None)
+    gen.set_defaults(func=cmd_generate)
+
+    suite = sub.add_parser("_suite")
+    suite.add_argument("name", choices=SUITES)
+    suite.add_argument("config")
+    suite.set_defaults(func=cmd_suite)
+
+    args = parser.parse_args()
+    sys.exit(args.func(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+# benchmarks/aggregations.py
+"""
+Aggregation benchmarks: the business stats paths, the StatisticsService
+queries, surplus detection and nearby-listing lookups, each on data that is
+already loaded (loaders.py times the loading).
+
+Dataset dates run from generators.START_DATE over generators.DAYS days;
+the bounded queries ask for the last 30 of them.
+"""
+import os
+import random
+from datetime import timedelta
+from typing import Any, Dict, List
+
+from benchmarks.generators import CITIES, DAYS, KM_PER_DEGREE, START_DATE, dataset
+from benchmarks.harness import Config, measure, result, working_copy
+
+SUITE = "aggregations"
+MAX_LIST_ROWS = 2_000_000
+NEARBY_QUERIES = 200
+
+
+def _business_stats(cfg: Config) -> List[Dict[str, Any]]:
+    from business_stats import (BusinessStatsAggregator, StatsFilter, compute_business_stats,
+                                iter_transactions, load_business_stats, load_expenses_from_db,
+                                stream_business_stats)
+
+    n, repeat = cfg.rows, cfg.repeat
+    pos_db = dataset("pos", n, cfg.seed, cfg.data_dir)
+    last = START_DATE + timedelta(days=DAYS - 1)
+    month = StatsFilter(start=last - timedelta(days=29), end=last)
+    results = []
+
+    if n <= MAX_LIST_ROWS:
+        transactions = list(iter_transactions(pos_db))
+        expenses = load_expenses_from_db(pos_db)
+        results.append(result(SUITE, "compute_business_stats", n,
+                              measure(lambda: compute_business_stats(transactions, expenses), repeat)))
+        del transactions
+    results.append(result(SUITE, "stream_business_stats", n,
+                          measure(lambda: stream_business_stats(pos_db), repeat)))
+
+    # no summary tables: a fresh aggregator folds everything, a warm one only checks watermarks
+    results.append(result(SUITE, "BusinessStatsAggregator.cold", n,
+                          measure(lambda: BusinessStatsAggregator(pos_db).stats(), repeat)))
+    warm = BusinessStatsAggregator(pos_db)
+    results.append(result(SUITE, "BusinessStatsAggregator.warm", n, measure(warm.stats, repeat)))
+
+    variants = {
+        "all_time": StatsFilter(),
+        "last_30_days": month,
+        "daily_buckets": StatsFilter(granularity="day"),
+        "category_all_time": StatsFilter(category="lunch"),
+        "category_last_30_days": month._replace(category="lunch"),
+    }
+    for name, filters in variants.items():
+        results.append(result(SUITE, f"load_business_stats.{name}", n,
+                              measure(lambda: load_business_stats(pos_db, filters=filters), repeat)))
+    return results
+
+
+def _canteen_stats(cfg: Config) -> List[Dict[str, Any]]:
+    from statistics_service import StatisticsService
+
+    n, repeat = cfg.rows, cfg.repeat
+    svc = StatisticsService(dataset("canteen_csv", n, cfg.seed, cfg.data_dir))
+    last = START_DATE + timedelta(days=DAYS - 1)
+    start = (last - timedelta(days=29)).isoformat()
+    days = [(last - timedelta(days=i)).isoformat() for i in range(30)]
+    queries = {
+        "overall_summary": svc.overall_summary,
+        "daily_stats": svc.daily_stats,
+        "dish_wise_stats": svc.dish_wise_stats,
+        "weekday_trends": svc.weekday_trends,
+        "rollup_json.daily": lambda: svc.rollup_json("daily"),
+        "surplus_exceeds_threshold": lambda: svc.surplus_exceeds_threshold(last.isoformat(), 20),
+        "surplus_exceeds_threshold_range": lambda: svc.surplus_exceeds_threshold_range(start, last.isoformat(), 20),
+        "surplus_exceeds_threshold_batch": lambda: svc.surplus_exceeds_threshold_batch(days, 20),
+    }
+    return [result(SUITE, f"StatisticsService.{name}", n, measure(fn, repeat)) for name, fn in queries.items()]
+
+
+def _surplus(cfg: Config) -> List[Dict[str, Any]]:
+    from nearby_listings import ListingLocator
+    from surplus_engine import SurplusEngine
+
+    n, repeat = cfg.rows, cfg.repeat
+    results = []
+
+    # threshold evaluation publishes listings: run against an empty foodiq.db copy
+    engine = SurplusEngine(working_copy(dataset("foodiq", 0, cfg.seed, cfg.data_dir), cfg.work_dir, "evaluate.db"))
+    canteen_db = dataset("canteen", n, cfg.seed, cfg.data_dir)
+    last = START_DATE + timedelta(days=DAYS - 1)
+
+    def clear_listings():
+        with engine.pool.writer() as conn:
+            conn.execute("DELETE FROM surplus_listings")
+            conn.commit()
+
+    reports = []
+    for name, start in (("day", last), ("week", last - timedelta(days=6))):
+        runs = measure(lambda: reports.append(engine.evaluate_canteens(canteen_db, start.isoformat(), last.isoformat())),
+                       repeat, setup=clear_listings)
+        results.append(result(SUITE, f"SurplusEngine.evaluate_canteens.{name}", n, runs,
+                              rows_evaluated=reports[-1].rows, hits=reports[-1].hits))
+
+    # nearby: seeded query points around the same cities the listings cluster in
+    locator = ListingLocator(dataset("foodiq", n, cfg.seed, cfg.data_dir))
+    rnd = random.Random(cfg.seed)
+    points = []
+    for _ in range(NEARBY_QUERIES):
+        lat, lng, _, spread = rnd.choice(CITIES)
+        points.append((lat + rnd.gauss(0, spread / KM_PER_DEGREE), lng + rnd.gauss(0, spread / KM_PER_DEGREE)))
+    for radius in (2, 10, 50):
+        def queries():
+            for lat, lng in points:
+                locator.nearby(lat, lng, radius, 50)
+        runs = [r / NEARBY_QUERIES for r in measure(queries, repeat)]
+        results.append(result(SUITE, f"ListingLocator.nearby.{radius}km", n, runs))
+    return results
+
+
+def run(cfg: Config) -> List[Dict[str, Any]]:
+    os.makedirs(cfg.work_dir, exist_ok=True)
+    return _business_stats(cfg) + _canteen_stats(cfg) + _surplus(cfg)
@@ -0,0 +1,90 @@
+# benchmarks/checkout.py
+"""
+Concurrent checkout: T terminal threads posting seeded carts to
+Billing_app's /api/checkout through the Flask test client.
+
+Billing_app decides at import time whether checkouts take the pool writer
+directly or go through the GroupCommitWriter (POS_GROUP_COMMIT), so the
+runner starts this suite once per mode, each in its own interpreter, with
+cfg.options = {"mode": "direct" | "group_commit"}. Per thread count it
+records throughput (orders/s, median of cfg.repeat rounds) and the p50 /
+p99 checkout latency over all rounds; rejected checkouts (409) are counted
+in `extra`. loadtest_checkout.py is the full load test (processes, HTTP,
+cart sizes, stock-consistency checks).
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List
+
+from benchmarks.generators import carts, dataset
+from benchmarks.harness import Config, percentile, result, working_copy
+
+SUITE = "checkout"
+MODES = {"direct": "0", "group_commit": "1"}
+THREADS = (1, 4, 16)
+ORDERS_PER_THREAD = 50
+
+
+def _round(client, threads: int, cart_pool: List[List[dict]], offset: int):
+    latencies: List[float] = []
+    rejected = [0]
+    lock = threading.Lock()
+    start = threading.Barrier(threads)
+
+    def terminal(t: int):
+        mine = []
+        failed = 0
+        start.wait()
+        for i in range(ORDERS_PER_THREAD):
+            cart = cart_pool[(offset + t * ORDERS_PER_THREAD + i) % len(cart_pool)]
+            t0 = time.perf_counter()
+            resp = client.post("/api/checkout", json={"cart": cart, "paymentMode": "UPI"})
+            mine.append((time.perf_counter() - t0) * 1000.0)
+            if resp.status_code != 201:
+                failed += 1
+        with lock:
+            latencies.extend(mine)
+            rejected[0] += failed
+
+    workers = [threading.Thread(target=terminal, args=(t,)) for t in range(threads)]
+    t0 = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return time.perf_counter() - t0, latencies, rejected[0]
+
+
+def run(cfg: Config) -> List[Dict[str, Any]]:
+    mode = (cfg.options or {}).get("mode", "direct")
+    pos_db = working_copy(dataset("pos", cfg.rows, cfg.seed, cfg.data_dir), cfg.work_dir, f"checkout-{mode}.db")
+    conn = sqlite3.connect(pos_db)
+    conn.execute("UPDATE menu_items SET stock = 1000000000")
+    conn.commit()
+    conn.close()
+    os.environ.update({"POS_DB": pos_db, "POS_GROUP_COMMIT": MODES[mode], "POS_SALES_PROJECTION": "0"})
+    import Billing_app
+
+    logging.disable(logging.INFO)
+    client = Billing_app.app.test_client()
+    cart_pool = carts(5000, cfg.seed)
+    _round(client, 1, cart_pool, 0)     # warm-up: pool connections, catalog, code paths
+
+    results = []
+    for threads in THREADS:
+        throughput, latencies, rejected = [], [], 0
+        for r in range(cfg.repeat):
+            elapsed, lat, rej = _round(client, threads, cart_pool, r * threads * ORDERS_PER_THREAD)
+            throughput.append(len(lat) / elapsed)
+            latencies.extend(lat)
+            rejected += rej
+        name = f"{mode}.{threads}_terminals"
+        orders = len(latencies)
+        results.append(result(SUITE, f"{name}.throughput", cfg.rows, throughput, unit="orders/s",
+                              better="higher", orders=orders, rejected=rejected))
+        results.append(result(SUITE, f"{name}.latency_p50", cfg.rows, [percentile(latencies, 50)]))
+        results.append(result(SUITE, f"{name}.latency_p99", cfg.rows, [percentile(latencies, 99)]))
+    return results
@@ -0,0 +1,70 @@
+# benchmarks/compare.py
+"""
+Diff two result files (e.g. the parent commit vs this branch).
+
+    python -m benchmarks compare base.json head.json
+    python -m benchmarks compare base.json head.json --threshold 0.2 --fail
+
+Benchmarks are matched on (suite, name, rows). A change counts as a
+regression when it moves against the benchmark's `better` direction by more
+than the threshold (10% by default); --fail exits non-zero if any did.
+"""
+import json
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+DEFAULT_THRESHOLD = 0.10
+
+
+class Change(NamedTuple):
+    key: Tuple[str, str, int]       # (suite, name, rows)
+    unit: str
+    base: Optional[float]
+    head: Optional[float]
+    change: Optional[float]         # (head - base) / base
+    verdict: str                    # regression, improvement, same, added, removed
+
+
+def load(path: str) -> Dict[str, Any]:
+    with open(path) as f:
+        return json.load(f)
+
+
+def _index(results: List[Dict[str, Any]]) -> Dict[Tuple[str, str, int], Dict[str, Any]]:
+    return {(r["suite"], r["name"], r["rows"]): r for r in results}
+
+
+def compare(base: Dict[str, Any], head: Dict[str, Any], threshold: float = DEFAULT_THRESHOLD) -> List[Change]:
+    old, new = _index(base["results"]), _index(head["results"])
+    changes = []
+    for key in sorted(set(old) | set(new)):
+        a, b = old.get(key), new.get(key)
+        if a is None or b is None:
+            r = a or b
+            changes.append(Change(key, r["unit"], a and a["value"], b and b["value"], None,
+                                  "removed" if b is None else "added"))
+            continue
+        if not a["value"]:
+            changes.append(Change(key, b["unit"], a["value"], b["value"], None, "same"))
+            continue
+        change = (b["value"] - a["value"]) / a["value"]
+        worse = change if b["better"] == "lower" else -change
+        verdict = "regression" if worse > threshold else "improvement" if worse < -threshold else "same"
+        changes.append(Change(key, b["unit"], a["value"], b["value"], change, verdict))
+    return changes
+
+
+def _fmt(value: Optional[float]) -> str:
+    return "-" if value is None else f"{value:,.3f}"
+
+
+def report(base: Dict[str, Any], head: Dict[str, Any], changes: List[Change]) -> str:
+    lines = [f"base: {base['environment'].get('commit')}  head: {head['environment'].get('commit')}", ""]
+    lines.append(f"{'benchmark':<64}{'rows':>10}{'base':>14}{'head':>14}{'change':>9}  unit")
+    for c in changes:
+        suite, name, rows = c.key
+        pct = "" if c.change is None else f"{c.change:+.1%}"
+        flag = "" if c.verdict == "same" else f"  {c.verdict.upper()}"
+        lines.append(f"{suite + '/' + name:<64}{rows:>10,}{_fmt(c.base):>14}{_fmt(c.head):>14}{pct:>9}  {c.unit}{flag}")
+    labels = {"regression": "regressions", "improvement": "improvements", "added": "added", "removed": "removed"}
+    lines += ["", ", ".join(f"{sum(1 for c in changes if c.verdict == v)} {label}" for v, label in labels.items())]
+    return "\n".join(lines)
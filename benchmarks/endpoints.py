@@ -0,0 +1,132 @@
+# benchmarks/endpoints.py
+"""
+Endpoint benchmarks through the Flask test client: request parsing, the view,
+JSON encoding and the response cache, without a socket in the way.
+
+The three apps read their data paths from the environment at import time
+(POS_DB, FOODIQ_DB, CANTEEN_CSV), so this suite points them at scratch
+copies of the datasets before importing them. Background threads (sales
+projection, reservation sweeper) are switched off so they don't compete with
+the requests being timed.
+
+Views decorated with @cached_json are timed twice: `.uncached` clears the
+response cache before every request, `.cached` serves repeats from it. Each
+timed run issues enough requests to take ~TARGET_RUN_MS (at most MAX_CALLS)
+and records the mean per request.
+"""
+import json
+import logging
+import os
+import sqlite3
+import time
+from datetime import timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks.generators import DAYS, START_DATE, carts, dataset
+from benchmarks.harness import Config, measure, result, working_copy
+
+SUITE = "endpoints"
+TARGET_RUN_MS = 200.0
+MAX_CALLS = 50
+
+
+def _prepare(cfg: Config) -> None:
+    pos_db = working_copy(dataset("pos", cfg.rows, cfg.seed, cfg.data_dir), cfg.work_dir, "pos_system.db")
+    conn = sqlite3.connect(pos_db)
+    conn.execute("UPDATE menu_items SET stock = 1000000000")    # checkouts must not sell out mid-run
+    conn.commit()
+    conn.close()
+    os.environ.update({
+        "POS_DB": pos_db,
+        "FOODIQ_DB": working_copy(dataset("foodiq", cfg.rows, cfg.seed, cfg.data_dir), cfg.work_dir, "foodiq.db"),
+        "CANTEEN_CSV": working_copy(dataset("canteen_csv", cfg.rows, cfg.seed, cfg.data_dir),
+                                    cfg.work_dir, "canteen_data.csv"),
+        "POS_SALES_PROJECTION": "0",
+        "SURPLUS_CLAIM_SWEEPER": "0",
+        "CANTEEN_LAT": "19.07",
+        "CANTEEN_LNG": "72.88",
+    })
+
+
+def _calls_per_run(call: Callable[[], Any]) -> int:
+    t0 = time.perf_counter()
+    call()
+    elapsed = (time.perf_counter() - t0) * 1000.0
+    return max(1, min(MAX_CALLS, int(TARGET_RUN_MS / max(elapsed, 1e-3))))
+
+
+def _bench(name: str, call: Callable[[], Any], cfg: Config, before: Optional[Callable[[], Any]] = None) -> Dict[str, Any]:
+    def once():
+        if before is not None:
+            before()
+        return call()
+
+    status = once().status_code
+    if status >= 400:
+        raise RuntimeError(f"{name}: HTTP {status}")
+    k = _calls_per_run(once)
+
+    def batch():
+        for _ in range(k):
+            once()
+
+    runs = [r / k for r in measure(batch, cfg.repeat)]
+    return result(SUITE, name, cfg.rows, runs, status=status, calls_per_run=k)
+
+
+def run(cfg: Config) -> List[Dict[str, Any]]:
+    _prepare(cfg)
+    import Billing_app
+    import api
+    import app as dashboard
+    from response_cache import cache
+
+    logging.disable(logging.INFO)      # Billing_app logs every order at INFO
+    pos, stats, canteen = (m.app.test_client() for m in (Billing_app, dashboard, api))
+    last = START_DATE + timedelta(days=DAYS - 1)
+    month = f"from={(last - timedelta(days=29)).isoformat()}&to={last.isoformat()}"
+    days = ",".join((last - timedelta(days=i)).isoformat() for i in range(30))
+    results = []
+
+    cached_views = {
+        "stats /api/business_stats": (stats, "/api/business_stats"),
+        "stats /api/business_stats?last_30_days": (stats, f"/api/business_stats?{month}"),
+        "stats /api/business_stats?granularity=day": (stats, "/api/business_stats?granularity=day"),
+        "stats /api/business_stats?category=lunch": (stats, "/api/business_stats?category=lunch"),
+        "canteen /api/overall": (canteen, "/api/overall"),
+        "canteen /api/daily": (canteen, "/api/daily"),
+        "canteen /api/dishes?top=10": (canteen, "/api/dishes?top=10"),
+        "canteen /api/weekday": (canteen, "/api/weekday"),
+        "canteen /api/threshold": (canteen, f"/api/threshold?date={last.isoformat()}&threshold=20"),
+        "canteen /api/threshold/range": (canteen, f"/api/threshold/range?{month}&threshold=20"),
+        "canteen /api/threshold/batch": (canteen, f"/api/threshold/batch?dates={days}&threshold=20"),
+    }
+    for name, (client, url) in cached_views.items():
+        results.append(_bench(f"{name}.uncached", lambda: client.get(url), cfg, before=cache.clear))
+        results.append(_bench(f"{name}.cached", lambda: client.get(url), cfg))
+
+    plain_views = {
+        "pos /api/menu": (pos, "/api/menu"),
+        "pos /api/menu/stock": (pos, "/api/menu/stock"),
+        "pos /api/sales/daily": (pos, f"/api/sales/daily?{month}"),
+        "canteen /api/listings/nearby": (canteen, "/api/listings/nearby?lat=19.07&lng=72.88&radius_km=5"),
+    }
+    for name, (client, url) in plain_views.items():
+        results.append(_bench(name, lambda: client.get(url), cfg))
+
+    cart = {"cart": carts(1, cfg.seed, max_lines=3)[0], "paymentMode": "UPI"}
+    results.append(_bench("pos POST /api/checkout", lambda: pos.post("/api/checkout", json=cart), cfg))
+    results.append(_bench("canteen POST /api/surplus/evaluate",
+                          lambda: canteen.post(f"/api/surplus/evaluate?date={last.isoformat()}"), cfg))
+
+    with sqlite3.connect(os.environ["FOODIQ_DB"]) as conn:
+        listing = conn.execute("SELECT id FROM surplus_listings WHERE status = 'AVAILABLE' LIMIT 1").fetchone()
+    if listing is not None:
+        claim = json.dumps({"ngo_id": "bench-ngo", "listing_ids": [listing[0]]})
+
+        def reserve_release():
+            canteen.post("/api/listings/reserve", data=claim, content_type="application/json")
+            return canteen.post("/api/listings/release", data=claim, content_type="application/json")
+
+        results.append(_bench("canteen POST /api/listings/reserve+release", reserve_release, cfg))
+    return results
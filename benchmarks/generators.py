@@ -0,0 +1,441 @@
+# benchmarks/generators.py
+"""
+Seeded, scalable synthetic data for every subsystem.
+
+Every generator takes (n, seed) and yields rows in chunks of tuples, so 10M
+rows never sit in memory as Python objects. The same (n, seed) always gives
+the same rows (numpy PCG64 streams). Items and categories come from the
+seed.py menu; dates, quantities and customers are skewed the way a canteen's
+are: lunch-heavy hours, a long tail of rare customers, waste on most days.
+
+    transaction_rows(n)        transactions (date, item, category, price, cost, customer)
+    expense_rows(n)            expenses (date, expense)
+    order_rows(n)              (orders rows, order_items rows) for the POS tables
+    canteen_record_rows(n)     daily_records for canteen.db
+    canteen_csv_rows(n)        canteen_data.csv rows for StatisticsService
+    listing_rows(n)            surplus_listings clustered around Indian cities
+    carts(n)                   checkout request carts ([{"id", "qty"}, ...])
+
+The writers build the databases the way the setup scripts do and then run
+the repo's own ensure_* functions, so indexes, triggers and summaries match
+a live install:
+
+    write_pos_db(path, transactions=n, expenses=n // 100, orders=n // 4)
+    write_transactions_csv(path, n)     the transactions.csv export layout (ingest_transactions)
+    write_canteen_csv(path, n)
+    write_canteen_db(path, n)
+    write_foodiq_db(path, listings=n)
+
+dataset(kind, n, seed, data_dir) builds a dataset once and reuses the file on
+later runs; suites that write copy it first.
+"""
+import csv
+import os
+import sqlite3
+import tempfile
+import zlib
+from datetime import date, datetime, timedelta
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from seed import MENU_ITEMS
+
+CHUNK_ROWS = 100_000
+START_DATE = date(2023, 1, 1)
+DAYS = 730
+CUSTOMERS = 20_000
+CANTEENS = 20
+# datasets are reused across runs and commits (see dataset())
+DEFAULT_DATA_DIR = os.path.join(tempfile.gettempdir(), "canteen-benchmarks")
+# bump when a generator changes, so cached datasets are rebuilt
+GENERATOR_VERSION = 1
+
+PAYMENT_MODES = ["Cash", "UPI", "Card"]
+MEALS = ["breakfast", "lunch", "dinner"]
+# (lat, lng, weight, spread in km) for surplus listings
+CITIES = [
+    (19.07, 72.88, 5, 12), (19.03, 73.03, 3, 8), (18.52, 73.86, 3, 10), (28.61, 77.21, 5, 15),
+    (12.97, 77.59, 4, 12), (13.08, 80.27, 3, 10), (17.39, 78.49, 3, 10), (22.57, 88.36, 3, 10),
+    (23.02, 72.57, 2, 8), (26.91, 75.79, 1, 6), (21.15, 79.09, 1, 6), (15.50, 73.83, 1, 4),
+]
+KM_PER_DEGREE = 111.2
+
+_MENU_IDS = np.array([item[0] for item in MENU_ITEMS])
+_MENU_NAMES = np.array([item[1] for item in MENU_ITEMS], dtype=object)
+_MENU_PRICES = np.array([item[2] for item in MENU_ITEMS], dtype=np.int64)
+_MENU_CATEGORIES = np.array([item[3] for item in MENU_ITEMS], dtype=object)
+_MENU_MEAL = np.array([MEALS.index(item[3]) for item in MENU_ITEMS])
+# lunch sells best; inside a meal a few favourites sell most
+_MENU_WEIGHTS = np.array([(2.0 if meal == 1 else 1.0) / (1 + i % 25) ** 0.6
+                          for i, meal in enumerate(_MENU_MEAL)])
+_MENU_WEIGHTS /= _MENU_WEIGHTS.sum()
+
+_ISO_DAYS = np.array([(START_DATE + timedelta(days=i)).isoformat() for i in range(DAYS)], dtype=object)
+
+
+def _rng(seed: int, stream: str) -> np.random.Generator:
+    # one independent stream per generator, so adding rows to one doesn't shift another
+    return np.random.default_rng([seed, zlib.crc32(stream.encode())])
+
+
+def _chunks(n: int) -> Iterator[int]:
+    for start in range(0, n, CHUNK_ROWS):
+        yield min(CHUNK_ROWS, n - start)
+
+
+def _days(rng: np.random.Generator, size: int) -> np.ndarray:
+    # busier on weekdays, slowly growing over the two years
+    days = rng.integers(0, DAYS, size * 2)
+    weekday = (START_DATE.weekday() + days) % 7
+    keep = rng.random(size * 2) < np.where(weekday < 5, 1.0, 0.45) * (0.6 + 0.4 * days / DAYS)
+    days = days[keep]
+    while len(days) < size:         # top up (rare: keep ~70%)
+        days = np.concatenate([days, rng.integers(0, DAYS, size - len(days))])
+    return days[:size]
+
+
+def _menu_picks(rng: np.random.Generator, size: int) -> np.ndarray:
+    return rng.choice(len(MENU_ITEMS), size, p=_MENU_WEIGHTS)
+
+
+def transaction_rows(n: int, seed: int = 42) -> Iterator[List[tuple]]:
+    rng = _rng(seed, "transactions")
+    customer_names = np.array([f"Customer {i:05d}" for i in range(CUSTOMERS)], dtype=object)
+    for size in _chunks(n):
+        day = _days(rng, size)
+        pick = _menu_picks(rng, size)
+        qty = rng.integers(1, 4, size)
+        price = _MENU_PRICES[pick] * qty
+        cost = np.round(price * rng.uniform(0.3, 0.6, size), 2)
+        # a long tail: a few regulars spend most; ~10% of sales are anonymous
+        customer = customer_names[(rng.random(size) ** 3 * CUSTOMERS).astype(np.int64)]
+        customer[rng.random(size) < 0.1] = None
+        yield list(zip(_ISO_DAYS[day].tolist(), _MENU_NAMES[pick].tolist(), _MENU_CATEGORIES[pick].tolist(),
+                       price.astype(float).tolist(), cost.tolist(), customer.tolist()))
+
+
+def expense_rows(n: int, seed: int = 42) -> Iterator[List[tuple]]:
+    rng = _rng(seed, "expenses")
+    for size in _chunks(n):
+        day = rng.integers(0, DAYS, size)
+        amount = np.round(rng.lognormal(7.5, 1.0, size), 2)
+        yield list(zip(_ISO_DAYS[day].tolist(), amount.tolist()))
+
+
+def order_rows(n: int, seed: int = 42, first_order_id: int = 1) -> Iterator[Tuple[List[tuple], List[tuple]]]:
+    """
+    n orders of 1-6 lines; yields (orders rows with explicit ids, order_items rows).
+    created_at is UTC with breakfast, lunch (the rush) and dinner peaks.
+    """
+    rng = _rng(seed, "orders")
+    order_id = first_order_id
+    modes = np.array(PAYMENT_MODES, dtype=object)
+    for size in _chunks(n):
+        day = _days(rng, size)
+        peak = rng.choice([8.5, 13.0, 20.0], size, p=[0.25, 0.55, 0.2])     # local time, IST
+        minutes = np.clip(rng.normal(peak * 60, 45, size), 0, 24 * 60 - 1).astype(np.int64) - 330
+        ids = np.arange(order_id, order_id + size)
+        lines_per_order = rng.integers(1, 7, size)
+        n_lines = int(lines_per_order.sum())
+        line_order = np.repeat(ids, lines_per_order)
+        pick = _menu_picks(rng, n_lines)
+        qty = rng.integers(1, 4, n_lines)
+        paise = _MENU_PRICES[pick] * 100
+        totals = np.bincount(line_order - order_id, weights=qty * paise, minlength=size).astype(np.int64)
+        created = [(datetime.combine(START_DATE, datetime.min.time())
+                    + timedelta(days=int(d), minutes=int(m))).strftime("%Y-%m-%d %H:%M:%S")
+                   for d, m in zip(day, minutes)]
+        headers = list(zip(ids.tolist(), [f"bench-{i}" for i in ids.tolist()], totals.tolist(),
+                           modes[rng.integers(0, 3, size)].tolist(), created))
+        lines = list(zip(line_order.tolist(), _MENU_IDS[pick].tolist(), _MENU_NAMES[pick].tolist(),
+                         qty.tolist(), paise.tolist()))
+        order_id += size
+        yield headers, lines
+
+
+def _canteen_quantities(rng: np.random.Generator, size: int) -> Tuple[np.ndarray, np.ndarray]:
+    prepared = rng.integers(20, 201, size)
+    consumed = np.minimum(prepared, np.round(prepared * rng.beta(8, 2, size))).astype(np.int64)
+    return prepared, consumed
+
+
+def canteen_record_rows(n: int, seed: int = 42, canteens: int = CANTEENS) -> Iterator[List[tuple]]:
+    """daily_records rows: (date, canteen_id, meal_id, dish_id, prepared, consumed); dish_id = menu position + 1."""
+    rng = _rng(seed, "canteen_records")
+    for size in _chunks(n):
+        day = _days(rng, size)
+        pick = _menu_picks(rng, size)
+        prepared, consumed = _canteen_quantities(rng, size)
+        yield list(zip(_ISO_DAYS[day].tolist(), rng.integers(1, canteens + 1, size).tolist(),
+                       (_MENU_MEAL[pick] + 1).tolist(), (pick + 1).tolist(), prepared.tolist(), consumed.tolist()))
+
+
+def canteen_csv_rows(n: int, seed: int = 42) -> Iterator[List[tuple]]:
+    """canteen_data.csv rows: (date, dish_name, quantity_prepared, quantity_consumed)."""
+    rng = _rng(seed, "canteen_csv")
+    for size in _chunks(n):
+        day = _days(rng, size)
+        pick = _menu_picks(rng, size)
+        prepared, consumed = _canteen_quantities(rng, size)
+        yield list(zip(_ISO_DAYS[day].tolist(), _MENU_NAMES[pick].tolist(), prepared.tolist(), consumed.tolist()))
+
+
+def listing_rows(n: int, seed: int = 42, available: float = 0.3) -> Iterator[List[tuple]]:
+    """(item_name, qty_kg, lat, lng, is_urgent, status); `available` of them still AVAILABLE."""
+    rng = _rng(seed, "surplus_listings")
+    weights = np.array([c[2] for c in CITIES], dtype=float)
+    centres = np.array([(c[0], c[1]) for c in CITIES])
+    spreads = np.array([c[3] for c in CITIES]) / KM_PER_DEGREE
+    statuses = np.array(["AVAILABLE", "CLAIMED", "COLLECTED"], dtype=object)
+    for size in _chunks(n):
+        city = rng.choice(len(CITIES), size, p=weights / weights.sum())
+        offset = rng.normal(0, 1, (size, 2)) * spreads[city, None]
+        lat, lng = (centres[city] + offset).T
+        status = np.where(rng.random(size) < available, 0, rng.integers(1, 3, size))
+        yield list(zip(_MENU_NAMES[_menu_picks(rng, size)].tolist(), np.round(rng.uniform(1, 40, size), 1).tolist(),
+                       lat.tolist(), lng.tolist(), (rng.random(size) < 0.2).astype(int).tolist(),
+                       statuses[status].tolist()))
+
+
+def carts(n: int, seed: int = 42, max_lines: int = 6, min_lines: int = 1) -> List[List[dict]]:
+    """n checkout carts of min_lines..max_lines distinct menu items, in the /api/checkout request format."""
+    rng = _rng(seed, "carts")
+    result = []
+    for size in rng.integers(min_lines, max_lines + 1, n).tolist():
+        pick = rng.choice(len(MENU_ITEMS), size, replace=False, p=_MENU_WEIGHTS)
+        qty = rng.integers(1, 4, size)
+        result.append([{"id": int(item_id), "qty": int(q)} for item_id, q in zip(_MENU_IDS[pick].tolist(), qty.tolist())])
+    return result
+
+
+# ---- writers ----
+POS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS menu_items (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    price_in_paise INTEGER NOT NULL CHECK (price_in_paise >= 0),
+    category TEXT,
+    stock INTEGER NOT NULL DEFAULT 50 CHECK (stock >= 0),
+    is_available INTEGER DEFAULT 1
+);
+CREATE TABLE IF NOT EXISTS orders (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    order_uuid TEXT UNIQUE,
+    total_amount_in_paise INTEGER NOT NULL,
+    payment_mode TEXT NOT NULL,
+    order_status TEXT DEFAULT 'COMPLETED',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS order_items (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    order_id INTEGER NOT NULL,
+    menu_item_id INTEGER NOT NULL,
+    item_name TEXT NOT NULL,
+    quantity INTEGER NOT NULL CHECK (quantity > 0),
+    price_at_sale_in_paise INTEGER NOT NULL,
+    FOREIGN KEY(order_id) REFERENCES orders(id),
+    FOREIGN KEY(menu_item_id) REFERENCES menu_items(id)
+);
+CREATE TABLE IF NOT EXISTS expenses (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    date TEXT NOT NULL,
+    expense REAL NOT NULL
+);
+"""
+CANTEEN_SCHEMA = """
+CREATE TABLE IF NOT EXISTS canteen (
+    canteen_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    canteen_name TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meals (
+    meal_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    meal_name TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS dishes (
+    dish_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    dish_name TEXT NOT NULL,
+    price_per_unit REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS daily_records (
+    record_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    date TEXT NOT NULL,
+    canteen_id INTEGER,
+    meal_id INTEGER,
+    dish_id INTEGER,
+    quantity_prepared INTEGER,
+    quantity_consumed INTEGER,
+    order_id TEXT,
+    special_event TEXT,
+    FOREIGN KEY (canteen_id) REFERENCES canteen(canteen_id),
+    FOREIGN KEY (meal_id) REFERENCES meals(meal_id),
+    FOREIGN KEY (dish_id) REFERENCES dishes(dish_id)
+);
+"""
+FOODIQ_SCHEMA = """
+CREATE TABLE IF NOT EXISTS menu_items (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT UNIQUE NOT NULL
+);
+CREATE TABLE IF NOT EXISTS threshold_configs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    item_name TEXT REFERENCES menu_items(name),
+    warn_limit REAL NOT NULL,
+    auto_notify BOOLEAN DEFAULT 1,
+    UNIQUE(item_name)
+);
+CREATE TABLE IF NOT EXISTS surplus_listings (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    item_name TEXT,
+    qty_kg REAL,
+    lat REAL,
+    lng REAL,
+    is_urgent BOOLEAN DEFAULT 0,
+    status TEXT DEFAULT 'AVAILABLE',
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+"""
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    if os.path.exists(path):
+        raise FileExistsError(path)
+    conn = sqlite3.connect(path, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=OFF")
+    return conn
+
+
+def _insert(conn: sqlite3.Connection, sql: str, chunks) -> None:
+    conn.execute("BEGIN")
+    for rows in chunks:
+        conn.executemany(sql, rows)
+    conn.commit()
+
+
+def write_pos_db(path: str, transactions: int = 0, expenses: int = 0, orders: int = 0, seed: int = 42,
+                 stock: int = 50) -> None:
+    """
+    pos_system.db with the seed.py menu (every item at `stock`), the business
+    tables and POS order history. Orders predate the capture trigger, as on a
+    database that had history before sales_projection was installed.
+    """
+    from business_stats import TRANSACTIONS_SCHEMA, ensure_date_indexes
+    from business_summaries import ensure_summary_schema
+    from ingest_transactions import INSERT_SQL
+    from menu_catalog import ensure_catalog_schema
+    from sales_projection import ensure_projection_schema
+
+    conn = _connect(path)
+    try:
+        conn.executescript(POS_SCHEMA + TRANSACTIONS_SCHEMA + ";")
+        conn.executemany("INSERT INTO menu_items (id, name, price_in_paise, category, stock, is_available) "
+                         "VALUES (?, ?, ?, ?, ?, 1)",
+                         [(item_id, name, price * 100, category, stock) for item_id, name, price, category in MENU_ITEMS])
+        _insert(conn, INSERT_SQL, transaction_rows(transactions, seed))
+        _insert(conn, "INSERT INTO expenses (date, expense) VALUES (?, ?)", expense_rows(expenses, seed))
+        conn.execute("BEGIN")
+        for headers, lines in order_rows(orders, seed):
+            conn.executemany("INSERT INTO orders (id, order_uuid, total_amount_in_paise, payment_mode, created_at) "
+                             "VALUES (?, ?, ?, ?, ?)", headers)
+            conn.executemany("INSERT INTO order_items (order_id, menu_item_id, item_name, quantity, price_at_sale_in_paise) "
+                             "VALUES (?, ?, ?, ?, ?)", lines)
+        conn.commit()
+        ensure_catalog_schema(conn)
+        ensure_projection_schema(conn)
+        ensure_summary_schema(conn)
+        ensure_date_indexes(conn)
+    finally:
+        conn.close()
+
+
+def write_transactions_csv(path: str, n: int, seed: int = 42) -> None:
+    with open(path, "w", newline="") as f:
+        out = csv.writer(f)
+        out.writerow(["date", "item", "category", "price", "cost", "customer"])
+        for rows in transaction_rows(n, seed):
+            out.writerows(rows)
+
+
+def write_canteen_csv(path: str, n: int, seed: int = 42) -> None:
+    with open(path, "w", newline="") as f:
+        out = csv.writer(f)
+        out.writerow(["date", "dish_name", "quantity_prepared", "quantity_consumed"])
+        for rows in canteen_csv_rows(n, seed):
+            out.writerows(rows)
+
+
+def write_canteen_db(path: str, n: int, seed: int = 42, canteens: int = CANTEENS) -> None:
+    """canteen.db as database.py creates it; dishes are the seed.py menu."""
+    from canteen_source import DAILY_RECORDS_INDEXES
+
+    conn = _connect(path)
+    try:
+        conn.executescript(CANTEEN_SCHEMA)
+        conn.executemany("INSERT INTO canteen (canteen_id, canteen_name) VALUES (?, ?)",
+                         [(i, f"Canteen {i}") for i in range(1, canteens + 1)])
+        conn.executemany("INSERT INTO meals (meal_id, meal_name) VALUES (?, ?)",
+                         [(i + 1, meal) for i, meal in enumerate(MEALS)])
+        conn.executemany("INSERT INTO dishes (dish_id, dish_name, price_per_unit) VALUES (?, ?, ?)",
+                         [(i + 1, name, float(price)) for i, (_, name, price, _) in enumerate(MENU_ITEMS)])
+        _insert(conn, "INSERT INTO daily_records (date, canteen_id, meal_id, dish_id, quantity_prepared, quantity_consumed) "
+                      "VALUES (?, ?, ?, ?, ?, ?)", canteen_record_rows(n, seed, canteens))
+        conn.executescript(DAILY_RECORDS_INDEXES)
+    finally:
+        conn.close()
+
+
+def write_foodiq_db(path: str, listings: int = 0, seed: int = 42) -> None:
+    """foodiq.db as init_db.py creates it, one threshold rule per menu item, plus listings."""
+    from nearby_listings import ensure_geo_schema
+    from surplus_claims import ensure_claim_schema
+    from surplus_engine import ensure_surplus_schema
+
+    rng = _rng(seed, "thresholds")
+    conn = _connect(path)
+    try:
+        conn.executescript(FOODIQ_SCHEMA)
+        conn.executemany("INSERT INTO menu_items (name) VALUES (?)", [(name,) for _, name, _, _ in MENU_ITEMS])
+        conn.executemany("INSERT INTO threshold_configs (item_name, warn_limit, auto_notify) VALUES (?, ?, ?)",
+                         [(name, float(limit), int(notify)) for (_, name, _, _), limit, notify
+                          in zip(MENU_ITEMS, rng.integers(20, 60, len(MENU_ITEMS)), rng.random(len(MENU_ITEMS)) < 0.8)])
+        _insert(conn, "INSERT INTO surplus_listings (item_name, qty_kg, lat, lng, is_urgent, status) "
+                      "VALUES (?, ?, ?, ?, ?, ?)", listing_rows(listings, seed))
+        ensure_surplus_schema(conn)
+        ensure_geo_schema(conn)
+        ensure_claim_schema(conn)
+    finally:
+        conn.close()
+
+
+# ---- cached datasets ----
+DATASETS = {
+    # kind: (file suffix, writer(path, n, seed))
+    "pos": (".db", lambda path, n, seed: write_pos_db(path, transactions=n, expenses=max(1, n // 100),
+                                                      orders=max(1, n // 4), seed=seed)),
+    "transactions_csv": (".csv", write_transactions_csv),
+    "canteen_csv": (".csv", write_canteen_csv),
+    "canteen": (".db", write_canteen_db),
+    "foodiq": (".db", lambda path, n, seed: write_foodiq_db(path, listings=n, seed=seed)),
+}
+
+
+def dataset(kind: str, n: int, seed: int = 42, data_dir: Optional[str] = None) -> str:
+    """Path of the (kind, n, seed) dataset, generating it on first use."""
+    suffix, writer = DATASETS[kind]
+    data_dir = data_dir or DEFAULT_DATA_DIR
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, f"{kind}-{n}-s{seed}-v{GENERATOR_VERSION}{suffix}")
+    if not os.path.exists(path):
+        tmp = path + ".partial"
+        for leftover in (tmp, tmp + "-wal", tmp + "-shm"):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+        writer(tmp, n, seed)
+        if suffix == ".db":
+            # fold the WAL in so the dataset is one self-contained file
+            conn = sqlite3.connect(tmp)
+            conn.execute("PRAGMA journal_mode=DELETE")
+            conn.close()
+        os.replace(tmp, path)
+    return path
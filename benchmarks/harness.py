@@ -0,0 +1,139 @@
+# benchmarks/harness.py
+"""
+Timing, result records and run metadata shared by the suites.
+
+A suite is a module with `run(cfg: Config) -> List[Dict]`. Each entry is a
+result() record:
+
+    {"suite": "aggregations", "name": "load_business_stats.last_30_days",
+     "rows": 100000, "unit": "ms", "value": 1.92, "better": "lower",
+     "runs": [1.95, 1.92, 1.90], "extra": {...}}
+
+(suite, name, rows) identifies a benchmark across runs, so results from two
+commits can be matched up by compare.py. `value` is the median of `runs`.
+"""
+import json
+import math
+import os
+import platform
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+RESULTS_FORMAT = 1
+
+
+class Config(NamedTuple):
+    rows: int                   # dataset scale (transactions / records / listings)
+    seed: int = 42
+    repeat: int = 5
+    data_dir: Optional[str] = None      # cached datasets (generators.DEFAULT_DATA_DIR)
+    work_dir: str = "."                 # scratch copies for suites that write
+    options: Optional[Dict[str, Any]] = None    # suite-specific, e.g. checkout {"mode": "group_commit"}
+
+
+def measure(fn: Callable[[], Any], repeat: int = 5, warmup: int = 1,
+            setup: Optional[Callable[[], Any]] = None) -> List[float]:
+    """
+    Runs fn() warmup + repeat times; returns the timed runs in milliseconds.
+    setup() runs untimed before every call (e.g. to restore a scratch copy).
+    """
+    runs = []
+    for i in range(warmup + repeat):
+        if setup is not None:
+            setup()
+        t0 = time.perf_counter()
+        fn()
+        elapsed = (time.perf_counter() - t0) * 1000.0
+        if i >= warmup:
+            runs.append(elapsed)
+    return runs
+
+
+def percentile(values: List[float], p: float) -> float:
+    """Nearest-rank percentile (p in 0..100) of values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = math.ceil(p / 100.0 * len(ordered))
+    return ordered[min(len(ordered), max(rank, 1)) - 1]
+
+
+def result(suite: str, name: str, rows: int, runs: List[float], unit: str = "ms",
+           better: str = "lower", **extra) -> Dict[str, Any]:
+    return {
+        "suite": suite,
+        "name": name,
+        "rows": rows,
+        "unit": unit,
+        "value": round(statistics.median(runs), 4) if runs else None,
+        "better": better,
+        "runs": [round(r, 4) for r in runs],
+        "extra": extra,
+    }
+
+
+def working_copy(src: str, work_dir: str, name: Optional[str] = None) -> str:
+    """Copies a cached dataset into work_dir (replacing any earlier copy) and returns the path."""
+    os.makedirs(work_dir, exist_ok=True)
+    dst = os.path.join(work_dir, name or os.path.basename(src))
+    for leftover in (dst + "-wal", dst + "-shm"):
+        if os.path.exists(leftover):
+            os.remove(leftover)
+    shutil.copyfile(src, dst)
+    return dst
+
+
+def _git(*args: str) -> Optional[str]:
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        out = subprocess.run(["git", *args], cwd=root, capture_output=True, text=True, timeout=30)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() if out.returncode == 0 else None
+
+
+def _version(module: str) -> Optional[str]:
+    try:
+        return __import__(module).__version__
+    except Exception:
+        return None
+
+
+def environment() -> Dict[str, Any]:
+    """What a result file was measured on: commit, interpreter, libraries, machine."""
+    status = _git("status", "--porcelain", "--untracked-files=no")
+    return {
+        "commit": _git("rev-parse", "HEAD"),
+        "dirty": bool(status) if status is not None else None,
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "numpy": _version("numpy"),
+        "pandas": _version("pandas"),
+        "flask": _version("flask"),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def run_isolated(suite: str, cfg: Config, env: Optional[Dict[str, str]] = None,
+                 timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+    """
+    Runs one suite in a fresh interpreter (`python -m benchmarks _suite ...`):
+    module-level state (connection pools, caches, app config read from the
+    environment at import time) never leaks from one suite into the next.
+    The child prints its results as JSON on the last line of stdout.
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    child_env = dict(os.environ, **(env or {}))
+    cmd = [sys.executable, "-m", "benchmarks", "_suite", suite, json.dumps(cfg._asdict())]
+    proc = subprocess.run(cmd, cwd=root, env=child_env, stdout=subprocess.PIPE, text=True, timeout=timeout)
+    if proc.returncode != 0:
+        raise RuntimeError(f"suite {suite} failed (exit {proc.returncode})")
+    lines = proc.stdout.strip().splitlines()
+    return json.loads(lines[-1]) if lines else []
@@ -0,0 +1,98 @@
+# benchmarks/loaders.py
+"""
+Loader benchmarks: getting rows out of SQLite / CSV and into the analytics
+structures.
+
+    business_stats.iter_transactions        streaming, bounded memory
+    business_stats.load_transactions_from_db  every row as a dict (<= MAX_LIST_ROWS)
+    ingest_transactions.ingest               transactions.csv -> empty database
+    StatisticsService.csv                    cold start from canteen_data.csv
+    StatisticsService.snapshot               restart from the binary snapshot
+    canteen_source.build_statistics          canteen.db daily_records, one process
+    sales_projection.backfill                order history -> transactions + sales_daily
+"""
+import os
+import shutil
+import sqlite3
+from typing import Any, Dict, List
+
+from benchmarks.generators import dataset
+from benchmarks.harness import Config, measure, result, working_copy
+
+SUITE = "loaders"
+# whole-table list loaders hold every row as a dict; skipped above this
+MAX_LIST_ROWS = 2_000_000
+
+
+def run(cfg: Config) -> List[Dict[str, Any]]:
+    from business_stats import iter_transactions, load_transactions_from_db
+    from canteen_source import build_statistics
+    from ingest_transactions import ingest
+    from sales_projection import enqueue_backfill, project_batch
+    from statistics_service import StatisticsService
+
+    n, repeat = cfg.rows, cfg.repeat
+    pos_db = dataset("pos", n, cfg.seed, cfg.data_dir)
+    results = []
+
+    def drain():
+        return sum(1 for _ in iter_transactions(pos_db))
+
+    results.append(result(SUITE, "iter_transactions", n, measure(drain, repeat)))
+    if n <= MAX_LIST_ROWS:
+        results.append(result(SUITE, "load_transactions_from_db", n,
+                              measure(lambda: load_transactions_from_db(pos_db), repeat)))
+
+    # ingest: a fresh, empty database every run
+    csv_path = dataset("transactions_csv", n, cfg.seed, cfg.data_dir)
+    target = os.path.join(cfg.work_dir, "ingest.db")
+
+    def fresh_target():
+        for path in (target, target + "-wal", target + "-shm"):
+            if os.path.exists(path):
+                os.remove(path)
+
+    reports = []
+    runs = measure(lambda: reports.append(ingest(csv_path, target, processes=1)), repeat, setup=fresh_target)
+    results.append(result(SUITE, "ingest_transactions", n, runs, rows_loaded=reports[-1].rows))
+    fresh_target()
+
+    # canteen_data.csv: full parse + aggregate, then the snapshot restart path
+    canteen_csv = working_copy(dataset("canteen_csv", n, cfg.seed, cfg.data_dir), cfg.work_dir, "canteen_data.csv")
+    results.append(result(SUITE, "StatisticsService.csv", n,
+                          measure(lambda: StatisticsService(canteen_csv), repeat)))
+    snapshot_dir = os.path.join(cfg.work_dir, "snapshot")
+    shutil.rmtree(snapshot_dir, ignore_errors=True)
+    StatisticsService(canteen_csv, snapshot_dir=snapshot_dir)     # writes the snapshot
+    svcs = []
+    runs = measure(lambda: svcs.append(StatisticsService(canteen_csv, snapshot_dir=snapshot_dir)), repeat)
+    results.append(result(SUITE, "StatisticsService.snapshot", n, runs, loaded_from=svcs[-1].loaded_from))
+    svcs.clear()
+
+    canteen_db = dataset("canteen", n, cfg.seed, cfg.data_dir)
+    results.append(result(SUITE, "canteen_source.build_statistics", n,
+                          measure(lambda: build_statistics(canteen_db, processes=1), repeat)))
+
+    # sales projection backfill of the POS order history (n // 4 orders)
+    projected = []
+
+    def restore():
+        working_copy(pos_db, cfg.work_dir, "projection.db")
+
+    def backfill():
+        conn = sqlite3.connect(os.path.join(cfg.work_dir, "projection.db"), isolation_level=None)
+        try:
+            enqueue_backfill(conn)
+            total = 0
+            while True:
+                batch = project_batch(conn)
+                if not batch:
+                    break
+                total += batch
+            projected.append(total)
+        finally:
+            conn.close()
+
+    runs = measure(backfill, repeat, setup=restore)
+    results.append(result(SUITE, "sales_projection.backfill", n, runs, order_lines=projected[-1]))
+    return results
@@ -1,31 +1,37 @@
 import os
-from flask import Blueprint, jsonify, current_app
-from business_stats import load_transactions_from_db, load_expenses_from_db, compute_business_stats
+from flask import Blueprint, jsonify, current_app, request
+from business_stats import load_business_stats, parse_stats_filter
+from response_cache import cached_json, sqlite_source
 
 business_bp = Blueprint("business", __name__)
 
 BASE_DIR = os.path.dirname(__file__)
-DB_PATH = os.path.join(BASE_DIR, "pos_system.db")   # ensure pos_system.db is here
+DB_PATH = os.environ.get("POS_DB") or os.path.join(BASE_DIR, "pos_system.db")   # ensure pos_system.db is here
 
 @business_bp.route("/api/business_stats")
+@cached_json(sources=[sqlite_source(DB_PATH)])
 def api_business_stats():
     """
     Returns the same JSON structure the UI expects.
+    Optional query parameters: from, to (YYYY-MM-DD, inclusive),
+    granularity (day, week or month buckets; default month) and category.
     """
     if not os.path.exists(DB_PATH):
         current_app.logger.error("pos_system.db not found at %s", DB_PATH)
         return jsonify({"error": "pos_system.db not found", "details": f"Expected at {DB_PATH}"}), 500
 
     try:
-        transactions = load_transactions_from_db(DB_PATH)
+        filters = parse_stats_filter(request.args)
+    except ValueError as e:
+        return jsonify({"error": "Invalid query parameter", "details": str(e)}), 400
+
+    # trigger-maintained daily summaries when installed, else the per-database
+    # incremental rollups (only rows added since the last call are scanned);
+    # date-bounded requests read only their range via the transactions.date index
+    try:
+        stats = load_business_stats(DB_PATH, filters=filters)
     except Exception as e:
         current_app.logger.exception("Failed to load transactions from DB")
         return jsonify({"error": "Failed to load transactions from DB", "details": str(e)}), 500
 
-    try:
-        expenses = load_expenses_from_db(DB_PATH)
-    except Exception:
-        expenses = []
-
-    stats = compute_business_stats(transactions, expenses)
     return jsonify(stats)
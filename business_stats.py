@@ -1,151 +1,408 @@
+import heapq
+import os
 import sqlite3
-from datetime import datetime, date
+import threading
+from datetime import date, timedelta
 from collections import defaultdict
-from statistics import mean
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Callable, Iterable, Iterator, Mapping, NamedTuple, Tuple
+
+from business_summaries import summaries_installed
+from date_normalizer import DateParser, DEFAULT_FORMATS
+from db_pool import get_pool
+
+# the transactions table these loaders read; created by ingest_transactions.py
+# and sales_projection.py
+TRANSACTIONS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS transactions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    date TEXT NOT NULL,
+    item TEXT NOT NULL,
+    category TEXT,
+    price REAL NOT NULL,
+    cost REAL NOT NULL,
+    customer TEXT
+)
+"""
 
 # ---- date helper ----
+# shared parser for one-off calls; the loaders build a fresh DateParser per load
+# so the column's format is detected once and the memo stays per-table
+_default_date_parser = DateParser(DEFAULT_FORMATS)
+
+
 def _ensure_date(value):
-    if value is None:
-        return None
-    if isinstance(value, date):
-        return value
-    if isinstance(value, datetime):
-        return value.date()
-    if isinstance(value, str):
-        for fmt in ("%Y-%m-%d", "%d-%m-%Y", "%Y/%m/%d", "%Y-%m-%d %H:%M:%S"):
-            try:
-                return datetime.strptime(value.strip(), fmt).date()
-            except Exception:
-                pass
-    # try numeric epoch (seconds)
+    return _default_date_parser(value)
+
+# ---- DB loaders ----
+def _clean(value, default: str) -> str:
+    # same normalization the loaders apply to item/category/customer
+    return (value or default).strip() if value is not None else default
+
+
+def _to_float(value) -> float:
     try:
-        iv = int(value)
-        return datetime.utcfromtimestamp(iv).date()
+        return float(value or 0)
     except Exception:
-        pass
-    return None
+        return 0.0
 
-# ---- DB loaders ----
-def load_transactions_from_db(db_path: str) -> List[Dict[str, Any]]:
+
+class Transaction:
     """
-    Expected (recommended) transactions table columns:
-      id, date, item, category, price, cost, customer
-    Returns list of dicts with keys: date (date object), item, category, price, cost, customer
+    Compact transaction row: __slots__ instead of a per-row dict, with the string
+    fields interned per load. Supports row["price"] like the dict rows, so
+    compute_business_stats consumes either representation.
     """
-    conn = sqlite3.connect(db_path)
-    conn.row_factory = sqlite3.Row
-    cur = conn.cursor()
+    __slots__ = ("date", "item", "category", "price", "cost", "customer")
 
-    # check columns present
-    cur.execute("PRAGMA table_info(transactions)")
-    cols = [r["name"] for r in cur.fetchall()]
+    # row["price"] -> row.price, resolved in C
+    __getitem__ = object.__getattribute__
 
-    required = ["date", "item", "category", "price", "cost", "customer"]
-    select_cols = [(c if c in cols else f"NULL as {c}") for c in required]
+    def __init__(self, date, item, category, price, cost, customer):
+        self.date = date
+        self.item = item
+        self.category = category
+        self.price = price
+        self.cost = cost
+        self.customer = customer
 
-    q = f"SELECT {', '.join(select_cols)} FROM transactions ORDER BY date ASC"
-    rows = []
-    try:
-        for r in cur.execute(q):
-            raw_date = r["date"]
-            d = _ensure_date(raw_date)
-            if d is None:
-                # skip unparsable dates (matches previous CSV behavior)
-                continue
-            try:
-                price = float(r["price"] or 0)
-            except Exception:
-                price = 0.0
-            try:
-                cost = float(r["cost"] or 0)
-            except Exception:
-                cost = 0.0
+    def as_dict(self) -> Dict[str, Any]:
+        return {k: getattr(self, k) for k in self.__slots__}
 
-            rows.append({
-                "date": d,
-                "item": (r["item"] or "").strip() if r["item"] is not None else "",
-                "category": (r["category"] or "Uncategorized").strip() if r["category"] is not None else "Uncategorized",
-                "price": price,
-                "cost": cost,
-                "customer": (r["customer"] or "Anonymous").strip() if r["customer"] is not None else "Anonymous"
-            })
-    finally:
-        conn.close()
 
-    return rows
+def iter_transactions(db_path: str, chunk_size: int = 10000, compact: bool = True,
+                      order_by_date: bool = False) -> Iterator[Any]:
+    """
+    Streams transactions with fetchmany(chunk_size), so memory stays bounded by one
+    chunk regardless of table size. Yields Transaction records (compact=True) or the
+    dicts load_transactions_from_db returns. Rows come in rowid order unless
+    order_by_date is set, which makes SQLite sort the whole table first.
+    """
+    with get_pool(db_path).reader() as conn:
+        cur = conn.cursor()
+
+        # check columns present
+        cur.execute("PRAGMA table_info(transactions)")
+        cols = [r[1] for r in cur.fetchall()]
+
+        required = ["date", "item", "category", "price", "cost", "customer"]
+        select_cols = [(c if c in cols else f"NULL as {c}") for c in required]
+
+        q = f"SELECT {', '.join(select_cols)} FROM transactions"
+        if order_by_date:
+            q += " ORDER BY date ASC"
+        cur.execute(q)
+
+        parse_date = DateParser(DEFAULT_FORMATS)   # detects the column format, memoizes strings
+        strings = {}    # interning table for item/category/customer
+        intern = strings.setdefault
+        while True:
+            chunk = cur.fetchmany(chunk_size)
+            if not chunk:
+                break
+            for raw_date, item, category, price, cost, customer in chunk:
+                d = parse_date(raw_date)
+                if d is None:
+                    # skip unparsable dates (matches previous CSV behavior)
+                    continue
+                item = _clean(item, "")
+                item = intern(item, item)
+                category = _clean(category, "Uncategorized")
+                category = intern(category, category)
+                customer = _clean(customer, "Anonymous")
+                customer = intern(customer, customer)
+                if compact:
+                    yield Transaction(d, item, category, _to_float(price), _to_float(cost), customer)
+                else:
+                    yield {
+                        "date": d,
+                        "item": item,
+                        "category": category,
+                        "price": _to_float(price),
+                        "cost": _to_float(cost),
+                        "customer": customer
+                    }
+
+
+def load_transactions_from_db(db_path: str) -> List[Dict[str, Any]]:
+    """
+    Expected (recommended) transactions table columns:
+      id, date, item, category, price, cost, customer
+    Returns list of dicts with keys: date (date object), item, category, price, cost, customer
+    For large tables prefer iter_transactions(), which does not materialize the list.
+    """
+    return list(iter_transactions(db_path, compact=False, order_by_date=True))
 
 
 def load_expenses_from_db(db_path: str) -> List[Dict[str, Any]]:
     """
     Expected (optional) expenses table: id, date, expense
     """
-    conn = sqlite3.connect(db_path)
-    conn.row_factory = sqlite3.Row
-    cur = conn.cursor()
+    with get_pool(db_path).reader() as conn:
+        cur = conn.cursor()
+        cur.row_factory = sqlite3.Row
 
-    # if table missing or malformed, return empty list
-    try:
+        # if table missing or malformed, return empty list
+        try:
+            cur.execute("PRAGMA table_info(expenses)")
+            cols = [r["name"] for r in cur.fetchall()]
+            if not cols:
+                return []
+            select_cols = [(c if c in cols else f"NULL as {c}") for c in ("date", "expense")]
+            q = f"SELECT {', '.join(select_cols)} FROM expenses ORDER BY date ASC"
+            parse_date = DateParser(DEFAULT_FORMATS)
+            rows = []
+            for r in cur.execute(q):
+                d = parse_date(r["date"])
+                if d is None:
+                    continue
+                try:
+                    expense = float(r["expense"] or 0)
+                except Exception:
+                    expense = 0.0
+                rows.append({"date": d, "expense": expense})
+            return rows
+        except Exception:
+            return []
+
+
+def iter_expenses(db_path: str, chunk_size: int = 10000) -> Iterator[Dict[str, Any]]:
+    """Streaming counterpart of load_expenses_from_db (same rows, no ordering, bounded memory)."""
+    with get_pool(db_path).reader() as conn:
+        cur = conn.cursor()
         cur.execute("PRAGMA table_info(expenses)")
-        cols = [r["name"] for r in cur.fetchall()]
+        cols = [r[1] for r in cur.fetchall()]
         if not cols:
-            conn.close()
-            return []
+            return
         select_cols = [(c if c in cols else f"NULL as {c}") for c in ("date", "expense")]
-        q = f"SELECT {', '.join(select_cols)} FROM expenses ORDER BY date ASC"
-        rows = []
-        for r in cur.execute(q):
-            d = _ensure_date(r["date"])
-            if d is None:
-                continue
-            try:
-                expense = float(r["expense"] or 0)
-            except Exception:
-                expense = 0.0
-            rows.append({"date": d, "expense": expense})
-        conn.close()
-        return rows
-    except Exception:
-        conn.close()
-        return []
+        cur.execute(f"SELECT {', '.join(select_cols)} FROM expenses")
+        parse_date = DateParser(DEFAULT_FORMATS)
+        while True:
+            chunk = cur.fetchmany(chunk_size)
+            if not chunk:
+                break
+            for raw_date, expense in chunk:
+                d = parse_date(raw_date)
+                if d is None:
+                    continue
+                yield {"date": d, "expense": _to_float(expense)}
+
+
+def stream_business_stats(db_path: str, chunk_size: int = 10000) -> Dict[str, Any]:
+    """
+    compute_business_stats over streamed compact rows: peak memory is one fetch chunk
+    plus the rollups, independent of the number of transactions.
+    """
+    return compute_business_stats(iter_transactions(db_path, chunk_size=chunk_size),
+                                  iter_expenses(db_path, chunk_size=chunk_size))
 
 
 # ---- computation (returns JSON-serializable primitives) ----
-def compute_business_stats(transactions: List[Dict[str, Any]], expenses: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+TOP_PRODUCTS = 20
+TOP_CUSTOMERS = 12
+
+
+def _month_key(d: date) -> int:
+    # integer month bucket: sorts like "YYYY-MM" without a strftime per row
+    return d.year * 12 + d.month - 1
+
+
+def _month_label(key: int) -> str:
+    return f"{key // 12:04d}-{key % 12 + 1:02d}"
+
+
+# ---- request filters: date range, granularity, category ----
+GRANULARITIES = ("day", "week", "month")
+
+# the from/to range scans; only used while every date is ISO YYYY-MM-DD (see _dates_are_iso)
+DATE_INDEXES = {
+    "transactions": "CREATE INDEX IF NOT EXISTS idx_transactions_date ON transactions (date)",
+    "expenses": "CREATE INDEX IF NOT EXISTS idx_expenses_date ON expenses (date)",
+}
+
+
+class StatsFilter(NamedTuple):
+    start: Optional[date] = None        # inclusive
+    end: Optional[date] = None          # inclusive
+    granularity: str = "month"          # period_labels buckets: day, week (labelled by its Monday) or month
+    category: Optional[str] = None
+
+    @property
+    def unbounded(self) -> bool:
+        return self.start is None and self.end is None and self.category is None
+
+
+def parse_stats_filter(args: Mapping[str, str]) -> StatsFilter:
+    """
+    StatsFilter from query parameters: from, to (YYYY-MM-DD, inclusive),
+    granularity (day/week/month, default month) and category.
+    Raises ValueError on a malformed value.
+    """
+    bounds = []
+    for name in ("from", "to"):
+        value = (args.get(name) or "").strip()
+        try:
+            bounds.append(date.fromisoformat(value) if value else None)
+        except ValueError:
+            raise ValueError(f"'{name}' must be a date in YYYY-MM-DD format, got {value!r}")
+    start, end = bounds
+    if start and end and start > end:
+        raise ValueError("'from' is after 'to'")
+    granularity = (args.get("granularity") or "month").strip().lower()
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"'granularity' must be one of {', '.join(GRANULARITIES)}, got {granularity!r}")
+    category = (args.get("category") or "").strip() or None
+    return StatsFilter(start, end, granularity, category)
+
+
+def ensure_date_indexes(conn: sqlite3.Connection) -> None:
+    """Creates the date indexes behind the from/to range scans (idempotent; missing tables are skipped)."""
+    for table, sql in DATE_INDEXES.items():
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone():
+            conn.execute(sql)
+    conn.commit()
+
+
+# ISO YYYY-MM-DD, optionally followed by a time
+ISO_DATE_GLOB = "[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]*"
+_iso_checked: Dict[Tuple[str, str], int] = {}   # (db, table) -> rowid up to which every date is ISO
+_iso_lock = threading.Lock()
+
+
+def _dates_are_iso(cur, db_path: str, table: str) -> bool:
+    """
+    True if every non-NULL table.date starts with an ISO date, so a from/to
+    filter can be a text range in SQL. Otherwise the callers scan every row
+    and filter on the parsed dates (DD-MM-YYYY or YYYY/MM/DD values don't
+    sort by date), until date_normalizer.migrate_date_columns has run.
+    Checked rows are remembered by rowid, so a request only checks rows
+    appended since; like BusinessStatsAggregator, rows are assumed append-only.
+    """
+    key = (os.path.abspath(db_path), table)
+    try:
+        max_id = cur.execute(f"SELECT COALESCE(MAX(rowid), 0) FROM {table}").fetchone()[0]
+    except sqlite3.OperationalError:
+        return True     # no such table: nothing to filter
+    with _iso_lock:
+        checked = _iso_checked.get(key, 0)
+    if checked > max_id:
+        checked = 0     # table was rebuilt
+    if checked == max_id:
+        return True
+    cur.execute(f"SELECT 1 FROM {table} WHERE rowid > ? AND rowid <= ? AND date NOT GLOB ? LIMIT 1",
+                (checked, max_id, ISO_DATE_GLOB))
+    iso = cur.fetchone() is None
+    with _iso_lock:
+        if iso:
+            _iso_checked[key] = max_id
+        else:
+            _iso_checked.pop(key, None)
+    return iso
+
+
+def _date_range(column: str, filters: StatsFilter) -> Tuple[str, Tuple[str, ...]]:
+    """
+    SQL condition + params restricting column to [start, end]. The upper bound
+    is exclusive on the next day, so "YYYY-MM-DD hh:mm:ss" values on the last
+    day still match and the comparison stays a plain index range.
+    """
+    conds, params = [], []
+    if filters.start is not None:
+        conds.append(f"{column} >= ?")
+        params.append(filters.start.isoformat())
+    if filters.end is not None:
+        conds.append(f"{column} < ?")
+        params.append((filters.end + timedelta(days=1)).isoformat())
+    return (" AND ".join(conds) or "1 = 1"), tuple(params)
+
+
+def _in_range(d: date, filters: StatsFilter) -> bool:
+    return (filters.start is None or d >= filters.start) and (filters.end is None or d <= filters.end)
+
+
+def _period_key(d: date, granularity: str) -> int:
+    if granularity == "month":
+        return _month_key(d)
+    if granularity == "week":
+        return d.toordinal() - d.weekday()
+    return d.toordinal()
+
+
+def _period_label(key: int, granularity: str) -> str:
+    if granularity == "month":
+        return _month_label(key)
+    return date.fromordinal(key).isoformat()
+
+
+def compute_business_stats(transactions: Iterable[Any], expenses: Optional[Iterable[Dict[str, Any]]] = None) -> Dict[str, Any]:
+    """
+    Single pass over transactions: totals, monthly/category/product/customer
+    rollups are all accumulated in the same loop. Accepts a list of dicts, a list
+    of Transaction records, or a generator such as iter_transactions().
+    """
     if expenses is None:
         expenses = []
 
-    total_revenue = sum(t["price"] for t in transactions)
-    total_cost = sum(t["cost"] for t in transactions)
+    count = 0
+    total_revenue = 0.0
+    total_cost = 0.0
+    monthly = {}                # month key (year*12 + month-1) -> revenue
+    revenue_by_category = {}
+    product_map = {}            # item -> [revenue, cost]
+    customer_map = {}
+
+    month_of = {}               # date -> month key; a canteen has few distinct dates
+    for t in transactions:
+        price = t["price"]
+        cost = t["cost"]
+        count += 1
+        total_revenue += price
+        total_cost += cost
+
+        d = t["date"]
+        key = month_of.get(d)
+        if key is None:
+            key = month_of[d] = _month_key(d)
+        monthly[key] = monthly.get(key, 0.0) + price
+
+        category = t["category"]
+        revenue_by_category[category] = revenue_by_category.get(category, 0.0) + price
+
+        product = product_map.get(t["item"])
+        if product is None:
+            product = product_map[t["item"]] = [0.0, 0.0]
+        product[0] += price
+        product[1] += cost
+
+        customer = t["customer"]
+        customer_map[customer] = customer_map.get(customer, 0.0) + price
+
     total_expenses = sum(e.get("expense", 0) for e in expenses)
+    avg_order_value = (total_revenue / count) if count else 0.0
+
+    return _finalize_stats(total_revenue, total_cost, total_expenses, avg_order_value,
+                           monthly, revenue_by_category, product_map, customer_map)
 
+
+def _finalize_stats(total_revenue: float, total_cost: float, total_expenses: float,
+                    avg_order_value: float, periods: Dict[int, float],
+                    revenue_by_category: Dict[str, float], product_map: Dict[str, List[float]],
+                    customer_map: Dict[str, float], granularity: str = "month") -> Dict[str, Any]:
+    """
+    Builds the JSON payload the dashboard expects from already-aggregated rollups.
+    Shared by compute_business_stats and BusinessStatsAggregator so both return
+    the exact same shape. periods maps _period_key(date, granularity) -> revenue.
+    """
     net_profit = total_revenue - total_cost - total_expenses
     profit_margin = (net_profit / total_revenue * 100) if total_revenue else 0.0
-    avg_order_value = mean([t["price"] for t in transactions]) if transactions else 0.0
 
-    # revenue over time (monthly)
-    monthly = defaultdict(float)
-    for t in transactions:
-        key = t["date"].strftime("%Y-%m")
-        monthly[key] += t["price"]
-    period_labels = sorted(monthly.keys())
-    period_values = [monthly[k] for k in period_labels]
-
-    # revenue by category
-    revenue_by_category = defaultdict(float)
-    for t in transactions:
-        revenue_by_category[t["category"]] += t["price"]
-
-    # top products by profit
-    product_map = defaultdict(lambda: {"rev": 0.0, "cost": 0.0})
-    for t in transactions:
-        product_map[t["item"]]["rev"] += t["price"]
-        product_map[t["item"]]["cost"] += t["cost"]
+    period_keys = sorted(periods)
+    period_labels = [_period_label(k, granularity) for k in period_keys]
+    period_values = [periods[k] for k in period_keys]
 
+    # bounded top-k: heap selection instead of sorting every product/customer
+    best_products = heapq.nlargest(TOP_PRODUCTS, product_map.items(), key=lambda kv: kv[1][0] - kv[1][1])
     top_products = []
-    for name, d in product_map.items():
-        rev = d["rev"]
-        cost = d["cost"]
+    for name, (rev, cost) in best_products:
         profit = rev - cost
         margin = (profit / rev * 100) if rev else 0.0
         top_products.append({
@@ -154,14 +411,9 @@ def compute_business_stats(transactions: List[Dict[str, Any]], expenses: Optiona
             "profit": profit,
             "margin": margin
         })
-    top_products = sorted(top_products, key=lambda x: x["profit"], reverse=True)[:20]
 
-    # top customers by spend
-    customer_map = defaultdict(float)
-    for t in transactions:
-        customer_map[t["customer"]] += t["price"]
-    top_customers = [{"name": n, "spend": s} for n, s in customer_map.items()]
-    top_customers = sorted(top_customers, key=lambda x: x["spend"], reverse=True)[:12]
+    best_customers = heapq.nlargest(TOP_CUSTOMERS, customer_map.items(), key=lambda kv: kv[1])
+    top_customers = [{"name": n, "spend": s} for n, s in best_customers]
 
     return {
         "total_revenue": total_revenue,
@@ -175,3 +427,343 @@ def compute_business_stats(transactions: List[Dict[str, Any]], expenses: Optiona
         "top_products": top_products,
         "top_customers": top_customers
     }
+
+
+# ---- incremental aggregation (SQL push-down + rowid watermark) ----
+class BusinessStatsAggregator:
+    """
+    Maintains the business-stats rollups for one database.
+
+    The first call folds the whole table in; every later call only folds rows whose
+    rowid (== transactions.id / expenses.id) is above the last watermark. The per-row
+    work is pushed into SQLite with a GROUP BY over (date, item, category, customer),
+    so Python only sees one row per distinct combination and parses each distinct
+    date string once.
+
+    Rows are assumed to be append-only. A dropped/re-created table is detected
+    (the row at the watermark disappears or changes) and triggers a full rebuild;
+    in-place UPDATE/DELETE of already-folded rows needs an explicit reset().
+    """
+
+    def __init__(self, db_path: str, parse_date: Optional[Callable[[Any], Optional[date]]] = None):
+        self.db_path = db_path
+        self.parse_date = parse_date or DateParser(DEFAULT_FORMATS)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        self._txn_watermark = 0
+        self._txn_fingerprint = None
+        self._exp_watermark = 0
+        self._exp_fingerprint = None
+        self._count = 0
+        self._revenue = 0.0
+        self._cost = 0.0
+        self._expenses = 0.0
+        self._daily = defaultdict(float)    # date -> revenue; bucketed per granularity in stats()
+        self._by_category = defaultdict(float)
+        self._products = defaultdict(lambda: [0.0, 0.0])
+        self._customers = defaultdict(float)
+        self._dates = {}    # raw date value -> date (or None if unparsable)
+
+    def _date_of(self, raw):
+        try:
+            return self._dates[raw]
+        except KeyError:
+            d = self._dates[raw] = self.parse_date(raw)
+            return d
+
+    @staticmethod
+    def _columns(cur, table: str) -> List[str]:
+        cur.execute(f"PRAGMA table_info({table})")
+        return [r[1] for r in cur.fetchall()]
+
+    @staticmethod
+    def _fingerprint(cur, table: str, select: str, rowid: int):
+        if not rowid:
+            return None
+        cur.execute(f"SELECT {select} FROM {table} WHERE rowid = ?", (rowid,))
+        row = cur.fetchone()
+        return tuple(row) if row is not None else None
+
+    def _table_changed(self, cur, table: str, select: str, watermark: int, fingerprint, max_id: int) -> bool:
+        if max_id < watermark:
+            return True
+        return self._fingerprint(cur, table, select, watermark) != fingerprint
+
+    def _fold_transactions(self, cur) -> None:
+        cols = self._columns(cur, "transactions")
+        if not cols:
+            raise sqlite3.OperationalError("no such table: transactions")
+        required = ["date", "item", "category", "price", "cost", "customer"]
+        select_cols = ", ".join((c if c in cols else f"NULL as {c}") for c in required)
+
+        cur.execute("SELECT COALESCE(MAX(rowid), 0) FROM transactions")
+        max_id = cur.fetchone()[0]
+        if self._table_changed(cur, "transactions", select_cols, self._txn_watermark, self._txn_fingerprint, max_id):
+            # table was rebuilt underneath us: start over
+            self.reset()
+        if max_id == self._txn_watermark:
+            return
+
+        q = f"""
+            SELECT date, item, category, customer, SUM(price), SUM(cost), COUNT(*)
+            FROM (SELECT {select_cols} FROM transactions WHERE rowid > ? AND rowid <= ?)
+            GROUP BY date, item, category, customer
+        """
+        for raw_date, item, category, customer, price, cost, n in cur.execute(q, (self._txn_watermark, max_id)):
+            d = self._date_of(raw_date)
+            if d is None:
+                # skip unparsable dates (matches load_transactions_from_db)
+                continue
+            price = float(price or 0)
+            cost = float(cost or 0)
+            self._count += n
+            self._revenue += price
+            self._cost += cost
+            self._daily[d] += price
+            self._by_category[_clean(category, "Uncategorized")] += price
+            product = self._products[_clean(item, "")]
+            product[0] += price
+            product[1] += cost
+            self._customers[_clean(customer, "Anonymous")] += price
+
+        self._txn_watermark = max_id
+        self._txn_fingerprint = self._fingerprint(cur, "transactions", select_cols, max_id)
+
+    def _fold_expenses(self, cur) -> None:
+        cols = self._columns(cur, "expenses")
+        if not cols:
+            # expenses table is optional
+            self._expenses = 0.0
+            self._exp_watermark = 0
+            self._exp_fingerprint = None
+            return
+        select_cols = ", ".join((c if c in cols else f"NULL as {c}") for c in ("date", "expense"))
+
+        cur.execute("SELECT COALESCE(MAX(rowid), 0) FROM expenses")
+        max_id = cur.fetchone()[0]
+        if self._table_changed(cur, "expenses", select_cols, self._exp_watermark, self._exp_fingerprint, max_id):
+            self._expenses = 0.0
+            self._exp_watermark = 0
+        if max_id == self._exp_watermark:
+            return
+
+        q = f"""
+            SELECT date, SUM(expense)
+            FROM (SELECT {select_cols} FROM expenses WHERE rowid > ? AND rowid <= ?)
+            GROUP BY date
+        """
+        for raw_date, expense in cur.execute(q, (self._exp_watermark, max_id)):
+            if self._date_of(raw_date) is None:
+                continue
+            self._expenses += float(expense or 0)
+
+        self._exp_watermark = max_id
+        self._exp_fingerprint = self._fingerprint(cur, "expenses", select_cols, max_id)
+
+    def refresh(self) -> None:
+        """Folds in rows appended since the previous call."""
+        with get_pool(self.db_path).reader() as conn:
+            cur = conn.cursor()
+            # one read transaction so both tables are folded from the same snapshot
+            cur.execute("BEGIN")
+            self._fold_transactions(cur)
+            self._fold_expenses(cur)
+
+    def stats(self, granularity: str = "month") -> Dict[str, Any]:
+        """Refreshes from the watermark and returns the compute_business_stats payload."""
+        with self._lock:
+            self.refresh()
+            avg_order_value = (self._revenue / self._count) if self._count else 0.0
+            periods = defaultdict(float)
+            for d, revenue in self._daily.items():
+                periods[_period_key(d, granularity)] += revenue
+            return _finalize_stats(self._revenue, self._cost, self._expenses, avg_order_value,
+                                   periods, self._by_category, self._products, self._customers, granularity)
+
+
+_aggregators: Dict[Any, BusinessStatsAggregator] = {}
+_aggregators_lock = threading.Lock()
+
+
+def get_aggregator(db_path: str, parse_date: Optional[Callable[[Any], Optional[date]]] = None) -> BusinessStatsAggregator:
+    """Returns the process-wide aggregator for db_path (one per database/date parser)."""
+    key = (os.path.abspath(db_path), parse_date)
+    with _aggregators_lock:
+        agg = _aggregators.get(key)
+        if agg is None:
+            agg = BusinessStatsAggregator(db_path, parse_date=parse_date)
+            _aggregators[key] = agg
+        return agg
+
+
+# ---- daily summary tables (business_summaries.py) ----
+def summary_business_stats(db_path: str, parse_date: Optional[Callable[[Any], Optional[date]]] = None,
+                           filters: StatsFilter = StatsFilter()) -> Optional[Dict[str, Any]]:
+    """
+    compute_business_stats payload read from the trigger-maintained daily summary
+    tables: the work is proportional to days x distinct items/customers, not to the
+    number of transactions, and from/to is a range on each table's (day, ...)
+    primary key. Returns None if the summaries aren't installed. The summaries
+    don't split items/customers by category, so filters.category is ignored here
+    (load_business_stats sends those requests to range_business_stats).
+    """
+    parse_date = parse_date or DateParser(DEFAULT_FORMATS)
+    with get_pool(db_path).reader() as conn:
+        cur = conn.cursor()
+        # one read transaction so every summary comes from the same snapshot
+        cur.execute("BEGIN")
+        if not summaries_installed(cur):
+            return None
+        # `day` is the raw date: a text range only while the raw dates are all ISO
+        in_range, range_params = "1 = 1", ()
+        if _dates_are_iso(cur, db_path, "transactions"):
+            in_range, range_params = _date_range("day", filters)
+        exp_range, exp_params = "1 = 1", ()
+        if _dates_are_iso(cur, db_path, "expenses"):
+            exp_range, exp_params = _date_range("day", filters)
+
+        periods = {}    # raw day -> period key (None if unparsable or outside the range)
+        cur.execute(f"SELECT DISTINCT day FROM daily_category_sales WHERE {in_range}", range_params)
+        for (day,) in cur.fetchall():
+            d = parse_date(day)
+            in_filter = d is not None and _in_range(d, filters)
+            periods[day] = _period_key(d, filters.granularity) if in_filter else None
+        # rows on unparsable days are skipped everywhere (matches load_transactions_from_db)
+        bad_days = [day for day, key in periods.items() if key is None]
+        where, params = f"WHERE {in_range}", range_params
+        if bad_days:
+            where += f" AND day NOT IN ({','.join('?' * len(bad_days))})"
+            params += tuple(bad_days)
+
+        count = 0
+        total_revenue = 0.0
+        total_cost = 0.0
+        by_period = defaultdict(float)
+        by_category = defaultdict(float)
+        cur.execute(f"SELECT day, category, revenue, cost, lines FROM daily_category_sales {where}", params)
+        for day, category, revenue, cost, lines in cur:
+            count += lines
+            total_revenue += revenue
+            total_cost += cost
+            by_period[periods[day]] += revenue
+            by_category[category] += revenue
+
+        cur.execute(f"SELECT item, SUM(revenue), SUM(cost) FROM daily_item_sales {where} GROUP BY item", params)
+        products = {item: [revenue, cost] for item, revenue, cost in cur}
+        cur.execute(f"SELECT customer, SUM(spend) FROM daily_customer_spend {where} GROUP BY customer", params)
+        customers = dict(cur.fetchall())
+
+        total_expenses = 0.0
+        for day, expense in cur.execute(f"SELECT day, expense FROM daily_expenses WHERE {exp_range}", exp_params):
+            d = parse_date(day)
+            if d is not None and _in_range(d, filters):
+                total_expenses += expense
+
+    avg_order_value = (total_revenue / count) if count else 0.0
+    return _finalize_stats(total_revenue, total_cost, total_expenses, avg_order_value,
+                           by_period, by_category, products, customers, filters.granularity)
+
+
+# ---- bounded scans of the raw tables ----
+def range_business_stats(db_path: str, parse_date: Optional[Callable[[Any], Optional[date]]] = None,
+                         filters: StatsFilter = StatsFilter()) -> Dict[str, Any]:
+    """
+    compute_business_stats payload for filters straight from transactions/expenses:
+    from/to become a range scan on the date indexes (DATE_INDEXES) while every date
+    is ISO (_dates_are_iso), else a full scan filtered on parsed dates. The rows in
+    range are grouped by (date, item, category, customer) in SQLite, as in
+    BusinessStatsAggregator. Expenses have no category, so only the dates filter them.
+    """
+    parse_date = parse_date or DateParser(DEFAULT_FORMATS)
+    count = 0
+    total_revenue = 0.0
+    total_cost = 0.0
+    by_period = defaultdict(float)
+    by_category = defaultdict(float)
+    products = defaultdict(lambda: [0.0, 0.0])
+    customers = defaultdict(float)
+    total_expenses = 0.0
+    with get_pool(db_path).reader() as conn:
+        cur = conn.cursor()
+        # one read transaction so both tables come from the same snapshot
+        cur.execute("BEGIN")
+        cur.execute("PRAGMA table_info(transactions)")
+        cols = [r[1] for r in cur.fetchall()]
+        if not cols:
+            raise sqlite3.OperationalError("no such table: transactions")
+        required = ["date", "item", "category", "price", "cost", "customer"]
+        select_cols = ", ".join((c if c in cols else f"NULL as {c}") for c in required)
+        in_range, range_params = "1 = 1", ()
+        if _dates_are_iso(cur, db_path, "transactions"):
+            in_range, range_params = _date_range("date", filters)
+
+        periods = {}    # raw date -> period key (None if unparsable or outside the range)
+        q = f"""
+            SELECT date, item, category, customer, SUM(price), SUM(cost), COUNT(*)
+            FROM (SELECT {select_cols} FROM transactions WHERE {in_range})
+            GROUP BY date, item, category, customer
+        """
+        for raw_date, item, category, customer, price, cost, n in cur.execute(q, range_params):
+            try:
+                key = periods[raw_date]
+            except KeyError:
+                d = parse_date(raw_date)
+                key = None
+                if d is not None and _in_range(d, filters):
+                    key = _period_key(d, filters.granularity)
+                periods[raw_date] = key
+            if key is None:
+                continue
+            category = _clean(category, "Uncategorized")
+            if filters.category is not None and category != filters.category:
+                continue
+            price = float(price or 0)
+            cost = float(cost or 0)
+            count += n
+            total_revenue += price
+            total_cost += cost
+            by_period[key] += price
+            by_category[category] += price
+            product = products[_clean(item, "")]
+            product[0] += price
+            product[1] += cost
+            customers[_clean(customer, "Anonymous")] += price
+
+        cur.execute("PRAGMA table_info(expenses)")
+        cols = [r[1] for r in cur.fetchall()]
+        if cols:
+            select_cols = ", ".join((c if c in cols else f"NULL as {c}") for c in ("date", "expense"))
+            in_range, range_params = "1 = 1", ()
+            if _dates_are_iso(cur, db_path, "expenses"):
+                in_range, range_params = _date_range("date", filters)
+            q = f"SELECT date, SUM(expense) FROM (SELECT {select_cols} FROM expenses WHERE {in_range}) GROUP BY date"
+            for raw_date, expense in cur.execute(q, range_params):
+                d = parse_date(raw_date)
+                if d is not None and _in_range(d, filters):
+                    total_expenses += float(expense or 0)
+
+    avg_order_value = (total_revenue / count) if count else 0.0
+    return _finalize_stats(total_revenue, total_cost, total_expenses, avg_order_value,
+                           by_period, by_category, products, customers, filters.granularity)
+
+
+def load_business_stats(db_path: str, parse_date: Optional[Callable[[Any], Optional[date]]] = None,
+                        filters: Optional[StatsFilter] = None) -> Dict[str, Any]:
+    """
+    Business stats for filters (all-time, monthly by default): the daily summary
+    tables when installed, else the incremental aggregator for all-time requests
+    and a bounded range scan for the rest. Category filters always take the
+    range scan.
+    """
+    filters = filters or StatsFilter()
+    stats = None
+    if filters.category is None:
+        stats = summary_business_stats(db_path, parse_date, filters)
+    if stats is None:
+        if filters.unbounded:
+            stats = get_aggregator(db_path, parse_date=parse_date).stats(filters.granularity)
+        else:
+            stats = range_business_stats(db_path, parse_date, filters)
+    return stats
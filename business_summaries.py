@@ -0,0 +1,332 @@
+# business_summaries.py
+"""
+Pre-aggregated daily summary tables for the business stats, kept current by
+SQLite triggers.
+
+    daily_item_sales       (day, item)      revenue, cost, lines
+    daily_category_sales   (day, category)  revenue, cost, lines
+    daily_customer_spend   (day, customer)  spend, lines
+    daily_expenses         (day)            expense, lines
+
+`day` is the raw transactions.date / expenses.date value; readers parse
+each distinct day once (see business_stats.summary_business_stats).
+item/category/customer get the same cleanup the loaders apply (trim,
+"Uncategorized" / "Anonymous" for empty values). INSERT, UPDATE and DELETE
+triggers on transactions and expenses apply each row change to the
+summaries in the writer's own transaction, so readers never see a summary
+that disagrees with a committed row.
+
+POS orders reach the summaries as transactions rows (sales_projection.py
+projects order_items into transactions). There is deliberately no
+trigger on order_items, because it would count every sale twice.
+
+    python business_summaries.py install pos_system.db   # tables + triggers, filled from existing rows
+    python business_summaries.py rebuild pos_system.db   # recompute from raw rows
+    python business_summaries.py check pos_system.db     # compare summaries with raw rows (exit 1 on drift)
+"""
+import argparse
+import sqlite3
+import sys
+from typing import Any, Dict, List, Tuple
+
+SUMMARY_TABLES = ("daily_item_sales", "daily_category_sales", "daily_customer_spend", "daily_expenses")
+
+SUMMARY_TABLES_SCHEMA = """
+CREATE TABLE IF NOT EXISTS daily_item_sales (
+    day TEXT NOT NULL,
+    item TEXT NOT NULL,
+    revenue REAL NOT NULL DEFAULT 0,
+    cost REAL NOT NULL DEFAULT 0,
+    lines INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, item)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS daily_category_sales (
+    day TEXT NOT NULL,
+    category TEXT NOT NULL,
+    revenue REAL NOT NULL DEFAULT 0,
+    cost REAL NOT NULL DEFAULT 0,
+    lines INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, category)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS daily_customer_spend (
+    day TEXT NOT NULL,
+    customer TEXT NOT NULL,
+    spend REAL NOT NULL DEFAULT 0,
+    lines INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, customer)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS daily_expenses (
+    day TEXT NOT NULL PRIMARY KEY,
+    expense REAL NOT NULL DEFAULT 0,
+    lines INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+"""
+
+# ---- cleanup expressions (SQL twins of business_stats._clean / _to_float) ----
+_WS = "' ' || char(9) || char(10) || char(13)"
+
+
+def _text(col: str, default: str) -> str:
+    return f"CASE WHEN COALESCE({col}, '') = '' THEN '{default}' ELSE TRIM({col}, {_WS}) END"
+
+
+def _amount(col: str) -> str:
+    return f"CAST(COALESCE({col}, 0) AS REAL)"
+
+
+def _columns(r: str) -> Dict[str, str]:
+    """Summary values for one transactions row alias (NEW, OLD or a table alias)."""
+    return {
+        "day": f"{r}.date",
+        "item": f"TRIM(COALESCE({r}.item, ''), {_WS})",
+        "category": _text(f"{r}.category", "Uncategorized"),
+        "customer": _text(f"{r}.customer", "Anonymous"),
+        "price": _amount(f"{r}.price"),
+        "cost": _amount(f"{r}.cost"),
+    }
+
+
+# (summary table, key column, [(summary value column, source column)])
+_TRANSACTION_SUMMARIES = (
+    ("daily_item_sales", "item", [("revenue", "price"), ("cost", "cost")]),
+    ("daily_category_sales", "category", [("revenue", "price"), ("cost", "cost")]),
+    ("daily_customer_spend", "customer", [("spend", "price")]),
+)
+
+
+def _add_row(r: str) -> List[str]:
+    c = _columns(r)
+    out = []
+    for table, key, values in _TRANSACTION_SUMMARIES:
+        names = ", ".join(v for v, _ in values)
+        exprs = ", ".join(c[src] for _, src in values)
+        updates = ", ".join(f"{v} = {v} + excluded.{v}" for v, _ in values)
+        out.append(f"INSERT INTO {table} (day, {key}, {names}, lines) VALUES ({c['day']}, {c[key]}, {exprs}, 1) "
+                   f"ON CONFLICT (day, {key}) DO UPDATE SET {updates}, lines = lines + 1;")
+    return out
+
+
+def _remove_row(r: str) -> List[str]:
+    c = _columns(r)
+    out = []
+    for table, key, values in _TRANSACTION_SUMMARIES:
+        updates = ", ".join(f"{v} = {v} - {c[src]}" for v, src in values)
+        where = f"day = {c['day']} AND {key} = {c[key]}"
+        out.append(f"UPDATE {table} SET {updates}, lines = lines - 1 WHERE {where};")
+        out.append(f"DELETE FROM {table} WHERE {where} AND lines <= 0;")
+    return out
+
+
+def _trigger(name: str, event: str, table: str, body: List[str]) -> Tuple[str, str]:
+    statements = "\n    ".join(body)
+    return name, f"CREATE TRIGGER IF NOT EXISTS {name} AFTER {event} ON {table}\nBEGIN\n    {statements}\nEND;"
+
+
+_EXPENSE_ADD = ("INSERT INTO daily_expenses (day, expense, lines) VALUES (NEW.date, {amount}, 1) "
+                "ON CONFLICT (day) DO UPDATE SET expense = expense + excluded.expense, lines = lines + 1;"
+                ).format(amount=_amount("NEW.expense"))
+_EXPENSE_REMOVE = [
+    f"UPDATE daily_expenses SET expense = expense - {_amount('OLD.expense')}, lines = lines - 1 WHERE day = OLD.date;",
+    "DELETE FROM daily_expenses WHERE day = OLD.date AND lines <= 0;",
+]
+
+# table -> [(trigger name, CREATE TRIGGER statement)]
+SUMMARY_TRIGGERS = {
+    "transactions": [
+        _trigger("transactions_summary_insert", "INSERT", "transactions", _add_row("NEW")),
+        _trigger("transactions_summary_delete", "DELETE", "transactions", _remove_row("OLD")),
+        _trigger("transactions_summary_update", "UPDATE OF date, item, category, price, cost, customer",
+                 "transactions", _remove_row("OLD") + _add_row("NEW")),
+    ],
+    "expenses": [
+        _trigger("expenses_summary_insert", "INSERT", "expenses", [_EXPENSE_ADD]),
+        _trigger("expenses_summary_delete", "DELETE", "expenses", _EXPENSE_REMOVE),
+        _trigger("expenses_summary_update", "UPDATE OF date, expense", "expenses", _EXPENSE_REMOVE + [_EXPENSE_ADD]),
+    ],
+}
+
+
+# ---- set-based folds (rebuild, bulk loads) ----
+def _grouped_transactions(key: str, values, after_rowid: int = 0) -> str:
+    c = _columns("t")
+    sums = ", ".join(f"SUM({c[src]})" for _, src in values)
+    return (f"SELECT {c['day']}, {c[key]}, {sums}, COUNT(*) FROM transactions t "
+            f"WHERE t.rowid > {int(after_rowid)} GROUP BY 1, 2")
+
+
+def _grouped_expenses(after_rowid: int = 0) -> str:
+    return (f"SELECT e.date, SUM({_amount('e.expense')}), COUNT(*) FROM expenses e "
+            f"WHERE e.rowid > {int(after_rowid)} GROUP BY 1")
+
+
+def fold_transactions_sql(after_rowid: int = 0) -> List[str]:
+    """
+    Statements adding every transactions row with rowid > after_rowid to the
+    summaries. For bulk loads that insert with the triggers dropped (see
+    ingest_transactions.py) and for rebuild(). The raw rows are scanned and
+    grouped once into a temp table; the three summaries are derived from that.
+    """
+    c = _columns("t")
+    out = [
+        "DROP TABLE IF EXISTS temp.summary_fold",
+        f"CREATE TEMP TABLE summary_fold AS "
+        f"SELECT {c['day']} AS day, {c['item']} AS item, {c['category']} AS category, "
+        f"{c['customer']} AS customer, SUM({c['price']}) AS price, SUM({c['cost']}) AS cost, COUNT(*) AS lines "
+        f"FROM transactions t WHERE t.rowid > {int(after_rowid)} GROUP BY 1, 2, 3, 4",
+    ]
+    for table, key, values in _TRANSACTION_SUMMARIES:
+        names = ", ".join(v for v, _ in values)
+        sums = ", ".join(f"SUM({src})" for _, src in values)
+        updates = ", ".join(f"{v} = {v} + excluded.{v}" for v, _ in values)
+        out.append(f"INSERT INTO {table} (day, {key}, {names}, lines) "
+                   f"SELECT day, {key}, {sums}, SUM(lines) FROM temp.summary_fold WHERE true GROUP BY 1, 2 "
+                   f"ON CONFLICT (day, {key}) DO UPDATE SET {updates}, lines = lines + excluded.lines")
+    out.append("DROP TABLE temp.summary_fold")
+    return out
+
+
+def fold_expenses_sql(after_rowid: int = 0) -> List[str]:
+    return [f"INSERT INTO daily_expenses (day, expense, lines) {_grouped_expenses(after_rowid)} "
+            f"ON CONFLICT (day) DO UPDATE SET expense = expense + excluded.expense, lines = lines + excluded.lines"]
+
+
+def _table_exists(conn: sqlite3.Connection, table: str) -> bool:
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone() is not None
+
+
+def summaries_installed(conn: sqlite3.Connection) -> bool:
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'trigger' "
+                        "AND name = 'transactions_summary_insert'").fetchone() is not None
+
+
+def _rebuild(conn: sqlite3.Connection) -> None:
+    for table in SUMMARY_TABLES:
+        conn.execute(f"DELETE FROM {table}")
+    if _table_exists(conn, "transactions"):
+        for sql in fold_transactions_sql():
+            conn.execute(sql)
+    if _table_exists(conn, "expenses"):
+        for sql in fold_expenses_sql():
+            conn.execute(sql)
+
+
+def ensure_summary_schema(conn: sqlite3.Connection) -> bool:
+    """
+    Creates the summary tables and triggers (idempotent). On first install the
+    summaries are filled from the existing rows in the same transaction, so no
+    concurrent write is missed or counted twice. Returns True if it installed.
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if summaries_installed(conn):
+            conn.rollback()
+            return False
+        for statement in SUMMARY_TABLES_SCHEMA.split(";"):
+            if statement.strip():
+                conn.execute(statement)
+        for table, triggers in SUMMARY_TRIGGERS.items():
+            if _table_exists(conn, table):
+                for _, sql in triggers:
+                    conn.execute(sql)
+        _rebuild(conn)
+        conn.commit()
+        return True
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def rebuild(conn: sqlite3.Connection) -> None:
+    """Recomputes every summary from the raw tables in one write transaction."""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        _rebuild(conn)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def _close(a: float, b: float) -> bool:
+    return abs(a - b) <= 1e-6 * max(1.0, abs(a), abs(b))
+
+
+def check(conn: sqlite3.Connection, samples: int = 5) -> Dict[str, Dict[str, Any]]:
+    """
+    Compares every summary row with a fresh GROUP BY over the raw rows, in one
+    read transaction. Per table: rows compared, missing (raw group without a
+    summary row), extra (summary row without raw rows), different (values
+    disagree), plus a few sample keys.
+    """
+    report = {}
+    conn.execute("BEGIN")
+    try:
+        sources: List[Tuple[str, str, str]] = []
+        if _table_exists(conn, "transactions"):
+            for table, key, values in _TRANSACTION_SUMMARIES:
+                cols = ", ".join([v for v, _ in values] + ["lines"])
+                sources.append((table, f"SELECT day, {key}, {cols} FROM {table}",
+                                _grouped_transactions(key, values)))
+        if _table_exists(conn, "expenses"):
+            sources.append(("daily_expenses", "SELECT day, expense, lines FROM daily_expenses", _grouped_expenses()))
+
+        for table, summary_sql, raw_sql in sources:
+            n_key = 2 if table != "daily_expenses" else 1
+            summary = {tuple(r[:n_key]): r[n_key:] for r in conn.execute(summary_sql)}
+            raw = {tuple(r[:n_key]): r[n_key:] for r in conn.execute(raw_sql)}
+            missing = [k for k in raw if k not in summary]
+            extra = [k for k in summary if k not in raw]
+            different = [k for k, v in raw.items()
+                         if k in summary and not all(_close(a, b) for a, b in zip(v, summary[k]))]
+            report[table] = {
+                "rows": len(raw),
+                "missing": len(missing),
+                "extra": len(extra),
+                "different": len(different),
+                "samples": [list(k) for k in (missing + extra + different)[:samples]],
+            }
+    finally:
+        conn.rollback()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Daily summary tables for the business stats.")
+    parser.add_argument("command", choices=("install", "rebuild", "check"))
+    parser.add_argument("db_path", nargs="?", default="pos_system.db")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db_path, isolation_level=None)
+    try:
+        if args.command == "install":
+            print("installed" if ensure_summary_schema(conn) else "already installed")
+        elif args.command == "rebuild":
+            if not summaries_installed(conn):
+                ensure_summary_schema(conn)
+            else:
+                rebuild(conn)
+            print("rebuilt " + ", ".join(f"{t} ({conn.execute(f'SELECT COUNT(*) FROM {t}').fetchone()[0]} rows)"
+                                         for t in SUMMARY_TABLES))
+        else:
+            if not summaries_installed(conn):
+                print("summaries not installed; run `python business_summaries.py install`")
+                sys.exit(2)
+            report = check(conn)
+            drift = False
+            for table, r in report.items():
+                bad = r["missing"] + r["extra"] + r["different"]
+                drift = drift or bad > 0
+                print(f"{table}: {r['rows']} groups, {r['missing']} missing, {r['extra']} extra, "
+                      f"{r['different']} different" + (f"  e.g. {r['samples']}" if bad else ""))
+            if drift:
+                print("summaries disagree with raw rows; run `python business_summaries.py rebuild`")
+                sys.exit(1)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
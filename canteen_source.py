@@ -0,0 +1,230 @@
+# canteen_source.py
+"""
+SQLite data source for StatisticsService: canteen.db daily_records joined
+with dishes (and meals), for any number of canteens.
+
+Work is partitioned by canteen_id and date window; each partition is one
+indexed range query on daily_records(canteen_id, date). Partitions are packed
+round-robin into a few tasks per worker process. A worker runs its range
+queries and reduces the rows to StatisticsService.aggregate() form, one row
+per (canteen_id, date, dish_name), so the parent only concatenates and
+re-sums small partials and never sees raw rows:
+
+    stats = build_statistics("canteen.db", processes=8, per_canteen=True)
+    stats.combined.overall_summary()        # all canteens
+    stats.by_canteen[3].daily_stats()       # one canteen
+
+    python canteen_source.py canteen.db --processes 8 --from 2024-01-01
+
+This is a command-line tool and library, not part of the web API: api.py
+serves canteen_data.csv through a refreshing StatisticsService, while the
+services built here are a snapshot (from_aggregated() has no refresh()), so
+a server would keep answering with the numbers from its startup.
+
+Date filtering compares daily_records.date as text, so dates must be ISO
+YYYY-MM-DD (date_normalizer.migrate_date_columns(db, [("daily_records", "date")])
+rewrites other formats).
+"""
+import argparse
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+from collections.abc import Mapping
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+from urllib.parse import quote
+
+import pandas as pd
+
+from statistics_service import StatisticsService
+
+DAILY_RECORDS_INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_daily_records_canteen_date ON daily_records (canteen_id, date);
+CREATE INDEX IF NOT EXISTS idx_daily_records_dish_date ON daily_records (dish_id, date);
+"""
+DEFAULT_WINDOW_DAYS = 366
+TASKS_PER_PROCESS = 4       # a few tasks per worker for load balancing, not one per partition
+
+PARTITION_SQL = """
+SELECT r.canteen_id, r.date, d.dish_name, r.quantity_prepared, r.quantity_consumed
+FROM daily_records r
+JOIN dishes d ON d.dish_id = r.dish_id
+{meal_join}
+WHERE r.canteen_id = ? AND r.date >= ? AND r.date < ?
+{meal_filter}
+"""
+COLUMNS = ["canteen_id", "date", "dish_name", "quantity_prepared", "quantity_consumed"]
+
+
+class Partition(NamedTuple):
+    canteen_id: int
+    start: str          # inclusive, YYYY-MM-DD
+    end: str            # inclusive, YYYY-MM-DD
+
+
+class Task(NamedTuple):
+    db_path: str
+    partitions: Tuple[Partition, ...]
+    meal: Optional[str]
+
+
+class CanteenServices(Mapping):
+    """
+    canteen_id -> StatisticsService, built from that canteen's partial on
+    first access. Materializing rollups for hundreds of canteens up front
+    costs far more than reading them when only a few are looked at.
+    """
+
+    def __init__(self, partials: Dict[int, pd.DataFrame], compact: bool = False):
+        self._partials = partials
+        self._compact = compact
+        self._services: Dict[int, StatisticsService] = {}
+
+    def __getitem__(self, canteen_id: int) -> StatisticsService:
+        svc = self._services.get(canteen_id)
+        if svc is None:
+            svc = StatisticsService.from_aggregated([self._partials[canteen_id]], compact=self._compact)
+            self._services[canteen_id] = svc
+        return svc
+
+    def __iter__(self):
+        return iter(self._partials)
+
+    def __len__(self):
+        return len(self._partials)
+
+
+class CanteenStats(NamedTuple):
+    combined: StatisticsService
+    by_canteen: CanteenServices
+    partitions: int
+    seconds: float
+
+
+def ensure_indexes(db_path: str) -> None:
+    """Creates the daily_records indexes this module's range queries rely on (idempotent)."""
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.executescript(DAILY_RECORDS_INDEXES)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _connect_ro(db_path: str) -> sqlite3.Connection:
+    return sqlite3.connect(f"file:{quote(db_path)}?mode=ro", uri=True)
+
+
+def plan_partitions(db_path: str, canteen_ids: Optional[Iterable[int]] = None,
+                    start: Optional[str] = None, end: Optional[str] = None,
+                    window_days: int = DEFAULT_WINDOW_DAYS) -> List[Partition]:
+    """One partition per (canteen, date window) that actually has rows."""
+    conn = _connect_ro(db_path)
+    try:
+        if canteen_ids is None:
+            canteen_ids = [row[0] for row in conn.execute("SELECT canteen_id FROM canteen ORDER BY canteen_id")]
+        bounds = []
+        for canteen_id in canteen_ids:
+            # two probes of the (canteen_id, date) index per canteen
+            first = conn.execute("SELECT MIN(date) FROM daily_records WHERE canteen_id = ?", (canteen_id,)).fetchone()[0]
+            last = conn.execute("SELECT MAX(date) FROM daily_records WHERE canteen_id = ?", (canteen_id,)).fetchone()[0]
+            if first is not None:
+                bounds.append((canteen_id, first, last))
+    finally:
+        conn.close()
+
+    partitions = []
+    for canteen_id, first, last in bounds:
+        lo = max(first, start) if start else first
+        hi = min(last, end) if end else last
+        if lo > hi:
+            continue
+        day = date.fromisoformat(lo[:10])
+        stop = date.fromisoformat(hi[:10])
+        while day <= stop:
+            window_end = min(day + timedelta(days=window_days - 1), stop)
+            partitions.append(Partition(canteen_id, day.isoformat(), window_end.isoformat()))
+            day = window_end + timedelta(days=1)
+    return partitions
+
+
+def aggregate_task(task: Task) -> pd.DataFrame:
+    """
+    Worker: one indexed range query per partition, then a single
+    StatisticsService.aggregate() keyed by canteen_id over all of them.
+    """
+    meal_join = meal_filter = ""
+    if task.meal:
+        meal_join = "JOIN meals m ON m.meal_id = r.meal_id"
+        meal_filter = "AND m.meal_name = ?"
+    sql = PARTITION_SQL.format(meal_join=meal_join, meal_filter=meal_filter)
+    rows = []
+    conn = _connect_ro(task.db_path)
+    try:
+        cur = conn.cursor()
+        for p in task.partitions:
+            # exclusive upper bound, so "YYYY-MM-DD hh:mm" values on the last day still match
+            next_day = (date.fromisoformat(p.end) + timedelta(days=1)).isoformat()
+            params = (p.canteen_id, p.start, next_day) + ((task.meal,) if task.meal else ())
+            rows.extend(cur.execute(sql, params).fetchall())
+    finally:
+        conn.close()
+    return StatisticsService.aggregate(pd.DataFrame(rows, columns=COLUMNS), keys=("canteen_id",))
+
+
+def build_statistics(db_path: str, canteen_ids: Optional[Iterable[int]] = None,
+                     start: Optional[str] = None, end: Optional[str] = None,
+                     processes: Optional[int] = None, window_days: int = DEFAULT_WINDOW_DAYS,
+                     meal: Optional[str] = None, per_canteen: bool = False,
+                     compact: bool = False) -> CanteenStats:
+    """
+    Partitions daily_records, aggregates the partitions in a process pool
+    (inline when processes == 1) and merges them into one StatisticsService,
+    plus one per canteen (built lazily) if per_canteen.
+    """
+    t0 = time.perf_counter()
+    partitions = plan_partitions(db_path, canteen_ids, start, end, window_days)
+    workers = processes or os.cpu_count() or 1
+    n_tasks = max(1, min(len(partitions), workers * TASKS_PER_PROCESS)) if workers > 1 else 1
+    # round-robin, so each task gets a similar mix of canteens and date windows
+    tasks = [Task(db_path, tuple(partitions[i::n_tasks]), meal) for i in range(n_tasks)]
+    if n_tasks == 1:
+        partials = [aggregate_task(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            partials = list(pool.map(aggregate_task, tasks))
+
+    combined = StatisticsService.from_aggregated(partials, compact=compact)
+    by_canteen = {}
+    if per_canteen and partials:
+        merged = pd.concat(partials, ignore_index=True)
+        by_canteen = {int(canteen_id): frame.drop(columns="canteen_id")
+                      for canteen_id, frame in merged.groupby("canteen_id", sort=True)}
+    return CanteenStats(combined, CanteenServices(by_canteen, compact), len(partitions), time.perf_counter() - t0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-canteen statistics from canteen.db daily_records.")
+    parser.add_argument("db_path", nargs="?", default="canteen.db")
+    parser.add_argument("--canteen", type=int, action="append", help="restrict to this canteen_id (repeatable)")
+    parser.add_argument("--from", dest="start", help="first date, YYYY-MM-DD")
+    parser.add_argument("--to", dest="end", help="last date, YYYY-MM-DD")
+    parser.add_argument("--meal", help="only this meal_name")
+    parser.add_argument("--processes", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--window-days", type=int, default=DEFAULT_WINDOW_DAYS)
+    parser.add_argument("--no-indexes", action="store_true", help="don't create the daily_records indexes")
+    args = parser.parse_args()
+
+    if not args.no_indexes:
+        ensure_indexes(args.db_path)
+    stats = build_statistics(args.db_path, args.canteen, args.start, args.end, args.processes,
+                             args.window_days, args.meal, per_canteen=True)
+    print(f"{stats.partitions} partitions, {len(stats.by_canteen)} canteens in {stats.seconds:.2f}s")
+    for canteen_id, svc in stats.by_canteen.items():
+        print(f"canteen {canteen_id}: {svc.overall_summary()}")
+    print(f"all canteens: {stats.combined.overall_summary()}")
+
+
+if __name__ == "__main__":
+    main()
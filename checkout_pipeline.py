@@ -0,0 +1,246 @@
+# checkout_pipeline.py
+"""
+Checkout write path for Billing_app.
+
+apply_checkout() does the whole order in a constant number of statements,
+whatever the cart size:
+
+  1. one SELECT ... WHERE id IN (...) for every cart item
+  2. one INSERT of the order header, already carrying its final total
+  3. one executemany of guarded stock decrements
+     (UPDATE ... WHERE id = ? AND stock >= ?), verified via rowcount
+  4. one executemany of the line items
+
+GroupCommitWriter optionally funnels concurrent checkouts through a single
+writer thread that applies a batch of orders inside one BEGIN IMMEDIATE
+transaction (one SAVEPOINT per order), so N terminals pay for one lock
+acquisition and one fsync instead of N. Each order is still all-or-nothing:
+a failing order is rolled back to its savepoint without affecting the
+others, and no caller gets a result before the batch has committed.
+"""
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class CheckoutError(Exception):
+    """Order rejected (invalid item, insufficient stock); maps to HTTP 409."""
+
+
+class CartError(ValueError):
+    """Malformed cart (missing or non-integer id/qty); maps to HTTP 400."""
+
+
+def parse_cart(cart: List[Dict[str, Any]]) -> List[Tuple[int, int]]:
+    """Cart JSON -> [(menu_item_id, qty)], dropping non-positive quantities."""
+    lines = []
+    for item in cart:
+        try:
+            # ids may arrive as "101" or 101: both are the same menu item
+            p_id = int(item['id'])
+            qty = int(item['qty'])
+        except (KeyError, TypeError, ValueError):
+            raise CartError(f"Invalid cart line: {item!r}")
+        if qty <= 0:
+            continue
+        lines.append((p_id, qty))
+    return lines
+
+
+def apply_checkout(conn: sqlite3.Connection, lines: List[Tuple[int, int]], payment_mode: str) -> Dict[str, Any]:
+    """
+    Writes one order. Must run inside a write transaction the caller owns
+    (BEGIN IMMEDIATE or a SAVEPOINT); raises CheckoutError and leaves rollback
+    to the caller.
+    """
+    cursor = conn.cursor()
+
+    # total quantity per item, so duplicate cart lines are checked against stock together
+    wanted = OrderedDict()
+    for p_id, qty in lines:
+        wanted[p_id] = wanted.get(p_id, 0) + qty
+
+    # 1. FETCH EVERY CART ITEM IN ONE QUERY
+    products = {}
+    if wanted:
+        placeholders = ",".join("?" * len(wanted))
+        cursor.execute(
+            f"SELECT id, name, price_in_paise, stock FROM menu_items WHERE id IN ({placeholders})",
+            tuple(wanted))
+        products = {row[0]: row for row in cursor.fetchall()}
+
+    total_paise = 0
+    for p_id, qty in wanted.items():
+        product = products.get(p_id)
+        if product is None:
+            raise CheckoutError(f"Item ID {p_id} invalid.")
+        if product[3] < qty:
+            raise CheckoutError(f"Stock Error: Only {product[3]} left for {product[1]}")
+        total_paise += product[2] * qty
+
+    # 2. ORDER HEADER, WRITTEN ONCE WITH ITS FINAL TOTAL
+    cursor.execute("""
+        INSERT INTO orders (order_uuid, total_amount_in_paise, payment_mode, order_status)
+        VALUES (?, ?, ?, 'COMPLETED')
+    """, (str(uuid.uuid4()), total_paise, payment_mode))
+    order_db_id = cursor.lastrowid
+
+    if wanted:
+        # 3. GUARDED BULK STOCK DEDUCTION
+        cursor.executemany(
+            "UPDATE menu_items SET stock = stock - ? WHERE id = ? AND stock >= ?",
+            [(qty, p_id, qty) for p_id, qty in wanted.items()])
+        if cursor.rowcount != len(wanted):
+            # someone else took the stock between our read and the update
+            raise CheckoutError("Stock Error: stock changed during checkout")
+
+        # 4. BULK LINE ITEMS
+        cursor.executemany("""
+            INSERT INTO order_items (order_id, menu_item_id, item_name, quantity, price_at_sale_in_paise)
+            VALUES (?, ?, ?, ?, ?)
+        """, [(order_db_id, p_id, products[p_id][1], qty, products[p_id][2]) for p_id, qty in lines])
+
+    return {
+        "orderId": order_db_id,
+        "total_paise": total_paise,
+        "items": dict(wanted),
+        "stock": {p_id: products[p_id][3] - qty for p_id, qty in wanted.items()},
+        # read in the same transaction, so it is the version of exactly these levels
+        "stock_version": _stock_version(cursor)
+    }
+
+
+def _stock_version(cursor: sqlite3.Cursor) -> Optional[int]:
+    # catalog_meta.stock_version, bumped by menu_catalog's trigger on every stock UPDATE
+    try:
+        row = cursor.execute("SELECT value FROM catalog_meta WHERE key = 'stock_version'").fetchone()
+    except sqlite3.OperationalError:
+        return None     # catalog schema not installed yet
+    return row[0] if row else None
+
+
+def checkout(conn: sqlite3.Connection, lines: List[Tuple[int, int]], payment_mode: str) -> Dict[str, Any]:
+    """One order in its own BEGIN IMMEDIATE transaction (the non-batched path)."""
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        result = apply_checkout(conn, lines, payment_mode)
+        conn.commit()
+        return result
+    except Exception:
+        conn.rollback()
+        raise
+
+
+# ==========================================
+# GROUP COMMIT
+# ==========================================
+class GroupCommitWriter:
+    """
+    Single writer thread that commits concurrent checkouts in batches.
+
+    submit() blocks until the caller's order has been committed (returns the
+    apply_checkout result) or rejected (raises). An order still queued after
+    `timeout` seconds is withdrawn and rejected; one already in a batch waits
+    for that batch's commit, so a rejection always means nothing was saved.
+    A batch is whatever is queued when the writer wakes up, topped up for at
+    most max_wait seconds, capped at max_batch orders.
+
+    `acquire` returns a context manager yielding the write connection for one
+    batch, e.g. db_pool.ConnectionPool.writer.
+    """
+
+    def __init__(self, acquire, max_batch: int = 64, max_wait: float = 0.002):
+        self._acquire = acquire
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="checkout-writer", daemon=True)
+        self._started = False
+        self._start_lock = threading.Lock()
+        self.batches = 0
+        self.orders = 0
+
+    def submit(self, lines: List[Tuple[int, int]], payment_mode: str, timeout: float = 30.0) -> Dict[str, Any]:
+        self._ensure_started()
+        fut: Future = Future()
+        self._queue.put((lines, payment_mode, fut))
+        try:
+            return fut.result(timeout=timeout)
+        except FutureTimeout:
+            if fut.cancel():
+                # never picked up: the writer skips cancelled futures
+                raise CheckoutError("Writer busy: checkout timed out in the queue, order not saved")
+            return fut.result()     # already in a batch; its commit decides
+
+    def _ensure_started(self) -> None:
+        with self._start_lock:
+            if not self._started:
+                self._thread.start()
+                self._started = True
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            # claim each future; submit() may have withdrawn (cancelled) it meanwhile
+            batch = [job for job in self._next_batch() if job[2].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            try:
+                with self._acquire() as conn:
+                    results = self._commit_batch(conn, batch)
+            except Exception as e:
+                # the batch transaction itself failed: nobody's order was saved
+                for _, _, fut in batch:
+                    fut.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.orders += len(batch)
+            for fut, result, error in results:
+                if error is not None:
+                    fut.set_exception(error)
+                else:
+                    fut.set_result(result)
+
+    @staticmethod
+    def _commit_batch(conn, batch):
+        results = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for i, (lines, payment_mode, fut) in enumerate(batch):
+                savepoint = f"order_{i}"
+                conn.execute(f"SAVEPOINT {savepoint}")
+                try:
+                    result = apply_checkout(conn, lines, payment_mode)
+                    conn.execute(f"RELEASE {savepoint}")
+                    results.append((fut, result, None))
+                except Exception as e:
+                    conn.execute(f"ROLLBACK TO {savepoint}")
+                    conn.execute(f"RELEASE {savepoint}")
+                    results.append((fut, None, e))
+            conn.commit()
+        except Exception:
+            try:
+                conn.rollback()
+            except sqlite3.Error:
+                pass
+            raise
+        return results
@@ -37,6 +37,14 @@ CREATE TABLE IF NOT EXISTS daily_records (
 )
 """)
 
+# per-canteen / per-dish date range scans (canteen_source.py)
+cursor.execute("""
+CREATE INDEX IF NOT EXISTS idx_daily_records_canteen_date ON daily_records (canteen_id, date)
+""")
+cursor.execute("""
+CREATE INDEX IF NOT EXISTS idx_daily_records_dish_date ON daily_records (dish_id, date)
+""")
+
 print("Database and tables created successfully!")
 conn.commit()
 conn.close()
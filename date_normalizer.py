@@ -0,0 +1,188 @@
+# date_normalizer.py
+"""
+Date normalization shared by the business-stats loaders.
+
+DateParser replaces the per-row strptime loop: it remembers which format the
+column uses (detected on the first value that parses), takes a fast path for
+ISO dates, memoizes repeated strings, and handles numeric epochs without
+raising/catching an exception per miss.
+
+migrate_date_columns() is the optional one-time rewrite of stored dates to
+canonical ISO (YYYY-MM-DD), after which SQLite can sort, range-scan and index
+them natively:
+
+    python date_normalizer.py pos_system.db
+    python date_normalizer.py pos_system.db --dry-run
+"""
+import argparse
+import sqlite3
+from datetime import datetime, date, timezone
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+DEFAULT_FORMATS = ("%Y-%m-%d", "%d-%m-%Y", "%Y/%m/%d", "%Y-%m-%d %H:%M:%S")
+
+# (table, column) pairs rewritten by migrate_date_columns
+DATE_COLUMNS = (("transactions", "date"), ("expenses", "date"))
+
+
+def _ambiguous(formats: Tuple[str, ...]) -> bool:
+    """True if some formats differ only in where %d and %m go."""
+    shapes = [fmt.replace("%d", "%?").replace("%m", "%?") for fmt in formats]
+    return len(set(shapes)) < len(shapes)
+
+
+class DateParser:
+    """
+    Callable date parser for one column/load: parser(value) -> date or None.
+
+    The format that last matched is tried first, so a column stored in e.g.
+    DD-MM-YYYY pays for one strptime per distinct value instead of a failed
+    attempt per format per row. Results are memoized by raw string.
+
+    If two formats differ only in day/month order (e.g. %m/%d/%Y and
+    %d/%m/%Y), "03/04/2024" matches both and the winner must not depend on
+    earlier input, so such format lists are always tried in the given order.
+    """
+
+    def __init__(self, formats: Iterable[str] = DEFAULT_FORMATS, epoch_fallback: bool = True,
+                 memo_size: int = 65536):
+        self.formats = tuple(formats)
+        self.epoch_fallback = epoch_fallback
+        self.memo_size = memo_size
+        self._iso = "%Y-%m-%d" in self.formats
+        self._iso_datetime = "%Y-%m-%d %H:%M:%S" in self.formats
+        self._detected = None   # format that parsed the column so far
+        self._reorder = not _ambiguous(self.formats)
+        self._memo: Dict[str, Optional[date]] = {}
+
+    @property
+    def detected_format(self) -> Optional[str]:
+        return self._detected
+
+    def __call__(self, value: Any) -> Optional[date]:
+        if value is None:
+            return None
+        if isinstance(value, datetime):
+            return value.date()
+        if isinstance(value, date):
+            return value
+        if isinstance(value, str):
+            try:
+                return self._memo[value]
+            except KeyError:
+                pass
+            d = self._parse_str(value.strip())
+            if len(self._memo) >= self.memo_size:
+                self._memo.clear()
+            self._memo[value] = d
+            return d
+        if self.epoch_fallback and isinstance(value, (int, float)) and not isinstance(value, bool):
+            return self._from_epoch(value)
+        return None
+
+    def _parse_str(self, s: str) -> Optional[date]:
+        # fast ISO path: YYYY-MM-DD or "YYYY-MM-DD HH:MM:SS"
+        if len(s) >= 10 and s[4] == "-" and s[7] == "-":
+            if len(s) == 10 and self._iso:
+                try:
+                    return date.fromisoformat(s)
+                except ValueError:
+                    pass
+            elif len(s) == 19 and s[10] == " " and self._iso_datetime:
+                try:
+                    return datetime.fromisoformat(s).date()
+                except ValueError:
+                    pass
+
+        if self._reorder and self._detected is not None:
+            d = self._strptime(s, self._detected)
+            if d is not None:
+                return d
+        for fmt in self.formats:
+            if self._reorder and fmt == self._detected:
+                continue
+            d = self._strptime(s, fmt)
+            if d is not None:
+                self._detected = fmt
+                return d
+
+        if self.epoch_fallback and s.lstrip("-").isdigit():
+            return self._from_epoch(int(s))
+        return None
+
+    @staticmethod
+    def _strptime(s: str, fmt: str) -> Optional[date]:
+        try:
+            return datetime.strptime(s, fmt).date()
+        except ValueError:
+            return None
+
+    @staticmethod
+    def _from_epoch(value) -> Optional[date]:
+        try:
+            return datetime.fromtimestamp(int(value), timezone.utc).date()
+        except (OverflowError, OSError, ValueError):
+            return None
+
+
+# ---- one-time migration ----
+def migrate_date_columns(db_path: str, columns: Iterable[Tuple[str, str]] = DATE_COLUMNS,
+                         formats: Iterable[str] = DEFAULT_FORMATS, dry_run: bool = False) -> Dict[str, Dict[str, int]]:
+    """
+    Rewrites every parsable date in the given (table, column) pairs to ISO YYYY-MM-DD.
+    Works per distinct value (one UPDATE per distinct date, not per row) inside a
+    single transaction. Unparsable values are left untouched and counted.
+    Missing tables/columns are skipped.
+    """
+    report: Dict[str, Dict[str, int]] = {}
+    conn = sqlite3.connect(db_path)
+    try:
+        cur = conn.cursor()
+        cur.execute("BEGIN IMMEDIATE")
+        for table, column in columns:
+            cur.execute(f"PRAGMA table_info({table})")
+            if column not in [r[1] for r in cur.fetchall()]:
+                continue
+            parse = DateParser(formats)
+            stats = {"distinct": 0, "rewritten_values": 0, "rewritten_rows": 0, "unparsable_values": 0}
+            cur.execute(f"SELECT {column}, COUNT(*) FROM {table} GROUP BY {column}")
+            for raw, n in cur.fetchall():
+                stats["distinct"] += 1
+                d = parse(raw)
+                if d is None:
+                    stats["unparsable_values"] += 1
+                    continue
+                iso = d.isoformat()
+                if raw == iso:
+                    continue
+                stats["rewritten_values"] += 1
+                stats["rewritten_rows"] += n
+                if not dry_run:
+                    cur.execute(f"UPDATE {table} SET {column} = ? WHERE {column} = ?", (iso, raw))
+            report[f"{table}.{column}"] = stats
+        if dry_run:
+            conn.rollback()
+        else:
+            conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rewrite transactions/expenses dates to ISO YYYY-MM-DD.")
+    parser.add_argument("db_path", nargs="?", default="pos_system.db")
+    parser.add_argument("--dry-run", action="store_true", help="report what would change without writing")
+    args = parser.parse_args()
+
+    report = migrate_date_columns(args.db_path, dry_run=args.dry_run)
+    for col, stats in report.items():
+        print(f"{col}: {stats['rewritten_rows']} rows / {stats['rewritten_values']} values rewritten, "
+              f"{stats['unparsable_values']} unparsable of {stats['distinct']} distinct")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+# db_pool.py
+"""
+Shared SQLite connection pool for the Flask services.
+
+Each database gets one ConnectionPool (see get_pool) holding:
+
+  - a single writer connection, handed out under a lock, so in-process writers
+    queue in Python instead of spinning on SQLite's busy handler
+  - up to max_readers read-only connections (mode=ro) that are reused across
+    requests instead of paying open + schema parse + PRAGMAs every time
+
+The writer connection is opened lazily, on the first writer() call, and
+switches the database to WAL (the setting is persistent), so dashboard
+readers no longer block the POS writer and vice versa. Read-only users of
+the pool never open a writer, and never change the journal mode. Every
+connection gets the same tuned PRAGMA profile (synchronous=NORMAL, mmap,
+page cache, busy_timeout, foreign_keys).
+
+    pool = get_pool("pos_system.db")
+    with pool.reader() as conn: ...
+    with pool.writer() as conn:
+        conn.execute("BEGIN IMMEDIATE"); ...; conn.commit()
+"""
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+from urllib.parse import quote
+
+# applied to every connection
+PRAGMAS = {
+    "synchronous": "NORMAL",        # safe with WAL; fsync on checkpoint, not every commit
+    "mmap_size": 256 * 1024 * 1024,
+    "cache_size": -64 * 1024,       # negative = KiB -> 64 MiB page cache
+    "temp_store": "MEMORY",
+    "busy_timeout": 5000,           # ms
+    "foreign_keys": "ON",
+}
+JOURNAL_MODE = "WAL"
+DEFAULT_MAX_READERS = 8
+
+
+class PoolTimeout(Exception):
+    """No connection became available within the timeout."""
+
+
+class ConnectionPool:
+
+    def __init__(self, db_path: str, max_readers: int = DEFAULT_MAX_READERS, timeout: float = 10.0):
+        self.db_path = os.path.abspath(db_path)
+        self.max_readers = max_readers
+        self.timeout = timeout
+
+        self._writer: Optional[sqlite3.Connection] = None
+        self._writer_lock = threading.Lock()
+
+        self._idle: List[sqlite3.Connection] = []
+        self._readers_open = 0
+        self._readers_cond = threading.Condition()
+
+        self._metrics_lock = threading.Lock()
+        self._metrics = {
+            "reader_hits": 0,        # served from an idle pooled connection
+            "reader_misses": 0,      # had to open a new connection
+            "reader_waits": 0,       # all readers busy, had to wait
+            "reader_wait_seconds": 0.0,
+            "writer_acquires": 0,
+            "writer_wait_seconds": 0.0,
+        }
+
+    # ---- connection setup ----
+    @staticmethod
+    def _configure(conn: sqlite3.Connection) -> None:
+        for name, value in PRAGMAS.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+
+    def _open_writer(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=PRAGMAS["busy_timeout"] / 1000)
+        conn.execute(f"PRAGMA journal_mode = {JOURNAL_MODE}")
+        self._configure(conn)
+        return conn
+
+    def _open_reader(self) -> sqlite3.Connection:
+        uri = f"file:{quote(self.db_path)}?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False, timeout=PRAGMAS["busy_timeout"] / 1000)
+        self._configure(conn)
+        return conn
+
+    def _count(self, key: str, value=1) -> None:
+        with self._metrics_lock:
+            self._metrics[key] += value
+
+    # ---- readers ----
+    @contextmanager
+    def reader(self) -> Iterator[sqlite3.Connection]:
+        """Borrows a read-only connection; any open read transaction is ended on return."""
+        conn = self._acquire_reader()
+        try:
+            yield conn
+        finally:
+            self._release_reader(conn)
+
+    def _acquire_reader(self) -> sqlite3.Connection:
+        waited = None
+        with self._readers_cond:
+            while True:
+                if self._idle:
+                    conn = self._idle.pop()
+                    hit = True
+                    break
+                if self._readers_open < self.max_readers:
+                    self._readers_open += 1
+                    conn = None
+                    hit = False
+                    break
+                if waited is None:
+                    waited = time.perf_counter()
+                remaining = self.timeout - (time.perf_counter() - waited)
+                if remaining <= 0 or not self._readers_cond.wait(remaining):
+                    if not self._idle and self._readers_open >= self.max_readers:
+                        raise PoolTimeout(f"no reader available for {self.db_path}")
+
+        if waited is not None:
+            self._count("reader_waits")
+            self._count("reader_wait_seconds", time.perf_counter() - waited)
+        if hit:
+            self._count("reader_hits")
+            return conn
+
+        self._count("reader_misses")
+        try:
+            return self._open_reader()
+        except Exception:
+            with self._readers_cond:
+                self._readers_open -= 1
+                self._readers_cond.notify()
+            raise
+
+    def _release_reader(self, conn: sqlite3.Connection) -> None:
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            conn.row_factory = None
+            reusable = True
+        except sqlite3.Error:
+            reusable = False
+        with self._readers_cond:
+            if reusable:
+                self._idle.append(conn)
+            else:
+                self._readers_open -= 1
+                conn.close()
+            self._readers_cond.notify()
+
+    # ---- writer ----
+    def _ensure_writer(self) -> sqlite3.Connection:
+        if self._writer is None:
+            with self._writer_lock:
+                if self._writer is None:
+                    self._writer = self._open_writer()
+        return self._writer
+
+    @contextmanager
+    def writer(self) -> Iterator[sqlite3.Connection]:
+        """Exclusive use of the single writer connection; uncommitted work is rolled back on return."""
+        conn = self._ensure_writer()
+        t0 = time.perf_counter()
+        if not self._writer_lock.acquire(timeout=self.timeout):
+            raise PoolTimeout(f"writer busy for {self.db_path}")
+        self._count("writer_acquires")
+        self._count("writer_wait_seconds", time.perf_counter() - t0)
+        try:
+            yield conn
+        finally:
+            try:
+                if conn.in_transaction:
+                    conn.rollback()
+                conn.row_factory = None
+            finally:
+                self._writer_lock.release()
+
+    # ---- housekeeping ----
+    def metrics(self) -> Dict[str, float]:
+        with self._metrics_lock:
+            m = dict(self._metrics)
+        with self._readers_cond:
+            m["readers_open"] = self._readers_open
+            m["readers_idle"] = len(self._idle)
+        m["max_readers"] = self.max_readers
+        return m
+
+    def close(self) -> None:
+        with self._readers_cond:
+            for conn in self._idle:
+                conn.close()
+            self._readers_open -= len(self._idle)
+            self._idle.clear()
+        with self._writer_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+
+
+_pools: Dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path: str, **kwargs) -> ConnectionPool:
+    """Process-wide pool for db_path (kwargs only apply when the pool is first created)."""
+    key = os.path.abspath(db_path)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = ConnectionPool(key, **kwargs)
+        return pool
@@ -0,0 +1,204 @@
+# event_feed.py
+"""
+Server-Sent Events feed for Billing_app: live stock levels and completed orders.
+
+checkout publishes to the process-wide `broker` after each commit. Every
+connected client (billing terminal, dashboard) owns a Subscriber with its own
+bounded buffer:
+
+  - stock updates are coalesced per item: a burst of checkouts touching the
+    same item becomes one "stock" event carrying only the latest levels
+  - order events are queued up to max_orders; a client that falls further
+    behind loses the oldest ones and gets a "resync" event telling it to
+    refetch /api/menu instead of the server buffering without bound
+  - each flush waits `coalesce` seconds after the first pending event, so a
+    lunch-rush burst becomes one write per client instead of dozens
+
+Wire format (text/event-stream):
+
+    event: stock   data: {"version": n, "stock": {"101": 46, ...}}
+    event: order   data: {"orderId": 7, "total": 40.0, "items": {"101": 2}}
+    event: resync  data: {"dropped": 12}
+"""
+import json
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Iterator, List, Optional
+
+DEFAULT_MAX_SUBSCRIBERS = 200
+DEFAULT_MAX_ORDERS = 100
+DEFAULT_COALESCE = 0.05     # seconds
+HEARTBEAT = 15.0            # seconds between keep-alive comments
+
+
+def format_event(event: str, data: Any, event_id: Optional[int] = None) -> str:
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, separators=(',', ':'))}")
+    return "\n".join(lines) + "\n\n"
+
+
+class TooManySubscribers(Exception):
+    pass
+
+
+class Subscriber:
+    """Per-client buffer; only touched under its own condition variable."""
+
+    def __init__(self, max_orders: int):
+        self._cond = threading.Condition()
+        self._stock: Dict[int, int] = {}
+        self._stock_version: Optional[int] = None
+        self._item_versions: Dict[int, int] = {}       # item -> version of its level (pending or sent)
+        self._snapshot_version = -1                     # every item's level up to here was sent
+        self._orders: deque = deque()
+        self._max_orders = max_orders
+        self._dropped = 0
+        self.closed = False
+        self.sent_stock_version: Optional[int] = None   # last stock version this client has seen
+
+    def push_stock(self, stock: Dict[int, int], version: Optional[int]) -> None:
+        """
+        Checkouts publish after their commit, so pushes can arrive out of
+        order: levels older than the version already pending or sent for an
+        item are dropped, so a client never sees stock go backwards.
+        """
+        with self._cond:
+            if version is None:
+                self._stock.update(stock)
+            else:
+                floor = self._snapshot_version
+                newer = {k: v for k, v in stock.items() if version > max(floor, self._item_versions.get(k, -1))}
+                if not newer:
+                    return
+                self._stock.update(newer)
+                self._item_versions.update(dict.fromkeys(newer, version))
+                if self._stock_version is None or version > self._stock_version:
+                    self._stock_version = version
+            self._cond.notify()
+
+    def sent_snapshot(self, version: int) -> None:
+        """The client was just sent the full stock map at `version` (initial event / poll)."""
+        with self._cond:
+            self._snapshot_version = max(self._snapshot_version, version)
+            for item in [k for k in self._stock if self._item_versions.get(k, version + 1) <= version]:
+                del self._stock[item]   # pending level the snapshot already covers
+            if self.sent_stock_version is None or version > self.sent_stock_version:
+                self.sent_stock_version = version
+
+    def push_order(self, order: Dict[str, Any]) -> None:
+        with self._cond:
+            if len(self._orders) >= self._max_orders:
+                # slow client: drop the oldest instead of growing without bound
+                self._orders.popleft()
+                self._dropped += 1
+            self._orders.append(order)
+            self._cond.notify()
+
+    def _has_pending(self) -> bool:
+        return bool(self._stock or self._orders or self._dropped)
+
+    def drain(self, timeout: float, coalesce: float) -> List[str]:
+        """Blocks up to timeout for events, then returns them as SSE messages."""
+        with self._cond:
+            if not self._has_pending():
+                self._cond.wait(timeout)
+            if not self._has_pending() or self.closed:
+                return []
+        if coalesce > 0:
+            # let the rest of the burst land before flushing
+            time.sleep(coalesce)
+        with self._cond:
+            messages = []
+            if self._dropped:
+                messages.append(format_event("resync", {"dropped": self._dropped}))
+                self._dropped = 0
+            for order in self._orders:
+                messages.append(format_event("order", order))
+            self._orders.clear()
+            if self._stock:
+                stock = {str(k): v for k, v in self._stock.items()}
+                messages.append(format_event("stock", {"version": self._stock_version, "stock": stock}))
+                if self._stock_version is not None and (self.sent_stock_version is None
+                                                        or self._stock_version > self.sent_stock_version):
+                    self.sent_stock_version = self._stock_version
+                self._stock.clear()
+            return messages
+
+    def close(self) -> None:
+        with self._cond:
+            self.closed = True
+            self._cond.notify()
+
+
+class EventBroker:
+
+    def __init__(self, max_subscribers: int = DEFAULT_MAX_SUBSCRIBERS, max_orders: int = DEFAULT_MAX_ORDERS):
+        self.max_subscribers = max_subscribers
+        self.max_orders = max_orders
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self.published = 0
+
+    def subscribe(self) -> Subscriber:
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                raise TooManySubscribers()
+            sub = Subscriber(self.max_orders)
+            self._subscribers.add(sub)
+            return sub
+
+    def unsubscribe(self, sub: Subscriber) -> None:
+        sub.close()
+        with self._lock:
+            self._subscribers.discard(sub)
+
+    def _targets(self):
+        with self._lock:
+            return list(self._subscribers)
+
+    def publish_stock(self, stock: Dict[int, int], version: Optional[int] = None) -> None:
+        for sub in self._targets():
+            sub.push_stock(stock, version)
+        self.published += 1
+
+    def publish_order(self, order: Dict[str, Any]) -> None:
+        for sub in self._targets():
+            sub.push_order(order)
+        self.published += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"subscribers": len(self._subscribers), "published": self.published}
+
+    def has_subscribers(self) -> bool:
+        return bool(self._subscribers)
+
+    def stream(self, sub: Subscriber, initial: Optional[str] = None, poll=None,
+               coalesce: float = DEFAULT_COALESCE, heartbeat: float = HEARTBEAT) -> Iterator[str]:
+        """
+        SSE generator for one client. `initial` is sent first (current state);
+        `poll(sub)` runs on every idle heartbeat and may return extra messages,
+        e.g. a stock snapshot when another process changed the menu.
+        """
+        try:
+            # tell EventSource to retry after 3s if the connection drops
+            yield "retry: 3000\n\n"
+            if initial:
+                yield initial
+            while not sub.closed:
+                messages = sub.drain(heartbeat, coalesce)
+                if messages:
+                    yield "".join(messages)
+                    continue
+                extra = poll(sub) if poll is not None else None
+                yield extra if extra else ": keep-alive\n\n"
+        finally:
+            self.unsubscribe(sub)
+
+
+# process-wide broker used by Billing_app
+broker = EventBroker()
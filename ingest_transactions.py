@@ -0,0 +1,386 @@
+# ingest_transactions.py
+"""
+Bulk loader for POS transaction exports (the transactions.csv layout:
+date,item,category,price,cost,customer) into pos_system.db.
+
+    python ingest_transactions.py export.csv
+    python ingest_transactions.py export.csv --db pos_system.db --chunk-rows 100000 --processes 4
+    python ingest_transactions.py export.csv --restart      # ignore the checkpoint
+
+The main process cuts the file into chunks of whole CSV records (it only
+scans for line ends and quote parity, tracking byte offsets). Worker
+processes parse each chunk and normalize it: dates become ISO YYYY-MM-DD via
+DateParser, and prices/costs such as "₹1,299.00" or "Rs 50" become floats.
+Rows without a parsable date, item or price are rejected and counted. The
+main process inserts each chunk with one prepared executemany in its own
+transaction. The checkpoint row (byte offset, counts) is updated in that
+same transaction, so an interrupted load resumes after the last committed
+chunk. Rerunning on a file that has grown since loads only the new rows.
+
+For the duration of the load the database runs with journal_mode=OFF and
+synchronous=OFF. Loads of 16 MB or more also drop the non-unique indexes on
+transactions and the business_summaries triggers. At the end the loaded rows
+are folded into the daily summaries with one GROUP BY, and the triggers and
+indexes are recreated, all in one transaction. The statements for that last
+step are kept in the checkpoint, so a resumed load still runs them. Don't
+run `business_summaries.py rebuild` while such a load is in progress.
+
+With the journal off, a crash in the middle of a chunk can corrupt the
+file. Load into a copy, or pass --durable to keep the journal (slower).
+Switching journal mode needs the database to yourself: if the apps hold WAL
+connections, the load runs in WAL and says so.
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from business_stats import TRANSACTIONS_SCHEMA
+from business_summaries import SUMMARY_TRIGGERS, fold_transactions_sql
+from date_normalizer import DateParser, DEFAULT_FORMATS
+
+DB_PATH = "pos_system.db"
+DEFAULT_CHUNK_ROWS = 50_000
+DEFER_MIN_BYTES = 16 * 2 ** 20   # smaller loads (e.g. an appended day) keep indexes and triggers live
+FINGERPRINT_BYTES = 64      # bytes just before the checkpoint offset, to detect a rewritten file
+REQUIRED_COLUMNS = ("date", "item", "price")
+COLUMNS = ("date", "item", "category", "price", "cost", "customer")
+
+CHECKPOINT_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ingest_checkpoints (
+    source TEXT PRIMARY KEY,
+    byte_offset INTEGER NOT NULL,
+    fingerprint TEXT NOT NULL,
+    rows_loaded INTEGER NOT NULL DEFAULT 0,
+    rows_rejected INTEGER NOT NULL DEFAULT 0,
+    deferred_sql TEXT,
+    status TEXT NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+)
+"""
+INSERT_SQL = "INSERT INTO transactions (date, item, category, price, cost, customer) VALUES (?, ?, ?, ?, ?, ?)"
+
+_AMOUNT = re.compile(r"-?\d[\d,]*(?:\.\d+)?|-?\.\d+")
+
+
+class IngestReport(NamedTuple):
+    rows: int               # inserted by this run
+    rejected: int
+    chunks: int
+    seconds: float          # load, excluding the index rebuild
+    finish_seconds: float   # summary fold + trigger/index rebuild
+    resumed_from: int       # byte offset the run started at (0 = from the top)
+    journal_mode: str       # what the load actually ran with
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+class CheckpointMismatch(Exception):
+    """The file no longer matches the checkpoint (rewritten or truncated)."""
+
+
+# ---- normalization (worker side) ----
+def parse_amount(value: str) -> Optional[float]:
+    """'499.99', '₹1,299.00', 'Rs. 50', ' 20 ' -> float; None if there is no number."""
+    s = value.strip()
+    if not s:
+        return None
+    try:
+        return float(s)
+    except ValueError:
+        pass
+    m = _AMOUNT.search(s)
+    return float(m.group().replace(",", "")) if m else None
+
+
+def normalize_chunk(job: Tuple[Sequence[Optional[int]], bytes]) -> Tuple[List[tuple], int]:
+    """
+    Worker: raw CSV bytes -> (rows ready for INSERT_SQL, rejected count).
+    positions[i] is the CSV field index of COLUMNS[i], or None if the export
+    doesn't have that column.
+    """
+    positions, data = job
+    # short records are padded with ""; missing columns read a "" appended after the
+    # last field (not the field just past the known ones: exports may have extra columns)
+    width = max(i for i in positions if i is not None) + 1
+    missing = None in positions
+    i_date, i_item, i_category, i_price, i_cost, i_customer = (-1 if i is None else i for i in positions)
+    padding = [""] * width
+    parse_date = DateParser(DEFAULT_FORMATS, epoch_fallback=False)
+    dates = {}      # raw string -> ISO string (or None)
+    amounts = {}    # raw string -> float (or None); both repeat a lot within a chunk
+    rows = []
+    rejected = 0
+
+    def iso_date(raw):
+        try:
+            return dates[raw]
+        except KeyError:
+            d = parse_date(raw)
+            value = dates[raw] = d.isoformat() if d is not None else None
+            return value
+
+    def amount(raw):
+        try:
+            return amounts[raw]
+        except KeyError:
+            value = amounts[raw] = parse_amount(raw)
+            return value
+
+    for record in csv.reader(io.StringIO(data.decode("utf-8", errors="replace"))):
+        if len(record) < width:
+            if not any(f.strip() for f in record):
+                continue    # blank line
+            record += padding[len(record):]
+        if missing:
+            record.append("")
+        d = iso_date(record[i_date])
+        item = record[i_item].strip()
+        price = amount(record[i_price])
+        if d is None or not item or price is None:
+            rejected += 1
+            continue
+        cost = amount(record[i_cost])
+        rows.append((d, item, record[i_category].strip() or None, price,
+                     0.0 if cost is None else cost, record[i_customer].strip() or None))
+    return rows, rejected
+
+
+# ---- reading ----
+def read_header(csv_path: str) -> Tuple[Tuple[Optional[int], ...], int]:
+    """Column positions (in COLUMNS order) and the byte offset of the first data row."""
+    with open(csv_path, "rb") as f:
+        line = f.readline()
+    header = next(csv.reader([line.decode("utf-8-sig", errors="replace")]), [])
+    names = [h.strip().lower() for h in header]
+    missing = [c for c in REQUIRED_COLUMNS if c not in names]
+    if missing:
+        raise ValueError(f"Missing columns in {csv_path}: {missing}")
+    return tuple(names.index(c) if c in names else None for c in COLUMNS), len(line)
+
+
+def iter_chunks(csv_path: str, offset: int, chunk_rows: int) -> Iterator[Tuple[int, bytes]]:
+    """
+    Yields (end_offset, data) with about chunk_rows lines each, starting at
+    byte offset. Chunks end only outside quotes, so a quoted field with an
+    embedded newline never straddles two chunks.
+    """
+    with open(csv_path, "rb") as f:
+        f.seek(offset)
+        lines = []
+        in_quotes = False
+        for line in f:
+            lines.append(line)
+            offset += len(line)
+            if line.count(b'"') % 2:
+                in_quotes = not in_quotes
+            if len(lines) >= chunk_rows and not in_quotes:
+                yield offset, b"".join(lines)
+                lines = []
+        if lines:
+            yield offset, b"".join(lines)
+
+
+def _fingerprint(csv_path: str, offset: int) -> str:
+    with open(csv_path, "rb") as f:
+        f.seek(max(0, offset - FINGERPRINT_BYTES))
+        return f.read(min(offset, FINGERPRINT_BYTES)).hex()
+
+
+# ---- database side ----
+def _deferrable_indexes(conn: sqlite3.Connection) -> List[Tuple[str, str]]:
+    # unique indexes stay: dropping them would let duplicates in that the rebuild then rejects
+    return conn.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = 'transactions' "
+        "AND sql IS NOT NULL AND sql NOT LIKE 'CREATE UNIQUE%'"
+    ).fetchall()
+
+
+def _summary_triggers(conn: sqlite3.Connection) -> List[Tuple[str, str]]:
+    # only the business_summaries triggers: their effect can be replayed as one set-based fold
+    names = [name for name, _ in SUMMARY_TRIGGERS["transactions"]]
+    return conn.execute(
+        f"SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'transactions' "
+        f"AND name IN ({','.join('?' * len(names))})", names
+    ).fetchall()
+
+
+def _set_load_pragmas(conn: sqlite3.Connection, durable: bool) -> Tuple[str, int]:
+    previous = (conn.execute("PRAGMA journal_mode").fetchone()[0],
+                conn.execute("PRAGMA synchronous").fetchone()[0])
+    conn.execute("PRAGMA cache_size = -65536")     # 64 MB
+    conn.execute("PRAGMA temp_store = MEMORY")      # index rebuild sorts
+    if not durable:
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+    return previous
+
+
+def _restore_pragmas(conn: sqlite3.Connection, previous: Tuple[str, int]) -> None:
+    journal_mode, synchronous = previous
+    conn.execute(f"PRAGMA journal_mode = {journal_mode}")
+    conn.execute(f"PRAGMA synchronous = {int(synchronous)}")
+
+
+def ingest(csv_path: str, db_path: str = DB_PATH, chunk_rows: int = DEFAULT_CHUNK_ROWS,
+           processes: Optional[int] = None, restart: bool = False, durable: bool = False,
+           defer: bool = True, progress=None) -> IngestReport:
+    """
+    Loads csv_path into transactions, resuming from the checkpoint unless
+    restart (which loads from the top again; rows from earlier runs stay, and
+    so do the triggers/indexes an interrupted deferred load still has to
+    recreate).
+    defer=False keeps indexes and summary triggers live for the whole load.
+    progress(rows_total, rows_per_sec) is called after every committed chunk.
+    """
+    source = os.path.abspath(csv_path)
+    positions, data_start = read_header(csv_path)
+    processes = processes or os.cpu_count() or 1
+
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        conn.execute(TRANSACTIONS_SCHEMA)
+        conn.execute(CHECKPOINT_SCHEMA)
+        row = conn.execute("SELECT byte_offset, fingerprint, rows_loaded, rows_rejected, deferred_sql "
+                           "FROM ingest_checkpoints WHERE source = ?", (source,)).fetchone()
+        # restart only resets the offset and counters: deferred_sql from an interrupted
+        # load still has to run, or its triggers and indexes are gone for good
+        deferred = json.loads(row[4]) if row is not None and row[4] else []
+        if row is None or restart:
+            offset, loaded, rejected = data_start, 0, 0
+        else:
+            offset, fingerprint, loaded, rejected, _ = row
+            if os.path.getsize(csv_path) < offset or _fingerprint(csv_path, offset) != fingerprint:
+                raise CheckpointMismatch(f"{csv_path} changed since the checkpoint at byte {offset}; "
+                                         f"use --restart to load it from the top")
+        resumed_from = offset if row is not None and not restart else 0
+        if os.path.getsize(csv_path) == offset and not deferred:
+            # nothing appended since the last completed load
+            return IngestReport(0, 0, 0, 0.0, 0.0, resumed_from, conn.execute("PRAGMA journal_mode").fetchone()[0])
+
+        previous_pragmas = _set_load_pragmas(conn, durable)
+        journal_mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            if defer and os.path.getsize(csv_path) - offset >= DEFER_MIN_BYTES:
+                triggers = _summary_triggers(conn)
+                if triggers:
+                    # rows inserted from here until the triggers are back (ours or anyone's) are folded at the end
+                    last_rowid = conn.execute("SELECT COALESCE(MAX(rowid), 0) FROM transactions").fetchone()[0]
+                    replay = fold_transactions_sql(last_rowid)
+                    for name, sql in triggers:
+                        conn.execute(f'DROP TRIGGER "{name}"')
+                        replay.append(sql)
+                    deferred = replay + deferred
+                for name, sql in _deferrable_indexes(conn):
+                    conn.execute(f'DROP INDEX "{name}"')
+                    if sql not in deferred:
+                        deferred.append(sql)
+            conn.execute(
+                "INSERT INTO ingest_checkpoints (source, byte_offset, fingerprint, rows_loaded, rows_rejected, "
+                "deferred_sql, status) VALUES (?, ?, ?, ?, ?, ?, 'loading') "
+                "ON CONFLICT(source) DO UPDATE SET byte_offset = excluded.byte_offset, "
+                "fingerprint = excluded.fingerprint, rows_loaded = excluded.rows_loaded, "
+                "rows_rejected = excluded.rows_rejected, deferred_sql = excluded.deferred_sql, "
+                "status = 'loading', updated_at = CURRENT_TIMESTAMP",
+                (source, offset, _fingerprint(csv_path, offset), loaded, rejected, json.dumps(deferred)))
+            conn.execute("COMMIT")
+
+            t0 = time.perf_counter()
+            rows_this_run = rejected_this_run = chunks = 0
+
+            def commit_chunk(end, result):
+                nonlocal rows_this_run, rejected_this_run, chunks
+                rows, n_rejected = result
+                conn.execute("BEGIN")
+                conn.executemany(INSERT_SQL, rows)
+                conn.execute("UPDATE ingest_checkpoints SET byte_offset = ?, fingerprint = ?, "
+                             "rows_loaded = rows_loaded + ?, rows_rejected = rows_rejected + ?, "
+                             "updated_at = CURRENT_TIMESTAMP WHERE source = ?",
+                             (end, _fingerprint(csv_path, end), len(rows), n_rejected, source))
+                conn.execute("COMMIT")
+                rows_this_run += len(rows)
+                rejected_this_run += n_rejected
+                chunks += 1
+                if progress:
+                    elapsed = time.perf_counter() - t0
+                    progress(loaded + rows_this_run, rows_this_run / elapsed if elapsed else 0.0)
+
+            chunk_iter = iter_chunks(csv_path, offset, chunk_rows)
+            if processes == 1:
+                for end, data in chunk_iter:
+                    commit_chunk(end, normalize_chunk((positions, data)))
+            else:
+                # bounded read-ahead: at most two chunks per worker in flight, committed in file order
+                with ProcessPoolExecutor(max_workers=processes) as pool:
+                    pending = deque()
+                    for end, data in chunk_iter:
+                        pending.append((end, pool.submit(normalize_chunk, (positions, data))))
+                        if len(pending) >= processes * 2:
+                            end, future = pending.popleft()
+                            commit_chunk(end, future.result())
+                    while pending:
+                        end, future = pending.popleft()
+                        commit_chunk(end, future.result())
+            seconds = time.perf_counter() - t0
+
+            t1 = time.perf_counter()
+            # one transaction, so the summary fold can't be applied twice
+            conn.execute("BEGIN IMMEDIATE")
+            for sql in deferred:
+                conn.execute(sql)
+            conn.execute("UPDATE ingest_checkpoints SET deferred_sql = NULL, status = 'done', "
+                         "updated_at = CURRENT_TIMESTAMP WHERE source = ?", (source,))
+            conn.execute("COMMIT")
+            finish_seconds = time.perf_counter() - t1
+        finally:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            _restore_pragmas(conn, previous_pragmas)
+    finally:
+        conn.close()
+    return IngestReport(rows_this_run, rejected_this_run, chunks, seconds, finish_seconds,
+                        resumed_from, journal_mode)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-load a transactions CSV export into pos_system.db.")
+    parser.add_argument("csv_path")
+    parser.add_argument("--db", dest="db_path", default=DB_PATH)
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS, help="CSV lines per chunk/transaction")
+    parser.add_argument("--processes", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--restart", action="store_true", help="ignore the checkpoint and load from the top")
+    parser.add_argument("--durable", action="store_true", help="keep the journal and synchronous setting")
+    parser.add_argument("--keep-indexes", action="store_true",
+                        help="maintain indexes and summary triggers during the load instead of at the end")
+    args = parser.parse_args()
+
+    def progress(total, rate):
+        print(f"\r{total:,} rows loaded, {rate:,.0f} rows/sec", end="", file=sys.stderr, flush=True)
+
+    try:
+        report = ingest(args.csv_path, args.db_path, args.chunk_rows, args.processes, args.restart,
+                        args.durable, not args.keep_indexes, progress)
+    except CheckpointMismatch as e:
+        print(f"\n{e}", file=sys.stderr)
+        sys.exit(1)
+    print(file=sys.stderr)
+    if report.resumed_from:
+        print(f"resumed at byte {report.resumed_from:,}")
+    print(f"{report.rows:,} rows in {report.chunks} chunks, {report.rejected:,} rejected, "
+          f"{report.seconds:.2f}s ({report.rows_per_sec:,.0f} rows/sec, journal_mode={report.journal_mode}); "
+          f"indexes/summaries finished in {report.finish_seconds:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,402 @@
+# loadtest_checkout.py
+"""
+Load test: lunch-rush checkout traffic against Billing_app's /api/checkout.
+
+    python loadtest_checkout.py                                  # direct vs group_commit, threads
+    python loadtest_checkout.py --terminals 1 8 32 64 --cart-lines 1-4 8 16 --seconds 10
+    python loadtest_checkout.py --transport threads processes http --modes direct group_commit+projection
+    python loadtest_checkout.py --stock 300 --out loadtest.json  # sell out: stock conflicts on purpose
+
+N simulated terminals each replay seeded carts drawn from the seed.py menu
+(benchmarks.generators.carts: lunch-heavy, a few favourites sell most) back
+to back for --seconds, with an optional --think-ms pause between orders.
+Every (mode, transport, terminals, cart size) cell runs against a fresh copy
+of a synthetic pos_system.db.
+
+Modes are the app's own switches, set in the environment before Billing_app
+is imported (see MODES). Transports:
+
+    threads     one app process, one Flask test client per terminal thread
+    processes   terminals spread over --processes app processes (like several
+                gunicorn workers): the SQLite lock is fought over across processes
+    http        a threaded werkzeug server per mode, terminals post real HTTP requests
+
+Per cell it reports throughput, latency percentiles and the 409 rate split
+by cause (lock/writer timeouts, stock conflicts, other), then checks the
+database against what the terminals were told:
+
+  - every 201 is exactly one new order, and there are no other new orders
+  - per menu item, the stock decrease == units in the new order lines == units
+    in the carts that got a 201; no stock went negative
+  - every new order's total == sum(quantity x price at sale) of its lines
+  - after draining the sales projection outbox, sales_daily grew by the same
+    units as order_items
+
+The final table compares each mode with the first one given (--modes) in the
+same cell; --out writes the cells plus benchmarks.harness result records, so
+two runs can be diffed with `python -m benchmarks compare`.
+"""
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List, Tuple
+
+from benchmarks.generators import carts as make_carts, dataset
+from benchmarks.harness import RESULTS_FORMAT, environment, percentile, result, working_copy
+
+MODES = {
+    "direct": {"POS_GROUP_COMMIT": "0", "POS_SALES_PROJECTION": "0"},
+    "group_commit": {"POS_GROUP_COMMIT": "1", "POS_SALES_PROJECTION": "0"},
+    "direct+projection": {"POS_GROUP_COMMIT": "0", "POS_SALES_PROJECTION": "1"},
+    "group_commit+projection": {"POS_GROUP_COMMIT": "1", "POS_SALES_PROJECTION": "1"},
+}
+TRANSPORTS = ("threads", "processes", "http")
+CARTS_PER_CELL = 5000
+START_DELAY = 3.0       # seconds for the app processes to import before the clock starts
+
+SERVER = """
+import logging, sys
+import Billing_app
+from werkzeug.serving import make_server
+logging.disable(logging.ERROR)   # every rejected checkout is logged; the client counts them
+make_server("127.0.0.1", int(sys.argv[1]), Billing_app.app, threaded=True).serve_forever()
+"""
+
+
+def rejection_kind(status: int, body: Any) -> str:
+    """ok, or why a checkout was turned down (from Billing_app's {"error": str(e)} body)."""
+    if status == 201:
+        return "ok"
+    error = body.get("error", "") if isinstance(body, dict) else ""
+    lowered = error.lower()
+    if status == 409 and ("locked" in lowered or "busy" in lowered or not error):
+        return "lock_timeout"       # sqlite busy_timeout / PoolTimeout / group-commit submit timeout
+    if status == 409 and "stock" in lowered:
+        return "out_of_stock"
+    return f"http_{status}" if status != 409 else "conflict_other"
+
+
+# ---- terminals ----
+def _terminal(post, cart_pool, first: int, stride: int, start_at: float, seconds: float,
+              think: float, records: list) -> None:
+    while time.time() < start_at:
+        time.sleep(min(0.01, max(0.0, start_at - time.time())))
+    deadline = start_at + seconds
+    i = first
+    while time.time() < deadline:
+        cart = cart_pool[i % len(cart_pool)]
+        t0 = time.perf_counter()
+        status, body = post({"cart": cart, "paymentMode": "UPI"})
+        latency = (time.perf_counter() - t0) * 1000.0
+        order_id = body.get("orderId") if status == 201 and isinstance(body, dict) else None
+        records.append((latency, rejection_kind(status, body), order_id, i % len(cart_pool)))
+        i += stride
+        if think:
+            time.sleep(think)
+
+
+def _run_terminals(make_post, terminals: List[int], total: int, cart_pool, start_at: float,
+                   seconds: float, think: float) -> list:
+    records: list = []
+    lock = threading.Lock()
+
+    def one(t):
+        mine: list = []
+        _terminal(make_post(), cart_pool, t, total, start_at, seconds, think, mine)
+        with lock:
+            records.extend(mine)
+
+    workers = [threading.Thread(target=one, args=(t,)) for t in terminals]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return records
+
+
+def _app_worker(job) -> list:
+    """Runs in a fresh (spawned) process: imports Billing_app for this mode, then drives its terminals."""
+    env, terminals, total, cart_pool, start_at, seconds, think = job
+    os.environ.update(env)
+    import logging
+    import Billing_app
+    logging.disable(logging.ERROR)     # every rejected checkout is logged; the terminals count them
+
+    def make_post():
+        client = Billing_app.app.test_client()
+
+        def post(payload):
+            resp = client.post("/api/checkout", json=payload)
+            return resp.status_code, resp.get_json(silent=True)
+        return post
+
+    return _run_terminals(make_post, terminals, total, cart_pool, start_at, seconds, think)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _start_server(env: Dict[str, str]) -> Tuple[subprocess.Popen, int]:
+    port = _free_port()
+    proc = subprocess.Popen([sys.executable, "-c", SERVER, str(port)], env=dict(os.environ, **env),
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/api/menu/stock")
+            conn.getresponse().read()
+            conn.close()
+            return proc, port
+        except OSError:
+            if proc.poll() is not None:
+                break
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("checkout server did not start")
+
+
+def _http_post_factory(port: int):
+    def make_post():
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+
+        def post(payload):
+            try:
+                conn.request("POST", "/api/checkout", body=json.dumps(payload),
+                             headers={"Content-Type": "application/json"})
+                resp = conn.getresponse()
+                raw = resp.read()
+            except (OSError, http.client.HTTPException) as e:
+                conn.close()
+                return 0, {"error": str(e)}
+            try:
+                return resp.status, json.loads(raw)
+            except ValueError:
+                return resp.status, None
+        return post
+    return make_post
+
+
+# ---- database state ----
+def _snapshot(db_path: str) -> Dict[str, Any]:
+    conn = sqlite3.connect(db_path)
+    try:
+        return {
+            "stock": dict(conn.execute("SELECT id, stock FROM menu_items")),
+            "max_order_id": conn.execute("SELECT COALESCE(MAX(id), 0) FROM orders").fetchone()[0],
+            "max_line_id": conn.execute("SELECT COALESCE(MAX(id), 0) FROM order_items").fetchone()[0],
+            "sales_daily_units": conn.execute("SELECT COALESCE(SUM(quantity), 0) FROM sales_daily").fetchone()[0],
+        }
+    finally:
+        conn.close()
+
+
+def check_invariants(db_path: str, before: Dict[str, Any], records: list, cart_pool) -> Dict[str, str]:
+    """name -> "ok" or what is wrong; see the module docstring."""
+    from sales_projection import project_batch
+
+    ok_orders = [r[2] for r in records if r[1] == "ok"]
+    expected = Counter()
+    for r in records:
+        if r[1] == "ok":
+            for line in cart_pool[r[3]]:
+                expected[line["id"]] += line["qty"]
+
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        checks = {}
+        new_orders = [row[0] for row in conn.execute("SELECT id FROM orders WHERE id > ? ORDER BY id",
+                                                     (before["max_order_id"],))]
+        if len(ok_orders) != len(set(ok_orders)):
+            checks["orders"] = "the same order id was returned twice"
+        elif sorted(ok_orders) != new_orders:
+            checks["orders"] = f"{len(ok_orders)} checkouts got 201 but {len(new_orders)} orders were written"
+        else:
+            checks["orders"] = "ok"
+
+        sold = Counter(dict(conn.execute("SELECT menu_item_id, SUM(quantity) FROM order_items "
+                                         "WHERE id > ? GROUP BY menu_item_id", (before["max_line_id"],))))
+        stock = dict(conn.execute("SELECT id, stock FROM menu_items"))
+        decreased = Counter({i: before["stock"][i] - stock[i] for i in stock if before["stock"][i] != stock[i]})
+        bad = [i for i in set(sold) | set(decreased) | set(expected)
+               if not sold[i] == decreased[i] == expected[i]]
+        if bad:
+            i = sorted(bad)[0]
+            checks["stock"] = (f"{len(bad)} items disagree, e.g. item {i}: stock -{decreased[i]}, "
+                               f"order lines {sold[i]}, 201 carts {expected[i]}")
+        elif min(stock.values(), default=0) < 0:
+            checks["stock"] = "negative stock"
+        else:
+            checks["stock"] = "ok"
+
+        wrong_totals = conn.execute("""
+            SELECT COUNT(*) FROM orders o
+            WHERE o.id > ? AND o.total_amount_in_paise != (
+                SELECT COALESCE(SUM(quantity * price_at_sale_in_paise), 0) FROM order_items WHERE order_id = o.id)
+        """, (before["max_order_id"],)).fetchone()[0]
+        checks["totals"] = "ok" if not wrong_totals else f"{wrong_totals} orders with a wrong total"
+
+        while project_batch(conn):
+            pass
+        units = conn.execute("SELECT COALESCE(SUM(quantity), 0) FROM sales_daily").fetchone()[0]
+        grown = units - before["sales_daily_units"]
+        checks["projection"] = "ok" if grown == sum(sold.values()) else \
+            f"sales_daily grew by {grown} units, order lines by {sum(sold.values())}"
+        return checks
+    finally:
+        conn.close()
+
+
+# ---- one cell ----
+def run_cell(base_db: str, work_dir: str, mode: str, transport: str, terminals: int, cart_lines: Tuple[int, int],
+             args) -> Dict[str, Any]:
+    db_path = working_copy(base_db, work_dir, "loadtest.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute("UPDATE menu_items SET stock = ?, is_available = 1", (args.stock,))
+    conn.commit()
+    conn.close()
+    env = dict(MODES[mode], POS_DB=db_path)
+    cart_pool = make_carts(CARTS_PER_CELL, args.seed, max_lines=cart_lines[1], min_lines=cart_lines[0])
+    before = _snapshot(db_path)
+    think = args.think_ms / 1000.0
+    start_at = time.time() + START_DELAY
+
+    if transport == "http":
+        proc, port = _start_server(env)
+        try:
+            start_at = time.time() + 0.5
+            records = _run_terminals(_http_post_factory(port), list(range(terminals)), terminals,
+                                     cart_pool, start_at, args.seconds, think)
+        finally:
+            proc.terminate()
+            proc.wait()
+    else:
+        n_procs = 1 if transport == "threads" else max(1, min(args.processes, terminals))
+        jobs = [(env, list(range(p, terminals, n_procs)), terminals, cart_pool, start_at, args.seconds, think)
+                for p in range(n_procs)]
+        with multiprocessing.get_context("spawn").Pool(n_procs) as pool:
+            records = [r for part in pool.map(_app_worker, jobs) for r in part]
+
+    latencies = [r[0] for r in records]
+    kinds = Counter(r[1] for r in records)
+    n = len(records)
+    return {
+        "mode": mode,
+        "transport": transport,
+        "terminals": terminals,
+        "cart_lines": f"{cart_lines[0]}-{cart_lines[1]}" if cart_lines[0] != cart_lines[1] else str(cart_lines[0]),
+        "seconds": args.seconds,
+        "requests": n,
+        "orders": kinds["ok"],
+        "throughput": kinds["ok"] / args.seconds,
+        "latency_ms": {p: percentile(latencies, q) for p, q in (("p50", 50), ("p95", 95), ("p99", 99), ("max", 100))},
+        "rejected": {k: v for k, v in sorted(kinds.items()) if k != "ok"},
+        "rejected_rate": (n - kinds["ok"]) / n if n else 0.0,
+        "lock_timeout_rate": kinds["lock_timeout"] / n if n else 0.0,
+        "invariants": check_invariants(db_path, before, records, cart_pool),
+    }
+
+
+# ---- report ----
+def _cell_key(cell: Dict[str, Any]) -> Tuple:
+    return cell["transport"], cell["terminals"], cell["cart_lines"]
+
+
+def report(cells: List[Dict[str, Any]], baseline: str) -> str:
+    base = {_cell_key(c): c for c in cells if c["mode"] == baseline}
+    lines = [f"{'mode':<24}{'transport':<11}{'terms':>6}{'lines':>7}{'orders/s':>10}{'vs ' + baseline:>18}"
+             f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}{'rej%':>7}{'lock%':>7}  invariants"]
+    for c in sorted(cells, key=lambda c: (_cell_key(c), c["mode"] != baseline, c["mode"])):
+        ref = base.get(_cell_key(c))
+        ratio = f"{c['throughput'] / ref['throughput']:.2f}x" if ref and ref["throughput"] and c is not ref else ""
+        bad = [f"{k}: {v}" for k, v in c["invariants"].items() if v != "ok"]
+        lat = c["latency_ms"]
+        lines.append(f"{c['mode']:<24}{c['transport']:<11}{c['terminals']:>6}{c['cart_lines']:>7}"
+                     f"{c['throughput']:>10,.0f}{ratio:>18}{lat['p50']:>9.2f}{lat['p95']:>9.2f}{lat['p99']:>9.2f}"
+                     f"{lat['max']:>9.1f}{c['rejected_rate']:>7.1%}{c['lock_timeout_rate']:>7.1%}  "
+                     f"{'ok' if not bad else 'FAILED ' + '; '.join(bad)}")
+    return "\n".join(lines)
+
+
+def _records(cells: List[Dict[str, Any]], rows: int) -> List[Dict[str, Any]]:
+    # benchmarks.harness records, so `python -m benchmarks compare` can diff two load tests
+    out = []
+    for c in cells:
+        name = f"{c['mode']}.{c['transport']}.{c['terminals']}_terminals.{c['cart_lines']}_lines"
+        out.append(result("loadtest", f"{name}.throughput", rows, [c["throughput"]], unit="orders/s",
+                          better="higher", rejected=c["rejected"]))
+        for p in ("p50", "p99"):
+            out.append(result("loadtest", f"{name}.latency_{p}", rows, [c["latency_ms"][p]]))
+    return out
+
+
+def _cart_lines(value: str) -> Tuple[int, int]:
+    lo, _, hi = value.partition("-")
+    try:
+        lo, hi = int(lo), int(hi or lo)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"cart size must be N or LO-HI, got {value!r}")
+    if not 1 <= lo <= hi:
+        raise argparse.ArgumentTypeError(f"cart size must be N or LO-HI with 1 <= LO <= HI, got {value!r}")
+    return lo, hi
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", nargs="+", choices=list(MODES), default=["direct", "group_commit"],
+                        help="the first one is the baseline of the comparison")
+    parser.add_argument("--transport", nargs="+", choices=TRANSPORTS, default=["threads"])
+    parser.add_argument("--terminals", nargs="+", type=int, default=[1, 8, 32])
+    parser.add_argument("--cart-lines", nargs="+", type=_cart_lines, default=[(1, 4), (8, 8), (16, 16)],
+                        help="distinct menu items per cart: N or LO-HI (default 1-4 8 16)")
+    parser.add_argument("--seconds", type=float, default=5.0, help="duration of each cell")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="pause between a terminal's orders")
+    parser.add_argument("--processes", type=int, default=4, help="app processes for --transport processes")
+    parser.add_argument("--stock", type=int, default=1_000_000, help="starting stock of every menu item")
+    parser.add_argument("--history", type=int, default=100_000,
+                        help="transactions in the synthetic database (orders = history / 4)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--data-dir", default=None, help="dataset cache directory (benchmarks.generators)")
+    parser.add_argument("--out", default=None, help="write the cells and result records as JSON")
+    args = parser.parse_args()
+
+    base_db = dataset("pos", args.history, args.seed, args.data_dir)
+    cells = []
+    with tempfile.TemporaryDirectory(prefix="loadtest-") as work_dir:
+        for transport in args.transport:
+            for terminals in args.terminals:
+                for cart_lines in args.cart_lines:
+                    for mode in args.modes:
+                        cell = run_cell(base_db, work_dir, mode, transport, terminals, cart_lines, args)
+                        cells.append(cell)
+                        print(f"{mode:<24}{transport:<11}{terminals:>4} terminals {cell['cart_lines']:>5} lines: "
+                              f"{cell['throughput']:8,.0f} orders/s  p99 {cell['latency_ms']['p99']:8.2f} ms  "
+                              f"rejected {cell['rejected_rate']:6.1%}", file=sys.stderr, flush=True)
+
+    print(report(cells, args.modes[0]))
+    failed = [c for c in cells if any(v != "ok" for v in c["invariants"].values())]
+    if args.out:
+        doc = {"format": RESULTS_FORMAT, "environment": environment(),
+               "config": {k: v for k, v in vars(args).items() if k != "out"},
+               "cells": cells, "results": _records(cells, args.history)}
+        with open(args.out, "w") as f:
+            json.dump(doc, f, indent=1, sort_keys=True)
+            f.write("\n")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
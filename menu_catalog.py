@@ -0,0 +1,164 @@
+# menu_catalog.py
+"""
+In-process menu catalog for Billing_app.
+
+The menu (names, prices, categories) changes rarely; stock changes on every
+checkout. The two are versioned separately in a small catalog_meta table that
+SQLite triggers on menu_items keep current, so *any* writer (seed.py, an
+admin script, checkout) invalidates the in-process copy atomically, even from
+another process:
+
+  menu_version   bumped on INSERT/DELETE and on UPDATE OF name, price, category,
+                 is_available
+  stock_version  bumped on UPDATE OF stock
+
+MenuCatalog keeps an immutable MenuSnapshot (items + pre-serialized JSON) per
+menu_version and a pre-serialized stock map per stock_version. Serving a
+request costs one indexed lookup of the two version numbers.
+"""
+import json
+import threading
+from typing import Dict, NamedTuple, Optional, Tuple
+
+CATALOG_SCHEMA = """
+CREATE TABLE IF NOT EXISTS catalog_meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL DEFAULT 0
+);
+INSERT OR IGNORE INTO catalog_meta (key, value) VALUES ('menu_version', 1);
+INSERT OR IGNORE INTO catalog_meta (key, value) VALUES ('stock_version', 1);
+
+CREATE TRIGGER IF NOT EXISTS menu_items_version_insert AFTER INSERT ON menu_items
+BEGIN
+    UPDATE catalog_meta SET value = value + 1 WHERE key IN ('menu_version', 'stock_version');
+END;
+
+CREATE TRIGGER IF NOT EXISTS menu_items_version_delete AFTER DELETE ON menu_items
+BEGIN
+    UPDATE catalog_meta SET value = value + 1 WHERE key IN ('menu_version', 'stock_version');
+END;
+
+CREATE TRIGGER IF NOT EXISTS menu_items_version_update
+AFTER UPDATE OF name, price_in_paise, category, is_available ON menu_items
+BEGIN
+    UPDATE catalog_meta SET value = value + 1 WHERE key = 'menu_version';
+END;
+
+CREATE TRIGGER IF NOT EXISTS menu_items_stock_version
+AFTER UPDATE OF stock ON menu_items
+BEGIN
+    UPDATE catalog_meta SET value = value + 1 WHERE key = 'stock_version';
+END;
+"""
+
+
+def ensure_catalog_schema(conn) -> None:
+    """Creates catalog_meta and the version triggers (idempotent)."""
+    conn.executescript(CATALOG_SCHEMA)
+
+
+class MenuItem(NamedTuple):
+    id: int
+    name: str
+    price_in_paise: int
+    category: str
+
+
+class MenuSnapshot(NamedTuple):
+    version: int
+    items: Tuple[MenuItem, ...]
+    by_id: Dict[int, MenuItem]
+
+
+class StockSnapshot(NamedTuple):
+    version: int
+    stock: Dict[int, int]
+    body: bytes             # {"version": n, "stock": {"<id>": qty, ...}}
+
+
+class MenuCatalog:
+
+    def __init__(self, pool):
+        self.pool = pool
+        self._lock = threading.Lock()
+        self._menu: Optional[MenuSnapshot] = None
+        self._stock: Optional[StockSnapshot] = None
+        self._menu_body: Optional[Tuple[int, int, bytes]] = None  # (menu_version, stock_version, body)
+        self._schema_ready = False
+
+    # ---- versions ----
+    def _ensure_schema(self) -> None:
+        if self._schema_ready:
+            return
+        with self.pool.writer() as conn:
+            ensure_catalog_schema(conn)
+            conn.commit()
+        self._schema_ready = True
+
+    @staticmethod
+    def _read_versions(cur) -> Tuple[int, int]:
+        cur.execute("SELECT key, value FROM catalog_meta WHERE key IN ('menu_version', 'stock_version')")
+        versions = dict(cur.fetchall())
+        return versions.get("menu_version", 0), versions.get("stock_version", 0)
+
+    def versions(self) -> Tuple[int, int]:
+        self._ensure_schema()
+        with self.pool.reader() as conn:
+            return self._read_versions(conn.cursor())
+
+    # ---- snapshots ----
+    def _reload(self, want_menu: bool, want_stock: bool) -> None:
+        with self.pool.reader() as conn:
+            cur = conn.cursor()
+            # same read transaction for versions and rows, so they always match
+            cur.execute("BEGIN")
+            menu_version, stock_version = self._read_versions(cur)
+            if want_menu:
+                cur.execute("SELECT id, name, price_in_paise, category FROM menu_items "
+                            "WHERE is_available = 1 ORDER BY rowid")
+                items = tuple(MenuItem(*row) for row in cur.fetchall())
+                self._menu = MenuSnapshot(menu_version, items, {i.id: i for i in items})
+            if want_stock:
+                cur.execute("SELECT id, stock FROM menu_items WHERE is_available = 1")
+                stock = dict(cur.fetchall())
+                body = json.dumps({"version": stock_version, "stock": stock}).encode()
+                self._stock = StockSnapshot(stock_version, stock, body)
+
+    def snapshots(self) -> Tuple[MenuSnapshot, StockSnapshot]:
+        """Current (menu, stock) snapshots, reloading whichever one is stale."""
+        menu_version, stock_version = self.versions()
+        menu, stock = self._menu, self._stock
+        if menu is None or menu.version != menu_version or stock is None or stock.version != stock_version:
+            with self._lock:
+                menu, stock = self._menu, self._stock
+                want_menu = menu is None or menu.version != menu_version
+                want_stock = stock is None or stock.version != stock_version
+                if want_menu or want_stock:
+                    self._reload(want_menu, want_stock)
+                menu, stock = self._menu, self._stock
+        return menu, stock
+
+    def menu(self) -> MenuSnapshot:
+        return self.snapshots()[0]
+
+    def stock(self) -> StockSnapshot:
+        return self.snapshots()[1]
+
+    def menu_body(self) -> bytes:
+        """
+        Pre-serialized /api/menu payload (catalog fields plus current stock);
+        rebuilt only when either version moves.
+        """
+        menu, stock = self.snapshots()
+        cached = self._menu_body
+        if cached is not None and cached[0] == menu.version and cached[1] == stock.version:
+            return cached[2]
+        body = json.dumps([{
+            "id": item.id,
+            "name": item.name,
+            "price": item.price_in_paise / 100.0,
+            "category": item.category,
+            "stock": stock.stock.get(item.id, 0)
+        } for item in menu.items]).encode()
+        self._menu_body = (menu.version, stock.version, body)
+        return body
@@ -0,0 +1,217 @@
+# nearby_listings.py
+"""
+"What's near this NGO" over foodiq.db surplus_listings.
+
+listings_geo_urgent and listings_geo are SQLite R*Trees over the (lat, lng)
+points of AVAILABLE listings only, urgent and not. Triggers on surplus_listings keep it in step with every writer:
+a listing enters when it is inserted (or updated) as AVAILABLE with
+coordinates, and leaves when it is claimed/collected, deleted or loses its
+coordinates. The index stays the size of what is on offer, not of the history.
+
+nearby() answers "urgent first, then nearest" without scoring every listing
+in the circle: each tree is searched in rings growing from FIRST_RING_KM until
+one holds enough rows. A ring becomes a lat/lng bounding box for the R*Tree;
+the great-circle distance (SQL math functions) is computed only for the
+candidates in it, and rows outside the circle are dropped. About 0.3 ms per
+lookup at 1M listings (bench_nearby_listings.py).
+
+R*Tree and the math functions are compiled into the SQLite that ships with
+CPython's official builds (3.35+ for math).
+
+    locator = ListingLocator("foodiq.db")
+    locator.nearby(18.99, 73.12, radius_km=10, limit=20)
+
+    python nearby_listings.py foodiq.db 18.99 73.12 --radius 10
+"""
+import argparse
+import json
+import math
+import sqlite3
+from typing import Any, Dict, List, Tuple
+
+from db_pool import get_pool
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+# one tree per urgency class, so the urgent pass never reads past non-urgent rows
+GEO_TABLES = {1: "listings_geo_urgent", 0: "listings_geo"}
+
+GEO_SCHEMA = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS listings_geo_urgent USING rtree(id, min_lat, max_lat, min_lng, max_lng)",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS listings_geo USING rtree(id, min_lat, max_lat, min_lng, max_lng)",
+    """CREATE TRIGGER IF NOT EXISTS surplus_listings_geo_insert AFTER INSERT ON surplus_listings
+WHEN NEW.status = 'AVAILABLE' AND NEW.lat IS NOT NULL AND NEW.lng IS NOT NULL
+BEGIN
+    INSERT INTO listings_geo_urgent SELECT NEW.id, NEW.lat, NEW.lat, NEW.lng, NEW.lng WHERE NEW.is_urgent > 0;
+    INSERT INTO listings_geo SELECT NEW.id, NEW.lat, NEW.lat, NEW.lng, NEW.lng WHERE NOT COALESCE(NEW.is_urgent > 0, 0);
+END""",
+    """CREATE TRIGGER IF NOT EXISTS surplus_listings_geo_update AFTER UPDATE OF status, lat, lng, is_urgent ON surplus_listings
+BEGIN
+    DELETE FROM listings_geo_urgent WHERE id = OLD.id;
+    DELETE FROM listings_geo WHERE id = OLD.id;
+    INSERT INTO listings_geo_urgent SELECT NEW.id, NEW.lat, NEW.lat, NEW.lng, NEW.lng
+        WHERE NEW.status = 'AVAILABLE' AND NEW.lat IS NOT NULL AND NEW.lng IS NOT NULL AND NEW.is_urgent > 0;
+    INSERT INTO listings_geo SELECT NEW.id, NEW.lat, NEW.lat, NEW.lng, NEW.lng
+        WHERE NEW.status = 'AVAILABLE' AND NEW.lat IS NOT NULL AND NEW.lng IS NOT NULL AND NOT COALESCE(NEW.is_urgent > 0, 0);
+END""",
+    """CREATE TRIGGER IF NOT EXISTS surplus_listings_geo_delete AFTER DELETE ON surplus_listings
+BEGIN
+    DELETE FROM listings_geo_urgent WHERE id = OLD.id;
+    DELETE FROM listings_geo WHERE id = OLD.id;
+END""",
+]
+_BACKFILL = """
+    INSERT INTO {table} SELECT id, lat, lat, lng, lng FROM surplus_listings
+    WHERE status = 'AVAILABLE' AND lat IS NOT NULL AND lng IS NOT NULL AND {urgency}
+"""
+BACKFILL_SQL = [_BACKFILL.format(table="listings_geo_urgent", urgency="is_urgent > 0"),
+                _BACKFILL.format(table="listings_geo", urgency="NOT COALESCE(is_urgent > 0, 0)")]
+
+# haversine; :lat/:lng is the NGO, s.* the listing
+_DISTANCE = f"""{2 * EARTH_RADIUS_KM} * asin(min(1.0, sqrt(
+        pow(sin(radians(s.lat - :lat) / 2), 2)
+        + cos(radians(:lat)) * cos(radians(s.lat)) * pow(sin(radians(s.lng - :lng) / 2), 2))))"""
+# the nearest :limit listings of one urgency class within :radius_km
+WITHIN_SQL = """
+    SELECT s.id, s.item_name, s.qty_kg, s.lat, s.lng, s.is_urgent, s.created_at,
+           {distance} AS distance_km
+    FROM {table} g
+    JOIN surplus_listings s ON s.id = g.id
+    WHERE g.max_lat >= :min_lat AND g.min_lat <= :max_lat      -- overlap: the R*Tree's float32 boxes round outwards
+      AND g.max_lng >= :min_lng AND g.min_lng <= :max_lng
+      AND +s.status = 'AVAILABLE'     -- stay on the R*Tree, not the (status, reserved_until) index
+      AND distance_km <= :radius_km
+    ORDER BY distance_km, s.id
+    LIMIT :limit
+"""
+WITHIN_SQL = {urgent: WITHIN_SQL.format(table=table, distance=_DISTANCE) for urgent, table in GEO_TABLES.items()}
+NEARBY_COLUMNS = ["id", "item_name", "qty_kg", "lat", "lng", "is_urgent", "created_at", "distance_km"]
+FIRST_RING_KM = 0.25        # nearby() starts here and grows the ring until it has enough rows
+DEFAULT_LIMIT = 50
+MAX_RADIUS_KM = 500.0
+
+
+def geo_installed(conn: sqlite3.Connection) -> bool:
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'listings_geo'").fetchone() is not None
+
+
+def ensure_geo_schema(conn: sqlite3.Connection) -> bool:
+    """
+    Creates the listings_geo trees and their triggers (idempotent). On first install the
+    index is filled from the existing listings in the same transaction.
+    Returns True if it installed.
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if geo_installed(conn):
+            conn.rollback()
+            return False
+        for sql in GEO_SCHEMA + BACKFILL_SQL:
+            conn.execute(sql)
+        conn.commit()
+        return True
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def bounding_box(lat: float, lng: float, radius_km: float) -> Tuple[float, float, float, float]:
+    """
+    (min_lat, max_lat, min_lng, max_lng) containing every point within
+    radius_km of (lat, lng). Circles reaching a pole or the antimeridian get
+    the full longitude range.
+    """
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180) or radius_km < 0:
+        raise ValueError("lat/lng out of range or negative radius")
+    d_lat = radius_km / KM_PER_DEGREE
+    min_lat, max_lat = lat - d_lat, lat + d_lat
+    if min_lat <= -90 or max_lat >= 90:
+        return max(min_lat, -90.0), min(max_lat, 90.0), -180.0, 180.0
+    # widest point of the circle, not its longitude at the centre latitude
+    s = math.sin(radius_km / EARTH_RADIUS_KM) / math.cos(math.radians(lat))
+    if s >= 1:
+        return min_lat, max_lat, -180.0, 180.0
+    d_lng = math.degrees(math.asin(s))
+    if lng - d_lng < -180 or lng + d_lng > 180:
+        return min_lat, max_lat, -180.0, 180.0
+    return min_lat, max_lat, lng - d_lng, lng + d_lng
+
+
+def _within(conn: sqlite3.Connection, lat: float, lng: float, radius_km: float, urgent: int, limit: int) -> list:
+    min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, radius_km)
+    return conn.execute(WITHIN_SQL[urgent], {
+        "lat": lat, "lng": lng, "radius_km": radius_km, "limit": limit,
+        "min_lat": min_lat, "max_lat": max_lat, "min_lng": min_lng, "max_lng": max_lng,
+    }).fetchall()
+
+
+def nearby(conn: sqlite3.Connection, lat: float, lng: float, radius_km: float,
+           limit: int = DEFAULT_LIMIT) -> List[Dict[str, Any]]:
+    """
+    AVAILABLE listings within radius_km of (lat, lng): urgent first, then by
+    distance (ties by id).
+
+    Each urgency class is searched in growing rings (from FIRST_RING_KM,
+    capped at radius_km) until a ring holds the rows still needed; those are
+    the nearest overall, since everything outside the ring is farther. A
+    query reads a few times `limit` rows however dense the area is.
+    """
+    bounding_box(lat, lng, radius_km)       # validates
+    rows = []
+    for urgent in (1, 0):
+        need = limit - len(rows)
+        if need <= 0:
+            break
+        ring = min(radius_km, FIRST_RING_KM)
+        while True:
+            found = _within(conn, lat, lng, ring, urgent, need)
+            if len(found) >= need or ring >= radius_km:
+                break
+            # grow to where the density seen so far predicts `need` rows (area at least x2.25)
+            ring = min(radius_km, ring * max(1.5, 1.2 * math.sqrt(need / max(len(found), 1))))
+        rows += found
+    return [dict(zip(NEARBY_COLUMNS, row)) for row in rows]
+
+
+class ListingLocator:
+    """Nearby-listing lookups for one foodiq.db; installs listings_geo on first use."""
+
+    def __init__(self, db_path: str = "foodiq.db"):
+        self.pool = get_pool(db_path)
+        self._schema_ready = False
+
+    def _ensure_schema(self) -> None:
+        if self._schema_ready:
+            return
+        with self.pool.writer() as conn:
+            ensure_geo_schema(conn)
+        self._schema_ready = True
+
+    def nearby(self, lat: float, lng: float, radius_km: float, limit: int = DEFAULT_LIMIT) -> List[Dict[str, Any]]:
+        self._ensure_schema()
+        with self.pool.reader() as conn:
+            return nearby(conn, lat, lng, radius_km, limit)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AVAILABLE surplus listings near a point.")
+    parser.add_argument("db_path", nargs="?", default="foodiq.db")
+    parser.add_argument("lat", type=float)
+    parser.add_argument("lng", type=float)
+    parser.add_argument("--radius", type=float, default=10.0, help="km (default 10)")
+    parser.add_argument("--limit", type=int, default=DEFAULT_LIMIT)
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db_path, isolation_level=None)
+    try:
+        if ensure_geo_schema(conn):
+            print("installed listings_geo")
+        for row in nearby(conn, args.lat, args.lng, args.radius, args.limit):
+            print(json.dumps(row))
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+# response_cache.py
+"""
+Response cache for the read-only analytics endpoints.
+
+Entries are keyed by endpoint path + query string and carry the pre-serialized
+body, an ETag, an expiry time and the version of every data source the view
+reads. A hit is only served while all source versions are unchanged, so the
+cache is invalidated precisely when the data changes:
+
+  - SQLite sources: PRAGMA data_version on a long-lived connection (changes on
+    every commit made by any other connection/process) plus the file identity,
+    so a deleted and re-created database is noticed too
+  - files (CSV): mtime + size
+  - in-process writers (Billing_app.checkout) call invalidate_source(path)
+    right after committing, which bumps a generation counter for that path
+
+Usage:
+
+    @app.route("/api/overall")
+    @cached_json(sources=[csv_source(CSV_PATH)])
+    def overall(): ...
+
+Requests with a matching If-None-Match get a 304 without the view running or
+any JSON being serialized.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+from urllib.parse import urlencode
+
+from flask import Response, make_response, request
+
+DEFAULT_TTL = 60.0
+DEFAULT_MAX_ENTRIES = 256
+
+# ---- source versions ----
+_generations: Dict[str, int] = {}
+_generations_lock = threading.Lock()
+
+
+def invalidate_source(path: str) -> None:
+    """Marks everything derived from path as stale (call after committing a write)."""
+    key = os.path.abspath(path)
+    with _generations_lock:
+        _generations[key] = _generations.get(key, 0) + 1
+
+
+def _generation(path: str) -> int:
+    return _generations.get(path, 0)
+
+
+def _file_identity(path: str) -> Tuple[int, int, int]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return (0, 0, 0)
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+class FileSource:
+    """Version of a plain file: (generation, inode, mtime, size)."""
+
+    def __init__(self, path: str):
+        self.path = os.path.abspath(path)
+
+    def version(self) -> Tuple:
+        return (_generation(self.path),) + _file_identity(self.path)
+
+
+class SQLiteSource:
+    """
+    Version of a SQLite database. data_version is per-connection and only moves
+    when *another* connection commits, so a dedicated connection is kept open
+    just for probing it.
+    """
+
+    def __init__(self, db_path: str):
+        self.path = os.path.abspath(db_path)
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._identity = None
+
+    def _data_version(self) -> int:
+        identity = _file_identity(self.path)[:1]
+        if self._conn is None or identity != self._identity:
+            if self._conn is not None:
+                self._conn.close()
+            if not os.path.exists(self.path):
+                self._conn = None
+                return -1
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._identity = identity
+        return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def version(self) -> Tuple:
+        with self._lock:
+            try:
+                data_version = self._data_version()
+            except sqlite3.Error:
+                data_version = -1
+        # the main file's mtime also covers journal_mode=DELETE writes by processes
+        # that started before our probe connection
+        return (_generation(self.path), data_version) + _file_identity(self.path)
+
+
+_sources: Dict[Tuple[str, str], Any] = {}
+_sources_lock = threading.Lock()
+
+
+def _shared_source(kind: str, path: str, factory: Callable[[str], Any]):
+    key = (kind, os.path.abspath(path))
+    with _sources_lock:
+        src = _sources.get(key)
+        if src is None:
+            src = _sources[key] = factory(path)
+        return src
+
+
+def sqlite_source(db_path: str) -> SQLiteSource:
+    return _shared_source("sqlite", db_path, SQLiteSource)
+
+
+def csv_source(path: str) -> FileSource:
+    return _shared_source("file", path, FileSource)
+
+
+# ---- cache ----
+class _Entry:
+    __slots__ = ("body", "etag", "mimetype", "expires_at", "version")
+
+    def __init__(self, body: bytes, etag: str, mimetype: str, expires_at: float, version: Tuple):
+        self.body = body
+        self.etag = etag
+        self.mimetype = mimetype
+        self.expires_at = expires_at
+        self.version = version
+
+
+class ResponseCache:
+    """Thread-safe LRU of serialized responses with a TTL per entry."""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, ttl: float = DEFAULT_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def get(self, key: str, version: Tuple) -> Optional[_Entry]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry.expires_at <= now or entry.version != version:
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: str, entry: _Entry) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits,
+                    "misses": self.misses, "not_modified": self.not_modified}
+
+
+# process-wide cache shared by all decorated endpoints
+cache = ResponseCache()
+
+
+def _etag(body: bytes) -> str:
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+def _request_key() -> str:
+    # re-encoded, so an escaped "&" or "=" inside a value can't pose as another parameter
+    return f"{request.path}?{urlencode(sorted(request.args.items(multi=True)))}"
+
+
+def _respond(entry: _Entry) -> Response:
+    if request.if_none_match.contains(entry.etag):
+        cache.not_modified += 1
+        resp = Response(status=304)
+    else:
+        resp = Response(entry.body, mimetype=entry.mimetype)
+    resp.set_etag(entry.etag)
+    # let browsers keep the body but always revalidate with If-None-Match
+    resp.headers["Cache-Control"] = "no-cache"
+    return resp
+
+
+def cached_json(sources: Iterable[Any] = (), ttl: Optional[float] = None):
+    """
+    Caches successful (200) responses of a GET view, keyed by path + query args
+    and validated against the versions of `sources`.
+    """
+    sources = tuple(sources)
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            key = _request_key()
+            version = tuple(s.version() for s in sources)
+            entry = cache.get(key, version)
+            if entry is not None:
+                return _respond(entry)
+
+            resp = make_response(view(*args, **kwargs))
+            if resp.status_code != 200 or resp.is_streamed:
+                return resp
+            body = resp.get_data()
+            entry = _Entry(body, _etag(body), resp.mimetype,
+                           time.monotonic() + (cache.ttl if ttl is None else ttl), version)
+            cache.put(key, entry)
+            return _respond(entry)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,269 @@
+# sales_projection.py
+"""
+Change capture from POS orders into the analytics tables.
+
+Billing_app writes orders/order_items (paise integers); the business-stats
+loaders read `transactions` (rupee floats). An AFTER INSERT trigger on
+order_items appends the new line's id to order_item_outbox inside the
+checkout transaction, so every committed sale is captured no matter which
+writer made it, and a rolled-back order leaves nothing behind.
+
+SalesProjector drains the outbox in batches. One BEGIN IMMEDIATE transaction
+per batch:
+
+  1. INSERT INTO transactions ... SELECT over the batch (one row per order line:
+     price = quantity * unit price in rupees, cost 0.0 since menu_items has no
+     cost column, customer NULL -> "Anonymous" in the loaders)
+  2. upsert the batch's per-(day, menu item) totals into sales_daily
+  3. DELETE the batch from the outbox
+
+so each order line is projected exactly once, even with several consumers
+(one per worker process). Order history is never rescanned: the
+BusinessStatsAggregator watermark picks up the new transactions rows and
+sales_daily answers per-day questions directly.
+
+Days are the server's local date of orders.created_at (stored as UTC).
+
+    python sales_projection.py pos_system.db              # drain the outbox once
+    python sales_projection.py pos_system.db --backfill   # also project orders from before capture was installed
+"""
+import argparse
+import logging
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional
+
+from business_stats import TRANSACTIONS_SCHEMA
+
+logger = logging.getLogger("Ironclad_POS")
+
+PROJECTION_SCHEMA = f"""
+BEGIN IMMEDIATE;
+{TRANSACTIONS_SCHEMA};
+
+CREATE TABLE IF NOT EXISTS order_item_outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    order_item_id INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS sales_daily (
+    day TEXT NOT NULL,
+    menu_item_id INTEGER NOT NULL,
+    item_name TEXT NOT NULL,
+    category TEXT,
+    quantity INTEGER NOT NULL DEFAULT 0,
+    revenue_in_paise INTEGER NOT NULL DEFAULT 0,
+    lines INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, menu_item_id)
+);
+
+CREATE TABLE IF NOT EXISTS sales_projection_meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL DEFAULT 0
+);
+-- order lines that existed before capture was installed (projected only by --backfill)
+INSERT OR IGNORE INTO sales_projection_meta (key, value)
+    SELECT 'backfill_max_order_item_id', COALESCE(MAX(id), 0) FROM order_items;
+
+CREATE TRIGGER IF NOT EXISTS order_items_outbox AFTER INSERT ON order_items
+BEGIN
+    INSERT INTO order_item_outbox (order_item_id) VALUES (NEW.id);
+END;
+
+COMMIT;
+"""
+
+# the batch is every outbox row with id <= ?
+_BATCH_LINES = """
+    FROM order_item_outbox ob
+    JOIN order_items oi ON oi.id = ob.order_item_id
+    JOIN orders o ON o.id = oi.order_id
+    LEFT JOIN menu_items m ON m.id = oi.menu_item_id
+    WHERE ob.id <= ?
+"""
+PROJECT_TRANSACTIONS_SQL = f"""
+    INSERT INTO transactions (date, item, category, price, cost, customer)
+    SELECT date(o.created_at, 'localtime'), oi.item_name, m.category,
+           oi.quantity * oi.price_at_sale_in_paise / 100.0, 0.0, NULL
+    {_BATCH_LINES}
+    ORDER BY ob.id
+"""
+PROJECT_DAILY_SQL = f"""
+    INSERT INTO sales_daily (day, menu_item_id, item_name, category, quantity, revenue_in_paise, lines)
+    SELECT date(o.created_at, 'localtime'), oi.menu_item_id, MAX(oi.item_name), MAX(m.category),
+           SUM(oi.quantity), SUM(oi.quantity * oi.price_at_sale_in_paise), COUNT(*)
+    {_BATCH_LINES}
+    GROUP BY 1, 2
+    ON CONFLICT (day, menu_item_id) DO UPDATE SET
+        item_name = excluded.item_name,
+        category = excluded.category,
+        quantity = quantity + excluded.quantity,
+        revenue_in_paise = revenue_in_paise + excluded.revenue_in_paise,
+        lines = lines + excluded.lines
+"""
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_INTERVAL = 2.0      # seconds between polls when nobody calls notify()
+
+
+def ensure_projection_schema(conn: sqlite3.Connection) -> None:
+    """Creates the outbox, sales_daily and the capture trigger (idempotent)."""
+    conn.executescript(PROJECTION_SCHEMA)
+
+
+def project_batch(conn: sqlite3.Connection, batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    """
+    Projects up to batch_size captured order lines in one write transaction;
+    returns how many were projected (0 = outbox empty).
+    """
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        cur = conn.execute("SELECT MAX(id), COUNT(*) FROM (SELECT id FROM order_item_outbox ORDER BY id LIMIT ?)",
+                           (batch_size,))
+        last_id, n = cur.fetchone()
+        if not n:
+            conn.rollback()
+            return 0
+        conn.execute(PROJECT_TRANSACTIONS_SQL, (last_id,))
+        conn.execute(PROJECT_DAILY_SQL, (last_id,))
+        conn.execute("DELETE FROM order_item_outbox WHERE id <= ?", (last_id,))
+        conn.commit()
+        return n
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def enqueue_backfill(conn: sqlite3.Connection) -> int:
+    """
+    Queues the order lines that predate the capture trigger, once: the
+    watermark is cleared in the same transaction. Returns how many were queued.
+    """
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        row = conn.execute("SELECT value FROM sales_projection_meta "
+                           "WHERE key = 'backfill_max_order_item_id'").fetchone()
+        max_id = row[0] if row else 0
+        cur = conn.execute("INSERT INTO order_item_outbox (order_item_id) "
+                           "SELECT id FROM order_items WHERE id <= ? ORDER BY id", (max_id,))
+        conn.execute("UPDATE sales_projection_meta SET value = 0 WHERE key = 'backfill_max_order_item_id'")
+        conn.commit()
+        return cur.rowcount
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def daily_sales(conn: sqlite3.Connection, start: Optional[str] = None, end: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Per-day totals from sales_daily, start/end inclusive (YYYY-MM-DD)."""
+    q = "SELECT day, SUM(quantity), SUM(revenue_in_paise), SUM(lines) FROM sales_daily WHERE 1 = 1"
+    params = []
+    if start:
+        q += " AND day >= ?"
+        params.append(start)
+    if end:
+        q += " AND day <= ?"
+        params.append(end)
+    q += " GROUP BY day ORDER BY day"
+    return [{"date": day, "quantity": qty, "revenue": paise / 100.0, "lines": lines}
+            for day, qty, paise, lines in conn.execute(q, params)]
+
+
+class SalesProjector:
+    """
+    Background consumer of order_item_outbox for one ConnectionPool.
+
+    The thread drains the outbox whenever notify() is called (Billing_app does
+    after each checkout) and otherwise every `interval` seconds, which also
+    catches orders written by other processes. Each batch holds the pool's
+    writer only for its own short transaction.
+    """
+
+    def __init__(self, pool, batch_size: int = DEFAULT_BATCH_SIZE, interval: float = DEFAULT_INTERVAL):
+        self.pool = pool
+        self.batch_size = batch_size
+        self.interval = interval
+        self._wake = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sales-projector", daemon=True)
+        self._started = False
+        self._start_lock = threading.Lock()
+        self._schema_ready = False
+        self.projected = 0
+        self.batches = 0
+        self.errors = 0
+
+    def _ensure_schema(self) -> None:
+        if self._schema_ready:
+            return
+        with self.pool.writer() as conn:
+            ensure_projection_schema(conn)
+        self._schema_ready = True
+
+    def start(self) -> None:
+        """Installs capture (if needed) before returning, then starts the consumer thread."""
+        if self._started:
+            return
+        with self._start_lock:
+            if not self._started:
+                self._ensure_schema()
+                self._thread.start()
+                self._started = True
+
+    def notify(self) -> None:
+        self._wake.set()
+
+    def drain(self) -> int:
+        """Projects everything currently in the outbox; returns the number of order lines."""
+        self._ensure_schema()
+        total = 0
+        while True:
+            with self.pool.writer() as conn:
+                n = project_batch(conn, self.batch_size)
+            if not n:
+                return total
+            total += n
+            self.projected += n
+            self.batches += 1
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                self.drain()
+            except Exception as e:
+                # rows stay in the outbox and are retried on the next wake-up
+                self.errors += 1
+                logger.error(f"Sales projection failed: {e}")
+
+    def metrics(self) -> Dict[str, Any]:
+        with self.pool.reader() as conn:
+            pending = conn.execute("SELECT COUNT(*) FROM order_item_outbox").fetchone()[0] if self._schema_ready else None
+        return {"projected": self.projected, "batches": self.batches, "errors": self.errors, "pending": pending}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Project captured POS order lines into transactions/sales_daily.")
+    parser.add_argument("db_path", nargs="?", default="pos_system.db")
+    parser.add_argument("--backfill", action="store_true",
+                        help="also project order lines written before capture was installed (once)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db_path, isolation_level=None)
+    try:
+        ensure_projection_schema(conn)
+        if args.backfill:
+            print(f"queued {enqueue_backfill(conn)} order lines from before capture")
+        total = 0
+        while True:
+            n = project_batch(conn, args.batch_size)
+            if not n:
+                break
+            total += n
+        print(f"projected {total} order lines")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,8 @@
 # setup_database.py
 import sqlite3
 import os
+from business_stats import ensure_date_indexes
+from business_summaries import ensure_summary_schema
 
 DB_PATH = "pos_system.db"
 
@@ -68,6 +70,13 @@ def setup_database():
     """, sample_expenses)
     
     conn.commit()
+
+    # Daily summary tables + triggers, filled from the rows above
+    # (DROP TABLE also dropped any previous summary triggers)
+    ensure_summary_schema(conn)
+
+    # date indexes for the from/to range scans of /api/business_stats
+    ensure_date_indexes(conn)
     
     # Verify the data
     cursor.execute("SELECT COUNT(*) as count FROM transactions")
@@ -1,5 +1,8 @@
 import sqlite3
 import os
+from business_stats import ensure_date_indexes
+from menu_catalog import ensure_catalog_schema
+from sales_projection import ensure_projection_schema
 
 DB_NAME = "pos_system.db"
 
@@ -52,6 +55,15 @@ def init_db():
     );
     """)
 
+    # catalog_meta + version triggers used by the in-process menu catalog
+    ensure_catalog_schema(conn)
+
+    # order_items capture trigger + outbox/sales_daily for the analytics projection
+    ensure_projection_schema(conn)
+
+    # transactions.date index for the from/to range scans of /api/business_stats
+    ensure_date_indexes(conn)
+
     conn.commit()
     conn.close()
     print(f"✅ Ironclad Database '{DB_NAME}' initialized successfully.")
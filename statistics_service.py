@@ -1,114 +1,482 @@
 # statistics_service.py
+import io
+import json
+import logging
+import os
+import threading
+
 import pandas as pd
 import numpy as np
-import os
+
+import stats_snapshot
 
 WEEKDAY_ORDER = ["Monday","Tuesday","Wednesday","Thursday","Friday","Saturday","Sunday"]
+QUANTITY_COLUMNS = ["quantity_prepared", "quantity_consumed", "surplus"]
+FINGERPRINT_BYTES = 64      # tail of the consumed CSV bytes, used to detect a rewritten file
+ROLLUP_NAMES = ("overall", "daily", "dishes", "weekday")
+
+def _compact_json(data):
+    return json.dumps(data, sort_keys=True, separators=(",", ":")).encode() + b"\n"
+
+class _Rollups:
+    """Materialized query results for one version of the data, plus their JSON encodings."""
+    __slots__ = ("overall", "daily", "dishes", "weekday", "json")
+
+    def __init__(self, overall, daily, dishes, weekday):
+        self.overall = overall
+        self.daily = daily
+        self.dishes = dishes        # ranked by waste_rate_percent, highest first
+        self.weekday = weekday
+        self.json = {}
 
 class StatisticsService:
+    """
+    Canteen statistics over canteen_data.csv.
+
+    The CSV is aggregated to one row per (date, dish_name) in self.df, with
+    daily / dish / weekday / grand-total rollups kept alongside it. After each
+    merge the query results are materialized once, so overall_summary(),
+    daily_stats(), dish_wise_stats() and weekday_trends() answer in
+    O(result size), and rollup_json() serves their JSON encoding without
+    re-serializing until the data changes. New data is merged in
+    incrementally instead of reprocessing the whole history:
+
+      refresh()     reads only the bytes appended to the CSV since the last
+                    load (complete lines only); a file that shrank or was
+                    rewritten is reloaded from scratch
+      append(rows)  merges records (list of dicts or a DataFrame) that are not
+                    in the CSV; don't also write them to the CSV, or refresh()
+                    will count them twice
+
+    With snapshot_dir set, startup loads the preprocessed frame from a binary
+    columnar snapshot (see stats_snapshot.py) when the CSV still starts with
+    the bytes it was built from, then reads only the newer CSV tail. A full
+    CSV load writes a fresh snapshot; save_snapshot() writes one on demand.
+
+    compact=True stores self.df with memory-optimized dtypes: categorical
+    dish_name / month / day_of_week, float32 quantities and int16 year
+    (rollups are still summed in float64). API outputs are unchanged as long
+    as per-(date, dish) quantities fit float32 exactly, i.e. whole numbers
+    below 2**24. memory_report() shows the difference.
+    """
     REQUIRED_COLUMNS = {"date", "dish_name", "quantity_prepared", "quantity_consumed"}
 
-    def __init__(self, csv_path):
+    def __init__(self, csv_path, snapshot_dir=None, compact=False):
         if not os.path.exists(csv_path):
             raise FileNotFoundError(f"CSV not found at: {csv_path}")
-        self.df = pd.read_csv(csv_path)
-        # Try common ISO first, then fall back to day-first parse
+        self.csv_path = csv_path
+        self.snapshot_dir = snapshot_dir
+        self.compact = compact
+        self.loaded_from = None     # "snapshot", "csv" or "frame"
+        self._lock = threading.Lock()
+        self._load()
+
+    # ---- loading / incremental merge ----
+    def _reset(self):
+        self.df = pd.DataFrame()
+        self._keys = pd.MultiIndex.from_arrays([[], []], names=["date", "dish_name"])
+        self._daily = pd.DataFrame(columns=QUANTITY_COLUMNS, dtype=float,
+                                   index=pd.DatetimeIndex([], name="date"))
+        self._dish = pd.DataFrame(columns=QUANTITY_COLUMNS, dtype=float,
+                                  index=pd.Index([], name="dish_name"))
+        self._weekday = pd.DataFrame({
+            "total_prepared": 0.0, "total_consumed": 0.0, "total_surplus": 0.0, "days_count": 0
+        }, index=pd.Index(WEEKDAY_ORDER, name="day_of_week"))
+        self._totals = dict.fromkeys(QUANTITY_COLUMNS, 0.0)
+        self._date_index = None
+        self._materialize()
+
+    def _load(self):
+        if self.snapshot_dir and self._load_snapshot():
+            self._read_tail()
+            return
+        with open(self.csv_path, "rb") as f:
+            data = f.read()
+        raw = pd.read_csv(io.BytesIO(data))
+        self._columns = list(raw.columns)
+        self._validate_columns(raw)
+        self._reset()
+        self._merge(raw)
+        self._offset = len(data)
+        self._fingerprint = data[-FINGERPRINT_BYTES:]
+        self.loaded_from = "csv"
+        if self.snapshot_dir:
+            try:
+                self._save_snapshot()
+            except OSError as e:
+                logging.warning("could not write stats snapshot %s: %s", self.snapshot_dir, e)
+
+    def _load_snapshot(self):
+        meta = stats_snapshot.read_meta(self.snapshot_dir)
+        if meta is None or not stats_snapshot.matches_source(meta, self.csv_path):
+            return False
         try:
-            self.df["date"] = pd.to_datetime(self.df["date"], format="%Y-%m-%d", errors="raise")
-        except Exception:
-            self.df["date"] = pd.to_datetime(self.df["date"], dayfirst=True, errors="coerce")
-        self._validate_columns()
-        self._preprocess()
+            df = stats_snapshot.load_snapshot(self.snapshot_dir, meta, WEEKDAY_ORDER)
+        except (OSError, ValueError, KeyError) as e:
+            logging.warning("ignoring unreadable stats snapshot %s: %s", self.snapshot_dir, e)
+            return False
+        self._columns = meta["columns"]
+        self._reset()
+        self._merge_aggregated(self._compact(df) if self.compact else df)
+        self._offset = meta["offset"]
+        self._fingerprint = bytes.fromhex(meta["fingerprint"])
+        self.loaded_from = "snapshot"
+        return True
 
-    def _validate_columns(self):
-        missing = self.REQUIRED_COLUMNS - set(self.df.columns)
-        if missing:
-            raise ValueError(f"Missing columns in data: {missing}")
+    def _save_snapshot(self):
+        stats_snapshot.save_snapshot(self.df, self.snapshot_dir, self._offset, self._fingerprint, self._columns)
 
-    def _preprocess(self):
-        self.df["quantity_prepared"] = pd.to_numeric(self.df["quantity_prepared"], errors="coerce").fillna(0).astype(float)
-        self.df["quantity_consumed"] = pd.to_numeric(self.df["quantity_consumed"], errors="coerce").fillna(0).astype(float)
-        self.df["surplus"] = self.df["quantity_prepared"] - self.df["quantity_consumed"]
-        self.df["dish_name"] = self.df["dish_name"].astype(str).str.strip().str.lower()
-        self.df["day_of_week"] = self.df["date"].dt.day_name()
-        self.df["day_of_week"] = pd.Categorical(self.df["day_of_week"], categories=WEEKDAY_ORDER, ordered=True)
-        self.df["year"] = self.df["date"].dt.year
-        self.df["month"] = self.df["date"].dt.to_period("M").astype(str)
-        # aggregate duplicates
-        self.df = self.df.groupby(["date","dish_name"], as_index=False).agg({
-            "quantity_prepared":"sum",
-            "quantity_consumed":"sum",
-            "surplus":"sum",
-            "day_of_week":"first",
-            "year":"first",
-            "month":"first"
-        })
+    def save_snapshot(self):
+        """Persists the current frame (including append()ed rows) for the next startup."""
+        if not self.snapshot_dir:
+            raise ValueError("StatisticsService has no snapshot_dir")
+        with self._lock:
+            self._save_snapshot()
 
-    # 1. overall
-    def overall_summary(self):
-        total_prepared = self.df["quantity_prepared"].sum()
-        total_consumed = self.df["quantity_consumed"].sum()
-        total_surplus = self.df["surplus"].sum()
-        avg_surplus = float(self.df["surplus"].mean()) if not self.df.empty else 0.0
+    def refresh(self):
+        """Merges rows appended to the CSV since the last load; returns how many were read."""
+        if self.csv_path is None:
+            return 0
+        with self._lock:
+            return self._read_tail()
+
+    def _read_tail(self):
+        size = os.path.getsize(self.csv_path)
+        if size == self._offset:
+            return 0
+        with open(self.csv_path, "rb") as f:
+            start = max(self._offset - len(self._fingerprint), 0)
+            f.seek(start)
+            if size < self._offset or f.read(len(self._fingerprint)) != self._fingerprint:
+                # truncated or rewritten: start over
+                self._load()
+                return len(self.df)
+            tail = f.read(size - self._offset)
+        end = tail.rfind(b"\n") + 1     # leave a half-written last line for next time
+        if end == 0:
+            return 0
+        chunk = tail[:end]
+        raw = pd.read_csv(io.BytesIO(chunk), header=None, names=self._columns)
+        self._merge(raw)
+        self._offset += end
+        self._fingerprint = (self._fingerprint + chunk)[-FINGERPRINT_BYTES:]
+        return len(raw)
+
+    def append(self, rows):
+        """Merges in-memory records (not read from the CSV); returns how many were added."""
+        raw = rows if isinstance(rows, pd.DataFrame) else pd.DataFrame(list(rows))
+        self._validate_columns(raw)
+        with self._lock:
+            self._merge(raw)
+        return len(raw)
+
+    def _merge(self, raw):
+        self._merge_aggregated(self._preprocess(raw))
+
+    def _merge_aggregated(self, delta):
+        if delta.empty:
+            if self.df.empty:
+                self.df = delta     # keep the columns even with no data
+            return
+        keys = pd.MultiIndex.from_arrays([delta["date"], np.asarray(delta["dish_name"], dtype=object)],
+                                         names=["date", "dish_name"])
+        if self.df.empty:
+            df, existing = delta, np.zeros(len(delta), dtype=bool)
+            self._keys = keys
+        else:
+            # late rows for a (date, dish) we already have are summed into its row
+            # (on a copy, so readers never see a half-applied merge); new keys are appended
+            pos = self._keys.get_indexer(keys)
+            existing = pos >= 0
+            df = self.df
+            if existing.any():
+                df = df.copy()
+                cols = [df.columns.get_loc(c) for c in QUANTITY_COLUMNS]
+                df.iloc[pos[existing], cols] = (df.iloc[pos[existing], cols].to_numpy()
+                                                + delta.loc[existing, QUANTITY_COLUMNS].to_numpy())
+            if not existing.all():
+                added = delta[~existing]
+                if self.compact:
+                    df, added = self._unify_categories(df, added)
+                df = pd.concat([df, added], ignore_index=True)
+                self._keys = self._keys.append(keys[~existing])
+        self._update_rollups(delta)
+        self.df = df
+        self._materialize()
+
+    @staticmethod
+    def _unify_categories(df, added):
+        # concat keeps a categorical dtype only if both sides share the categories
+        df, added = df.copy(deep=False), added.copy(deep=False)
+        for col in ("dish_name", "month"):
+            categories = df[col].cat.categories.union(added[col].cat.categories)
+            df[col] = df[col].cat.set_categories(categories)
+            added[col] = added[col].cat.set_categories(categories)
+        return df, added
+
+    def _update_rollups(self, delta):
+        # float64 sums even when self.df holds float32
+        values = delta[QUANTITY_COLUMNS].astype(float)
+        daily = values.groupby(delta["date"]).sum()
+        new_dates = daily.index.difference(self._daily.index)
+
+        weekday = self._weekday.copy()
+        by_day = daily.groupby(daily.index.day_name()).sum().reindex(WEEKDAY_ORDER, fill_value=0)
+        weekday["total_prepared"] += by_day["quantity_prepared"].to_numpy()
+        weekday["total_consumed"] += by_day["quantity_consumed"].to_numpy()
+        weekday["total_surplus"] += by_day["surplus"].to_numpy()
+        weekday["days_count"] += (pd.Series(new_dates.day_name()).value_counts()
+                                  .reindex(WEEKDAY_ORDER, fill_value=0).to_numpy())
+
+        self._daily = self._daily.add(daily, fill_value=0).sort_index()
+        dish = values.groupby(delta["dish_name"].astype(str)).sum()
+        self._dish = self._dish.add(dish, fill_value=0).sort_index()
+        self._weekday = weekday
+        for col in QUANTITY_COLUMNS:
+            self._totals[col] += float(values[col].sum())
+
+    def _materialize(self):
+        # O(days + dishes) once per merge instead of a groupby per request
+        totals = self._totals
+        rows = len(self.df)
+        total_prepared = totals["quantity_prepared"]
+        total_consumed = totals["quantity_consumed"]
+        total_surplus = totals["surplus"]
+        avg_surplus = float(total_surplus / rows) if rows else 0.0
         avg_consumption_rate = (total_consumed / total_prepared) * 100 if total_prepared else 0.0
-        days = int(self.df["date"].nunique())
-        return {
+        overall = {
             "total_prepared": int(total_prepared),
             "total_consumed": int(total_consumed),
             "total_surplus": int(total_surplus),
             "avg_surplus_per_day": round(avg_surplus, 2),
             "avg_consumption_rate_percent": round(avg_consumption_rate, 2),
-            "days_reported": days
+            "days_reported": len(self._daily)
         }
 
-    # 2. daily stats
-    def daily_stats(self):
-        daily = self.df.groupby("date").agg({
-            "quantity_prepared":"sum",
-            "quantity_consumed":"sum",
-            "surplus":"sum"
-        }).reset_index().sort_values("date")
+        daily = self._daily.reset_index()
         daily["date"] = daily["date"].dt.strftime("%Y-%m-%d")
-        return daily.to_dict(orient="records")
 
-    # 3. dish-wise
-    def dish_wise_stats(self, top_n=None):
-        dish = self.df.groupby("dish_name").agg({
-            "quantity_prepared":"sum",
-            "quantity_consumed":"sum",
-            "surplus":"sum"
-        }).reset_index()
+        dish = self._dish.reset_index()
         dish["waste_rate_percent"] = np.where(dish["quantity_prepared"]>0,
                                              (dish["surplus"] / dish["quantity_prepared"]) * 100,
                                              0.0)
         dish = dish.sort_values("waste_rate_percent", ascending=False)
-        if top_n:
-            dish = dish.head(top_n)
-        return dish.to_dict(orient="records")
+
+        weekday = self._weekday.copy()
+        weekday["avg_surplus_per_day"] = np.where(weekday["days_count"]>0,
+                                                  weekday["total_surplus"]/weekday["days_count"], 0.0)
+        weekday = weekday.reset_index()
+        weekday["day_of_week"] = weekday["day_of_week"].astype(str)
+
+        self._rollups = _Rollups(overall,
+                                 daily.to_dict(orient="records"),
+                                 dish.to_dict(orient="records"),
+                                 weekday.to_dict(orient="records"))
+
+    @staticmethod
+    def _parse_dates(values):
+        # Try common ISO first, then fall back to day-first parse
+        try:
+            return pd.to_datetime(values, format="%Y-%m-%d", errors="raise")
+        except Exception:
+            return pd.to_datetime(values, dayfirst=True, errors="coerce")
+
+    def _validate_columns(self, df):
+        missing = self.REQUIRED_COLUMNS - set(df.columns)
+        if missing:
+            raise ValueError(f"Missing columns in data: {missing}")
+
+    def _preprocess(self, df):
+        agg = self._add_calendar(self.aggregate(df))
+        return self._compact(agg) if self.compact else agg
+
+    @classmethod
+    def aggregate(cls, df, keys=()):
+        """
+        Raw records -> one row per (*keys, date, dish_name) with summed
+        quantities and surplus (no calendar columns). Partial results for
+        disjoint sets of records can be concatenated and summed again, see
+        from_aggregated().
+        """
+        dates = cls._parse_dates(df["date"])
+        prepared = pd.to_numeric(df["quantity_prepared"], errors="coerce").fillna(0).astype(float)
+        consumed = pd.to_numeric(df["quantity_consumed"], errors="coerce").fillna(0).astype(float)
+        # normalize each distinct spelling once instead of every row
+        codes, spellings = pd.factorize(df["dish_name"].astype(str))
+        dish_names = pd.Index(spellings).str.strip().str.lower().take(codes)
+        frame = pd.DataFrame({
+            "date": dates,
+            "dish_name": dish_names,
+            "quantity_prepared": prepared.to_numpy(),
+            "quantity_consumed": consumed.to_numpy(),
+            "surplus": (prepared - consumed).to_numpy(),
+        })
+        for key in keys:
+            frame[key] = df[key].to_numpy()
+        # aggregate duplicates
+        return frame.groupby([*keys, "date","dish_name"], as_index=False)[QUANTITY_COLUMNS].sum()
+
+    @classmethod
+    def from_aggregated(cls, partials, compact=False):
+        """
+        Service over in-memory aggregate() results instead of a CSV (e.g. one
+        per canteen / date range, see canteen_source.py); overlapping
+        (date, dish_name) rows are summed. refresh() is a no-op; append() works.
+        """
+        svc = cls.__new__(cls)
+        svc.csv_path = None
+        svc.snapshot_dir = None
+        svc.compact = compact
+        svc.loaded_from = "frame"
+        svc._lock = threading.Lock()
+        svc._reset()
+        partials = [p for p in partials if not p.empty]
+        if partials:
+            frame = partials[0] if len(partials) == 1 else pd.concat(partials, ignore_index=True)
+            agg = frame.groupby(["date","dish_name"], as_index=False)[QUANTITY_COLUMNS].sum()
+            agg = cls._add_calendar(agg)
+            svc._merge_aggregated(cls._compact(agg) if compact else agg)
+        else:
+            svc.df = cls._add_calendar(cls.aggregate(pd.DataFrame(columns=sorted(cls.REQUIRED_COLUMNS))))
+        return svc
+
+    @staticmethod
+    def _add_calendar(agg):
+        # day_of_week / year / month derived once per distinct day (from its day
+        # number since the epoch), then broadcast to that day's rows
+        day_codes, days = pd.factorize(agg["date"])
+        days = pd.DatetimeIndex(days)
+        day_numbers = days.to_numpy().astype("datetime64[D]").astype(np.int64)
+        weekday = (day_numbers + 3) % 7         # 1970-01-01 was a Thursday; Monday = 0
+        agg["day_of_week"] = pd.Categorical.from_codes(weekday[day_codes], categories=WEEKDAY_ORDER, ordered=True)
+        agg["year"] = days.year.to_numpy()[day_codes]
+        agg["month"] = pd.Index(days.strftime("%Y-%m")).take(day_codes)
+        return agg
+
+    @staticmethod
+    def _compact(df):
+        df = df.copy()
+        df["dish_name"] = df["dish_name"].astype("category")
+        df["month"] = df["month"].astype("category")
+        df["year"] = df["year"].astype(np.int16)
+        for col in QUANTITY_COLUMNS:
+            df[col] = df[col].astype(np.float32)
+        return df
+
+    def memory_report(self):
+        """Bytes per column of self.df (deep, i.e. counting string contents)."""
+        usage = self.df.memory_usage(deep=True, index=True)
+        return {
+            "mode": "compact" if self.compact else "standard",
+            "rows": len(self.df),
+            "columns": {col: int(n) for col, n in usage.items()},
+            "dtypes": {col: str(t) for col, t in self.df.dtypes.items()},
+            "total_bytes": int(usage.sum()),
+        }
+
+    # 1. overall
+    def overall_summary(self):
+        return dict(self._rollups.overall)
+
+    # 2. daily stats
+    def daily_stats(self):
+        return list(self._rollups.daily)
+
+    # 3. dish-wise
+    def dish_wise_stats(self, top_n=None):
+        dishes = self._rollups.dishes
+        return dishes[:top_n] if top_n else list(dishes)
 
     def most_wasted_dish(self):
         stats = self.dish_wise_stats(top_n=1)
         return stats[0] if stats else None
 
     def weekday_trends(self):
-        counts = (self.df.groupby("day_of_week")["date"].nunique().reindex(WEEKDAY_ORDER).fillna(0).astype(int))
-        agg = (self.df.groupby("day_of_week")
-               .agg(total_prepared=("quantity_prepared","sum"),
-                    total_consumed=("quantity_consumed","sum"),
-                    total_surplus=("surplus","sum"))
-               .reindex(WEEKDAY_ORDER)
-               .fillna(0))
-        agg["days_count"] = counts
-        agg["avg_surplus_per_day"] = np.where(agg["days_count"]>0, agg["total_surplus"]/agg["days_count"], 0.0)
-        agg = agg.reset_index()
-        agg["day_of_week"] = agg["day_of_week"].astype(str)
-        return agg.to_dict(orient="records")
+        return list(self._rollups.weekday)
+
+    def rollup_json(self, name, top_n=None, encode=None):
+        """
+        Pre-serialized JSON (bytes) for "overall", "daily", "dishes" or
+        "weekday", encoded once per data version and encoder.
+
+        encode(data) -> bytes defaults to json.dumps with sorted keys and
+        (",", ":") separators plus a trailing newline. That is jsonify's
+        output only for an app with the default JSON provider outside debug
+        mode; api.py passes its app's encoder so the bytes always match.
+        """
+        if name not in ROLLUP_NAMES:
+            raise ValueError(f"Unknown rollup: {name}")
+        rollups = self._rollups
+        encode = encode or _compact_json
+        key = (name, top_n, encode)
+        body = rollups.json.get(key)
+        if body is None:
+            if name == "dishes":
+                data = rollups.dishes[:top_n] if top_n else rollups.dishes
+            else:
+                data = getattr(rollups, name)
+            body = encode(data)
+            rollups.json[key] = body
+        return body
+
+    # 4. threshold lookups
+    def _threshold_index(self):
+        """
+        Rows of self.df ordered by (date, surplus), partitioned by date:
+        (df, order, surplus in that order, partition dates, partition starts).
+        Rebuilt lazily the first time it's needed after a merge.
+        """
+        index = self._date_index
+        df = self.df
+        if index is None or index[0] is not df:
+            surplus = df["surplus"].to_numpy()
+            dates = df["date"].to_numpy()
+            order = np.lexsort((surplus, dates))
+            unique, starts = np.unique(dates[order], return_index=True)
+            index = (df, order, surplus[order], pd.DatetimeIndex(unique), np.append(starts, len(order)))
+            self._date_index = index
+        return index
+
+    @staticmethod
+    def _partition_hits(index, i, threshold_qty):
+        # binary search inside one date's rows (surplus ascending), returned highest surplus first
+        _, order, surplus, _, starts = index
+        lo, hi = starts[i], starts[i + 1]
+        first = lo + np.searchsorted(surplus[lo:hi], threshold_qty, side="left")
+        return order[first:hi][::-1]
+
+    def _threshold_records(self, index, partitions, threshold_qty):
+        hits = [self._partition_hits(index, i, threshold_qty) for i in partitions]
+        if not hits:
+            return []
+        return index[0].iloc[np.concatenate(hits)].to_dict(orient="records")
 
     def surplus_exceeds_threshold(self, date, threshold_qty):
         d = pd.to_datetime(date).normalize()
-        subset = self.df[self.df["date"] == d]
-        res = subset[subset["surplus"] >= threshold_qty].sort_values("surplus", ascending=False)
-        return res.to_dict(orient="records")
+        if self.df.empty:
+            return []
+        index = self._threshold_index()
+        dates = index[3]
+        i = dates.searchsorted(d)
+        if i == len(dates) or dates[i] != d:
+            return []
+        return self._threshold_records(index, [i], threshold_qty)
+
+    def surplus_exceeds_threshold_range(self, start, end, threshold_qty):
+        """Rows with surplus >= threshold for every date in [start, end], by date then surplus."""
+        start = pd.to_datetime(start).normalize()
+        end = pd.to_datetime(end).normalize()
+        if self.df.empty:
+            return []
+        index = self._threshold_index()
+        dates = index[3]
+        lo, hi = dates.searchsorted(start, side="left"), dates.searchsorted(end, side="right")
+        return self._threshold_records(index, range(lo, hi), threshold_qty)
+
+    def surplus_exceeds_threshold_batch(self, dates, threshold_qty):
+        """{"YYYY-MM-DD": rows} for each requested date."""
+        return {d.strftime("%Y-%m-%d"): self.surplus_exceeds_threshold(d, threshold_qty)
+                for d in (pd.to_datetime(x).normalize() for x in dates)}
 
     # ML export hook
     def get_dataset_for_ai(self):
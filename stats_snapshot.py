@@ -0,0 +1,131 @@
+# stats_snapshot.py
+"""
+Typed columnar snapshot of StatisticsService's preprocessed frame.
+
+Cold start of api.py is dominated by pd.read_csv, date parsing with the
+dayfirst fallback and dish_name normalization. The snapshot stores the
+already-aggregated (date, dish_name) frame as one .npy file per column, so a
+restart memory-maps a few binary arrays instead:
+
+    canteen_data.csv.snapshot/
+        meta.json          format version, source CSV offset + fingerprint, dtypes,
+                           dish_name categories
+        date.npy           datetime64
+        dish_code.npy      int32 codes into meta["dish_names"]
+        quantity_prepared.npy, quantity_consumed.npy, surplus.npy
+                           int32 when every value is a whole number that fits, else float64
+
+The snapshot remembers how far into the CSV it was built (byte offset plus a
+fingerprint of the bytes just before it). It's reused as long as the CSV
+still starts with those bytes; rows appended since are picked up with
+StatisticsService.refresh(). Parquet/Feather would need pyarrow, which isn't
+a dependency here; numpy's .npy format needs nothing extra and can be
+memory-mapped.
+"""
+import json
+import os
+import shutil
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+SNAPSHOT_FORMAT = 1
+QUANTITY_COLUMNS = ["quantity_prepared", "quantity_consumed", "surplus"]
+INT32_MAX = np.iinfo(np.int32).max
+
+
+def default_snapshot_dir(csv_path: str) -> str:
+    return csv_path + ".snapshot"
+
+
+def _compact_quantity(values: np.ndarray) -> np.ndarray:
+    # whole numbers within int32 range (the usual case for counts) are stored as int32
+    if len(values) and np.all(np.isfinite(values)) and np.all(values == np.round(values)) \
+            and np.abs(values).max() <= INT32_MAX:
+        return values.astype(np.int32)
+    return values.astype(np.float64)
+
+
+def save_snapshot(df: pd.DataFrame, snapshot_dir: str, offset: int, fingerprint: bytes,
+                  columns) -> None:
+    """Writes df (StatisticsService.df layout) atomically: readers see the old snapshot or the new one."""
+    codes, dish_names = pd.factorize(df["dish_name"], sort=True)
+    arrays = {
+        "date": df["date"].to_numpy(),
+        "dish_code": codes.astype(np.int32),
+    }
+    for col in QUANTITY_COLUMNS:
+        arrays[col] = _compact_quantity(df[col].to_numpy())
+    meta = {
+        "format": SNAPSHOT_FORMAT,
+        "rows": len(df),
+        "offset": offset,
+        "fingerprint": fingerprint.hex(),
+        "columns": list(columns),
+        "dish_names": [str(x) for x in dish_names],
+        "dtypes": {name: str(a.dtype) for name, a in arrays.items()},
+    }
+
+    tmp_dir = snapshot_dir + ".tmp"
+    old_dir = snapshot_dir + ".old"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    for name, values in arrays.items():
+        np.save(os.path.join(tmp_dir, f"{name}.npy"), values, allow_pickle=False)
+    # meta.json last: a directory without it is never treated as a snapshot
+    with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+        json.dump(meta, f)
+
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if os.path.exists(snapshot_dir):
+        os.rename(snapshot_dir, old_dir)
+    os.rename(tmp_dir, snapshot_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+
+def read_meta(snapshot_dir: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(os.path.join(snapshot_dir, "meta.json")) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return meta if meta.get("format") == SNAPSHOT_FORMAT else None
+
+
+def matches_source(meta: Dict[str, Any], csv_path: str) -> bool:
+    """True if the CSV still starts with the bytes the snapshot was built from."""
+    offset = meta["offset"]
+    fingerprint = bytes.fromhex(meta["fingerprint"])
+    try:
+        if os.path.getsize(csv_path) < offset:
+            return False
+        with open(csv_path, "rb") as f:
+            f.seek(offset - len(fingerprint))
+            return f.read(len(fingerprint)) == fingerprint
+    except OSError:
+        return False
+
+
+def load_snapshot(snapshot_dir: str, meta: Dict[str, Any], weekday_order) -> pd.DataFrame:
+    """Rebuilds the StatisticsService.df frame (same columns and dtypes as a CSV load)."""
+    arrays = {name: np.load(os.path.join(snapshot_dir, f"{name}.npy"), mmap_mode="r", allow_pickle=False)
+              for name in meta["dtypes"]}
+    # calendar fields are derived per distinct day, then broadcast
+    day_codes, days = pd.factorize(arrays["date"])
+    days = pd.DatetimeIndex(days)
+    dish_names = np.asarray(meta["dish_names"], dtype=object)
+    df = pd.DataFrame({
+        "date": np.asarray(arrays["date"]),
+        "dish_name": dish_names[arrays["dish_code"]],
+        "quantity_prepared": arrays["quantity_prepared"].astype(float),
+        "quantity_consumed": arrays["quantity_consumed"].astype(float),
+        "surplus": arrays["surplus"].astype(float),
+        "day_of_week": pd.Categorical.from_codes(days.dayofweek.to_numpy()[day_codes],
+                                                 categories=weekday_order, ordered=True),
+        "year": days.year.to_numpy()[day_codes],
+        "month": days.to_period("M").astype(str).to_numpy()[day_codes],
+    })
+    df["dish_name"] = df["dish_name"].astype(str)
+    df["month"] = df["month"].astype(str)
+    return df
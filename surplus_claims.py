@@ -0,0 +1,278 @@
+# surplus_claims.py
+"""
+Claiming surplus_listings for NGOs without double allocation.
+
+A listing moves AVAILABLE -> RESERVED -> CLAIMED, or back to AVAILABLE when
+the NGO releases it or the hold runs out. Every transition is one conditional
+UPDATE (WHERE status = <expected state>, plus the NGO for its own
+reservations). Whichever NGO's UPDATE reaches SQLite first changes the row;
+every later one matches nothing. No state is read first and written later, so
+there is no window in which two NGOs can both see AVAILABLE.
+
+    claims = SurplusClaims("foodiq.db", hold_seconds=900)
+    claims.start()                                  # expiry sweeper
+    r = claims.reserve("ngo-17", [41, 42, 43])      # r.claimed / r.unavailable
+    claims.confirm("ngo-17", r.claimed)             # pickup arranged
+    claims.release("ngo-17", [43])                  # not needed after all
+
+  - reserve() takes a batch in one statement (UPDATE ... WHERE id IN (...)
+    AND status = 'AVAILABLE' RETURNING id). By default it keeps whatever it
+    won. With all_or_nothing=True it rolls back unless it won every listing.
+  - A reservation holds until reserved_until (UTC, hold_seconds from now).
+    The sweeper thread puts expired ones back to AVAILABLE every
+    sweep_interval seconds. idx_surplus_listings_reservation on
+    (status, reserved_until) keeps that a range read over RESERVED rows only.
+  - Each call holds the pool's writer for one short transaction; a reserve
+    whose listings a reader already sees taken doesn't take it at all.
+
+surplus_listings gets claimed_by and reserved_until. The nearby_listings
+triggers take RESERVED/CLAIMED listings out of the map and put expired or
+released ones back.
+
+    python surplus_claims.py foodiq.db --sweep      # expire stale reservations once
+"""
+import argparse
+import logging
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+
+from db_pool import get_pool
+
+logger = logging.getLogger("Ironclad_POS")
+
+# new surplus_listings columns: name -> declaration
+CLAIM_COLUMNS = {
+    "claimed_by": "TEXT",
+    "reserved_until": "TEXT",
+}
+CLAIM_INDEX = """
+CREATE INDEX IF NOT EXISTS idx_surplus_listings_reservation ON surplus_listings (status, reserved_until)
+"""
+
+# transitions look rows up by id; "+status" keeps the planner off the reservation index
+RESERVE_SQL = """
+    UPDATE surplus_listings
+    SET status = 'RESERVED', claimed_by = ?, reserved_until = datetime('now', ?)
+    WHERE +status = 'AVAILABLE' AND id IN ({ids})
+    RETURNING id, reserved_until
+"""
+CONFIRM_SQL = """
+    UPDATE surplus_listings
+    SET status = 'CLAIMED', reserved_until = NULL
+    WHERE claimed_by = ? AND +status = 'RESERVED' AND reserved_until > datetime('now') AND id IN ({ids})
+    RETURNING id
+"""
+RELEASE_SQL = """
+    UPDATE surplus_listings
+    SET status = 'AVAILABLE', claimed_by = NULL, reserved_until = NULL
+    WHERE claimed_by = ? AND +status = 'RESERVED' AND id IN ({ids})
+    RETURNING id
+"""
+AVAILABLE_SQL = "SELECT id FROM surplus_listings WHERE +status = 'AVAILABLE' AND id IN ({ids})"
+SWEEP_SQL = """
+    UPDATE surplus_listings
+    SET status = 'AVAILABLE', claimed_by = NULL, reserved_until = NULL
+    WHERE status = 'RESERVED' AND reserved_until <= datetime('now')
+"""
+DEFAULT_HOLD_SECONDS = 15 * 60
+DEFAULT_SWEEP_INTERVAL = 30.0
+MAX_BATCH_CLAIM = 100
+
+
+class ClaimResult(NamedTuple):
+    claimed: List[int]
+    unavailable: List[int]      # already taken (or not ours), or unknown ids
+    reserved_until: Optional[str] = None
+
+
+def ensure_claim_schema(conn: sqlite3.Connection) -> None:
+    """Adds claimed_by / reserved_until and the reservation index (idempotent)."""
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' "
+                    "AND name = 'idx_surplus_listings_reservation'").fetchone():
+        return      # installed; don't queue for the write lock on every worker start
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        cols = {row[1] for row in conn.execute("PRAGMA table_info(surplus_listings)")}
+        for name, decl in CLAIM_COLUMNS.items():
+            if name not in cols:
+                conn.execute(f"ALTER TABLE surplus_listings ADD COLUMN {name} {decl}")
+        conn.execute(CLAIM_INDEX)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def _listing_ids(listing_ids: Iterable) -> List[int]:
+    try:
+        ids = list(dict.fromkeys(int(i) for i in listing_ids))
+    except (TypeError, ValueError):
+        raise ValueError("listing ids must be integers")
+    if not ids:
+        raise ValueError("no listing ids")
+    if len(ids) > MAX_BATCH_CLAIM:
+        raise ValueError(f"at most {MAX_BATCH_CLAIM} listings per request")
+    return ids
+
+
+def _transition(conn: sqlite3.Connection, sql: str, ids: List[int], params: list, all_or_nothing: bool = False) -> list:
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        rows = conn.execute(sql.format(ids=", ".join("?" * len(ids))), params + ids).fetchall()
+        if all_or_nothing and len(rows) < len(ids):
+            conn.rollback()
+            return []
+        conn.commit()
+        return rows
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def reserve(conn: sqlite3.Connection, ngo_id: str, listing_ids: Iterable, hold_seconds: int = DEFAULT_HOLD_SECONDS,
+            all_or_nothing: bool = False) -> ClaimResult:
+    """AVAILABLE -> RESERVED for ngo_id, until hold_seconds from now."""
+    ids = _listing_ids(listing_ids)
+    rows = _transition(conn, RESERVE_SQL, ids, [ngo_id, f"+{int(hold_seconds)} seconds"], all_or_nothing)
+    won = {listing_id for listing_id, _ in rows}
+    return ClaimResult([i for i in ids if i in won], [i for i in ids if i not in won], rows[0][1] if rows else None)
+
+
+def confirm(conn: sqlite3.Connection, ngo_id: str, listing_ids: Iterable) -> ClaimResult:
+    """RESERVED by ngo_id and not yet expired -> CLAIMED (no longer expires)."""
+    ids = _listing_ids(listing_ids)
+    won = {row[0] for row in _transition(conn, CONFIRM_SQL, ids, [ngo_id])}
+    return ClaimResult([i for i in ids if i in won], [i for i in ids if i not in won])
+
+
+def release(conn: sqlite3.Connection, ngo_id: str, listing_ids: Iterable) -> ClaimResult:
+    """RESERVED by ngo_id -> AVAILABLE."""
+    ids = _listing_ids(listing_ids)
+    won = {row[0] for row in _transition(conn, RELEASE_SQL, ids, [ngo_id])}
+    return ClaimResult([i for i in ids if i in won], [i for i in ids if i not in won])
+
+
+def sweep(conn: sqlite3.Connection) -> int:
+    """Puts expired reservations back to AVAILABLE; returns how many."""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        n = conn.execute(SWEEP_SQL).rowcount
+        conn.commit()
+        return n
+    except Exception:
+        conn.rollback()
+        raise
+
+
+class SurplusClaims:
+    """
+    Claim workflow on one foodiq.db plus the reservation sweeper thread.
+    Installs the claim columns on first use.
+    """
+
+    def __init__(self, db_path: str = "foodiq.db", hold_seconds: int = DEFAULT_HOLD_SECONDS,
+                 sweep_interval: float = DEFAULT_SWEEP_INTERVAL):
+        self.pool = get_pool(db_path)
+        self.hold_seconds = hold_seconds
+        self.sweep_interval = sweep_interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="reservation-sweeper", daemon=True)
+        self._started = False
+        self._start_lock = threading.Lock()
+        self._schema_ready = False
+        self.expired = 0
+        self.sweeps = 0
+        self.errors = 0
+
+    def _ensure_schema(self) -> None:
+        if self._schema_ready:
+            return
+        with self.pool.writer() as conn:
+            ensure_claim_schema(conn)
+        self._schema_ready = True
+
+    def start(self) -> None:
+        """Installs the schema (if needed) before returning, then starts the sweeper."""
+        with self._start_lock:
+            if not self._started:
+                self._ensure_schema()
+                self._thread.start()
+                self._started = True
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def reserve(self, ngo_id: str, listing_ids: Iterable, all_or_nothing: bool = False) -> ClaimResult:
+        """
+        Listings a reader already sees taken are turned down without queueing
+        for the writer: when dozens of NGOs race for one listing, the losers
+        never touch the write lock. The UPDATE stays conditional, so a stale
+        read can only cost a miss on a listing released in the meantime.
+        """
+        self._ensure_schema()
+        ids = _listing_ids(listing_ids)
+        with self.pool.reader() as conn:
+            open_ids = {row[0] for row in conn.execute(AVAILABLE_SQL.format(ids=", ".join("?" * len(ids))), ids)}
+        candidates = [i for i in ids if i in open_ids]
+        if not candidates or (all_or_nothing and len(candidates) < len(ids)):
+            return ClaimResult([], ids)
+        with self.pool.writer() as conn:
+            result = reserve(conn, ngo_id, candidates, self.hold_seconds, all_or_nothing)
+        return result._replace(unavailable=[i for i in ids if i not in result.claimed])
+
+    def confirm(self, ngo_id: str, listing_ids: Iterable) -> ClaimResult:
+        self._ensure_schema()
+        with self.pool.writer() as conn:
+            return confirm(conn, ngo_id, listing_ids)
+
+    def release(self, ngo_id: str, listing_ids: Iterable) -> ClaimResult:
+        self._ensure_schema()
+        with self.pool.writer() as conn:
+            return release(conn, ngo_id, listing_ids)
+
+    def sweep(self) -> int:
+        self._ensure_schema()
+        with self.pool.writer() as conn:
+            n = sweep(conn)
+        self.expired += n
+        self.sweeps += 1
+        return n
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.sweep_interval):
+            try:
+                n = self.sweep()
+                if n:
+                    logger.info(f"Expired {n} surplus reservations")
+            except Exception as e:
+                # the same rows are picked up on the next sweep
+                self.errors += 1
+                logger.error(f"Reservation sweep failed: {e}")
+
+    def metrics(self) -> Dict[str, Any]:
+        with self.pool.reader() as conn:
+            reserved = (conn.execute("SELECT COUNT(*) FROM surplus_listings WHERE status = 'RESERVED'").fetchone()[0]
+                        if self._schema_ready else None)
+        return {"reserved": reserved, "expired": self.expired, "sweeps": self.sweeps, "errors": self.errors}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Surplus listing reservations.")
+    parser.add_argument("db_path", nargs="?", default="foodiq.db")
+    parser.add_argument("--sweep", action="store_true", help="put expired reservations back to AVAILABLE")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db_path, isolation_level=None)
+    try:
+        ensure_claim_schema(conn)
+        if args.sweep:
+            print(f"expired {sweep(conn)} reservations")
+        for status, n in conn.execute("SELECT status, COUNT(*) FROM surplus_listings GROUP BY status ORDER BY status"):
+            print(f"{status}: {n}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
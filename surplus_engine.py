@@ -0,0 +1,383 @@
+# surplus_engine.py
+"""
+Automatic surplus detection for foodiq.db.
+
+threshold_configs (created by init_db.py, edited from the canteen manager
+page) holds one rule per item: warn_limit in kg and auto_notify. The engine
+compares per-item surplus (quantity_prepared - quantity_consumed) with every
+rule at once and upserts the hits as urgent surplus_listings for the NGO side.
+A listing is written when surplus > warn_limit and auto_notify is on.
+
+  - ThresholdIndex keeps the rules in memory as arrays keyed by the normalized
+    item name (strip + lower, like StatisticsService dish names). Triggers on
+    threshold_configs bump threshold_version in threshold_meta, so an edit by
+    any writer is picked up on the next evaluation for the cost of one indexed
+    read (same scheme as menu_catalog).
+  - A batch of (canteen_id, date, dish_name, surplus) rows is matched with one
+    index lookup and one vectorized comparison; no per-row Python.
+  - Hits are written in a single transaction with INSERT ... ON CONFLICT on
+    (surplus_date, canteen_id, item_name), so re-running an evaluation updates
+    the listing instead of duplicating it; hits whose listing already has the
+    same quantity are filtered out beforehand. Listings that are no longer
+    AVAILABLE (claimed, collected) are left alone.
+
+surplus_listings gets two columns for that key: canteen_id (0 for sources
+without canteens, e.g. the CSV StatisticsService) and surplus_date (NULL for
+listings reported by hand).
+
+    engine = SurplusEngine("foodiq.db", location=(19.1, 72.8))
+    engine.evaluate_statistics(svc, "2024-06-01")           # StatisticsService surplus
+    engine.evaluate_canteens("canteen.db", "2024-06-01")    # live daily_records, every canteen
+
+    python surplus_engine.py foodiq.db --canteen-db canteen.db --date 2024-06-01
+"""
+import argparse
+import sqlite3
+import threading
+import time
+from datetime import date, timedelta
+from itertools import repeat
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+
+from db_pool import get_pool
+from statistics_service import StatisticsService
+
+# new surplus_listings columns: name -> declaration
+LISTING_COLUMNS = {
+    "canteen_id": "INTEGER NOT NULL DEFAULT 0",
+    "surplus_date": "TEXT",
+}
+
+SURPLUS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS threshold_meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL DEFAULT 0
+);
+INSERT OR IGNORE INTO threshold_meta (key, value) VALUES ('threshold_version', 1);
+
+CREATE TRIGGER IF NOT EXISTS threshold_configs_version_insert AFTER INSERT ON threshold_configs
+BEGIN
+    UPDATE threshold_meta SET value = value + 1 WHERE key = 'threshold_version';
+END;
+
+CREATE TRIGGER IF NOT EXISTS threshold_configs_version_delete AFTER DELETE ON threshold_configs
+BEGIN
+    UPDATE threshold_meta SET value = value + 1 WHERE key = 'threshold_version';
+END;
+
+CREATE TRIGGER IF NOT EXISTS threshold_configs_version_update AFTER UPDATE ON threshold_configs
+BEGIN
+    UPDATE threshold_meta SET value = value + 1 WHERE key = 'threshold_version';
+END;
+
+-- one automatic listing per (day, canteen, item); hand-reported listings have no surplus_date
+CREATE UNIQUE INDEX IF NOT EXISTS idx_surplus_listings_source
+    ON surplus_listings (surplus_date, canteen_id, item_name) WHERE surplus_date IS NOT NULL;
+"""
+
+UPSERT_SQL = """
+    INSERT INTO surplus_listings (item_name, qty_kg, lat, lng, is_urgent, status, canteen_id, surplus_date)
+    VALUES (?, ?, ?, ?, 1, 'AVAILABLE', ?, ?)
+    ON CONFLICT (surplus_date, canteen_id, item_name) WHERE surplus_date IS NOT NULL DO UPDATE SET
+        qty_kg = excluded.qty_kg,
+        is_urgent = 1
+    WHERE surplus_listings.status = 'AVAILABLE' AND surplus_listings.qty_kg IS NOT excluded.qty_kg
+"""
+# per (canteen, day, dish) surplus, grouped on integer keys; dish names are mapped afterwards
+SURPLUS_SQL = """
+SELECT r.canteen_id, substr(r.date, 1, 10) AS day, r.dish_id,
+       TOTAL(r.quantity_prepared) - TOTAL(r.quantity_consumed) AS surplus
+FROM daily_records r
+JOIN dishes d ON d.dish_id = r.dish_id
+WHERE r.canteen_id IN ({ids}) AND r.date >= ? AND r.date < ?
+GROUP BY r.canteen_id, day, r.dish_id
+{having}
+"""
+BATCH_CANTEENS = 50         # canteens per daily_records query
+FRAME_COLUMNS = ["canteen_id", "date", "dish_name", "surplus"]
+
+
+def ensure_surplus_schema(conn) -> None:
+    """Adds the listing key columns, threshold_meta and the version triggers (idempotent)."""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        cols = {row[1] for row in conn.execute("PRAGMA table_info(surplus_listings)")}
+        for name, decl in LISTING_COLUMNS.items():
+            if name not in cols:
+                conn.execute(f"ALTER TABLE surplus_listings ADD COLUMN {name} {decl}")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    conn.executescript(SURPLUS_SCHEMA)
+
+
+def _normalize(names) -> pd.Index:
+    return pd.Index(names, dtype=object).astype(str).str.strip().str.lower()
+
+
+class Thresholds(NamedTuple):
+    version: int
+    names: pd.Index         # normalized item names, unique
+    items: np.ndarray       # item_name as configured (written to surplus_listings)
+    limits: np.ndarray      # warn_limit, float64
+    notify: np.ndarray      # auto_notify, bool
+
+
+class ThresholdIndex:
+    """In-memory copy of threshold_configs, reloaded when threshold_version moves."""
+
+    def __init__(self, pool):
+        self.pool = pool
+        self._lock = threading.Lock()
+        self._current: Optional[Thresholds] = None
+
+    @staticmethod
+    def _read_version(cur) -> int:
+        row = cur.execute("SELECT value FROM threshold_meta WHERE key = 'threshold_version'").fetchone()
+        return row[0] if row else 0
+
+    def _load(self) -> Thresholds:
+        with self.pool.reader() as conn:
+            cur = conn.cursor()
+            # same read transaction for the version and the rules
+            cur.execute("BEGIN")
+            version = self._read_version(cur)
+            rows = cur.execute("SELECT item_name, warn_limit, auto_notify FROM threshold_configs "
+                               "ORDER BY id").fetchall()
+        rules = pd.DataFrame(rows, columns=["item_name", "warn_limit", "auto_notify"])
+        rules["item_name"] = rules["item_name"].fillna("").astype(str).str.strip()
+        rules["key"] = _normalize(rules["item_name"])
+        rules["warn_limit"] = pd.to_numeric(rules["warn_limit"], errors="coerce")
+        # rules without a name or a numeric limit can't match anything
+        rules = rules[(rules["key"] != "") & rules["warn_limit"].notna()]
+        # names differing only in case/spacing: the newest rule wins
+        rules = rules.drop_duplicates("key", keep="last")
+        notify = pd.to_numeric(rules["auto_notify"], errors="coerce").fillna(1).to_numpy() != 0
+        return Thresholds(version, pd.Index(rules["key"]), rules["item_name"].to_numpy(),
+                          rules["warn_limit"].to_numpy(dtype=float), notify)
+
+    def current(self) -> Thresholds:
+        with self.pool.reader() as conn:
+            version = self._read_version(conn.cursor())
+        thresholds = self._current
+        if thresholds is None or thresholds.version != version:
+            with self._lock:
+                thresholds = self._current
+                if thresholds is None or thresholds.version != version:
+                    thresholds = self._current = self._load()
+        return thresholds
+
+
+class EvaluationReport(NamedTuple):
+    rows: int           # (canteen, date, item) surplus rows evaluated
+    matched: int        # rows with a threshold rule
+    hits: int           # surplus > warn_limit with auto_notify on
+    written: int        # listings inserted or updated
+    seconds: float
+
+
+class SurplusEngine:
+
+    def __init__(self, db_path: str = "foodiq.db", location: Optional[Tuple[float, float]] = None):
+        self.pool = get_pool(db_path)
+        self.location = location or (None, None)    # lat/lng stored on new listings
+        self.thresholds = ThresholdIndex(self.pool)
+        self._schema_ready = False
+
+    def _ensure_schema(self) -> None:
+        if self._schema_ready:
+            return
+        with self.pool.writer() as conn:
+            ensure_surplus_schema(conn)
+        self._schema_ready = True
+
+    def match(self, frame: pd.DataFrame, thresholds: Thresholds) -> Tuple[int, pd.DataFrame]:
+        """
+        Vectorized threshold check for one batch of FRAME_COLUMNS rows; returns
+        (rows with a rule, hits as canteen_id/surplus_date/item_name/qty_kg).
+        """
+        # look up each distinct spelling once, then broadcast to the rows
+        codes, spellings = pd.factorize(frame["dish_name"])
+        pos = thresholds.names.get_indexer(_normalize(spellings))[codes]
+        pos[codes < 0] = -1
+        has_rule = pos >= 0
+        pos = pos[has_rule]
+        surplus = frame["surplus"].to_numpy(dtype=float)[has_rule]
+        hit = (surplus > thresholds.limits[pos]) & thresholds.notify[pos]
+        rows = frame.iloc[np.flatnonzero(has_rule)[hit]]
+        codes, days = pd.factorize(rows["date"])
+        if isinstance(days, pd.DatetimeIndex):
+            days = days.strftime("%Y-%m-%d")
+        hits = pd.DataFrame({
+            "canteen_id": rows["canteen_id"].to_numpy(dtype=np.int64),
+            "surplus_date": np.asarray(days, dtype=object)[codes],
+            "item_name": thresholds.items[pos[hit]],
+            "qty_kg": surplus[hit],
+        })
+        return int(has_rule.sum()), hits
+
+    @staticmethod
+    def _changed(conn, hits: pd.DataFrame) -> pd.DataFrame:
+        """
+        Hits that would change surplus_listings: new (day, canteen, item) keys
+        and AVAILABLE listings with a different quantity. One range read of the
+        source index instead of an upsert probe per unchanged row.
+        """
+        key = ["surplus_date", "canteen_id", "item_name"]
+        rows = conn.execute("SELECT surplus_date, canteen_id, item_name, qty_kg, status FROM surplus_listings "
+                            "WHERE surplus_date >= ? AND surplus_date <= ?",
+                            (hits["surplus_date"].min(), hits["surplus_date"].max())).fetchall()
+        if not rows:
+            return hits
+        existing = pd.DataFrame(rows, columns=key + ["listed_qty", "status"])
+        merged = hits.merge(existing, how="left", on=key)
+        changed = merged["status"].isna() | ((merged["status"] == "AVAILABLE") & (merged["listed_qty"] != merged["qty_kg"]))
+        return hits[changed.to_numpy()]
+
+    def publish(self, hits: pd.DataFrame) -> int:
+        """Upserts the hits in one write transaction; returns the number of listings written."""
+        if hits.empty:
+            return 0
+        lat, lng = self.location
+        with self.pool.writer() as conn:
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                hits = self._changed(conn, hits)
+                n = len(hits)
+                params = zip(hits["item_name"].tolist(), hits["qty_kg"].tolist(), repeat(lat, n), repeat(lng, n),
+                             hits["canteen_id"].tolist(), hits["surplus_date"].tolist())
+                # the statement's own row count: total_changes would also count trigger writes
+                written = conn.executemany(UPSERT_SQL, params).rowcount
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        return written
+
+    def evaluate(self, batches: Iterable[pd.DataFrame], thresholds: Optional[Thresholds] = None) -> EvaluationReport:
+        """Matches every batch against one version of the thresholds, then publishes all hits at once."""
+        t0 = time.perf_counter()
+        self._ensure_schema()
+        thresholds = thresholds or self.thresholds.current()
+        rows = matched = 0
+        hits: List[pd.DataFrame] = []
+        for frame in batches:
+            if frame.empty:
+                continue
+            rows += len(frame)
+            n, batch_hits = self.match(frame, thresholds)
+            matched += n
+            hits.append(batch_hits)
+        hits = pd.concat(hits, ignore_index=True) if hits else pd.DataFrame()
+        written = self.publish(hits)
+        return EvaluationReport(rows, matched, len(hits), written, time.perf_counter() - t0)
+
+    def evaluate_statistics(self, svc, start, end=None, batch_rows: int = 100000) -> EvaluationReport:
+        """Evaluates StatisticsService surplus for the dates in [start, end] (a single day by default)."""
+        return self.evaluate(statistics_batches(svc, start, end, batch_rows))
+
+    def evaluate_canteens(self, canteen_db: str, start: str, end: Optional[str] = None,
+                          canteen_ids: Optional[Iterable[int]] = None,
+                          batch_canteens: int = BATCH_CANTEENS) -> EvaluationReport:
+        """Evaluates live canteen.db daily_records for [start, end] (a single day by default)."""
+        self._ensure_schema()
+        thresholds = self.thresholds.current()
+        batches = []
+        if thresholds.notify.any():
+            # rows at or below the lowest active limit can't hit anything: SQLite drops them
+            floor = float(thresholds.limits[thresholds.notify].min())
+            batches = canteen_batches(canteen_db, start, end, canteen_ids, batch_canteens, floor)
+        return self.evaluate(batches, thresholds)
+
+
+def statistics_batches(svc, start, end=None, batch_rows: int = 100000):
+    """FRAME_COLUMNS batches of svc.df rows dated in [start, end], canteen_id 0."""
+    start = pd.to_datetime(start).normalize()
+    end = pd.to_datetime(end).normalize() if end is not None else start
+    df = svc.df
+    if df.empty:
+        return
+    selected = df.loc[(df["date"] >= start) & (df["date"] <= end), ["date", "dish_name", "surplus"]]
+    for i in range(0, len(selected), batch_rows):
+        frame = selected.iloc[i:i + batch_rows]
+        yield frame.assign(canteen_id=0)[FRAME_COLUMNS]
+
+
+def canteen_batches(canteen_db: str, start: str, end: Optional[str] = None,
+                    canteen_ids: Optional[Iterable[int]] = None, batch_canteens: int = BATCH_CANTEENS,
+                    min_surplus: Optional[float] = None):
+    """
+    FRAME_COLUMNS batches from daily_records, batch_canteens canteens per query.
+    Each query is a range scan of the (canteen_id, date) index (see
+    canteen_source.ensure_indexes) already reduced to one row per (canteen,
+    day, dish) by SQLite, optionally only those with surplus > min_surplus.
+    Dates must be ISO YYYY-MM-DD, as in canteen_source.
+    """
+    next_day = (date.fromisoformat(str(end or start)[:10]) + timedelta(days=1)).isoformat()
+    conn = sqlite3.connect(f"file:{quote(canteen_db)}?mode=ro", uri=True)
+    try:
+        dishes = conn.execute("SELECT dish_id, dish_name FROM dishes").fetchall()
+        dish_ids = pd.Index([row[0] for row in dishes])
+        dish_codes, dish_names = pd.factorize(_normalize([row[1] for row in dishes]))
+        # dish rows that normalize to the same name are summed in pandas, so the
+        # HAVING shortcut would drop parts of a sum that does exceed the limit
+        merged_dishes = len(dish_names) < len(dishes)
+        if merged_dishes:
+            min_surplus = None
+        if canteen_ids is None:
+            canteen_ids = [row[0] for row in conn.execute("SELECT canteen_id FROM canteen ORDER BY canteen_id")]
+        canteen_ids = list(canteen_ids)
+        having = "HAVING surplus > ?" if min_surplus is not None else ""
+        for i in range(0, len(canteen_ids), batch_canteens):
+            ids = canteen_ids[i:i + batch_canteens]
+            sql = SURPLUS_SQL.format(ids=",".join("?" * len(ids)), having=having)
+            params = (*ids, str(start)[:10], next_day) + ((min_surplus,) if min_surplus is not None else ())
+            frame = pd.DataFrame(conn.execute(sql, params).fetchall(),
+                                 columns=["canteen_id", "date", "dish_id", "surplus"])
+            codes = dish_codes[dish_ids.get_indexer(frame["dish_id"])]
+            frame["dish_name"] = pd.Categorical.from_codes(codes, dish_names)
+            if merged_dishes:
+                frame = frame.groupby(["canteen_id", "date", "dish_name"], observed=True,
+                                      as_index=False)["surplus"].sum()
+            yield frame[FRAME_COLUMNS]
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate surplus against threshold_configs and publish urgent listings.")
+    parser.add_argument("db_path", nargs="?", default="foodiq.db")
+    parser.add_argument("--canteen-db", default="canteen.db", help="daily_records source (default: canteen.db)")
+    parser.add_argument("--csv", help="evaluate this StatisticsService CSV instead of --canteen-db")
+    parser.add_argument("--date", help="day to evaluate, YYYY-MM-DD (default: latest day in the source)")
+    parser.add_argument("--to", dest="end", help="last day of a range, YYYY-MM-DD")
+    parser.add_argument("--canteen", type=int, action="append", help="restrict to this canteen_id (repeatable)")
+    parser.add_argument("--lat", type=float)
+    parser.add_argument("--lng", type=float)
+    args = parser.parse_args()
+
+    engine = SurplusEngine(args.db_path, location=(args.lat, args.lng))
+    if args.csv:
+        svc = StatisticsService(args.csv)
+        day = args.date or (svc.df["date"].max() if not svc.df.empty else pd.Timestamp.today())
+        report = engine.evaluate_statistics(svc, day, args.end)
+    else:
+        day = args.date
+        if day is None:
+            conn = sqlite3.connect(args.canteen_db)
+            try:
+                day = (conn.execute("SELECT MAX(date) FROM daily_records").fetchone()[0] or "")[:10]
+            finally:
+                conn.close()
+        report = engine.evaluate_canteens(args.canteen_db, day, args.end, args.canteen)
+    print(f"{report.rows} rows, {report.matched} with a rule, {report.hits} over the limit, "
+          f"{report.written} listings written in {report.seconds:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# tests/conftest.py
+import os
+import sqlite3
+import sys
+
+import pytest
+
+# the modules under test live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# setup_db.py's tables, without its sample rows
+POS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS menu_items (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    price_in_paise INTEGER NOT NULL CHECK (price_in_paise >= 0),
+    category TEXT,
+    stock INTEGER NOT NULL DEFAULT 50 CHECK (stock >= 0),
+    is_available INTEGER DEFAULT 1
+);
+CREATE TABLE IF NOT EXISTS orders (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    order_uuid TEXT UNIQUE,
+    total_amount_in_paise INTEGER NOT NULL,
+    payment_mode TEXT NOT NULL,
+    order_status TEXT DEFAULT 'COMPLETED',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS order_items (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    order_id INTEGER NOT NULL,
+    menu_item_id INTEGER NOT NULL,
+    item_name TEXT NOT NULL,
+    quantity INTEGER NOT NULL CHECK (quantity > 0),
+    price_at_sale_in_paise INTEGER NOT NULL,
+    FOREIGN KEY(order_id) REFERENCES orders(id),
+    FOREIGN KEY(menu_item_id) REFERENCES menu_items(id)
+);
+"""
+# init_db.py's surplus_listings
+FOODIQ_SCHEMA = """
+CREATE TABLE IF NOT EXISTS surplus_listings (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    item_name TEXT,
+    qty_kg REAL,
+    lat REAL,
+    lng REAL,
+    is_urgent BOOLEAN DEFAULT 0,
+    status TEXT DEFAULT 'AVAILABLE',
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+"""
+MENU = [
+    (101, "Masala Dosa", 6000, "breakfast", 10),
+    (102, "Filter Coffee", 2000, "beverages", 2),
+    (103, "Veg Thali", 12000, "lunch", 5),
+]
+
+
+@pytest.fixture
+def pos_db(tmp_path):
+    """pos_system.db layout with three menu items (stock 10, 2 and 5)."""
+    path = str(tmp_path / "pos_system.db")
+    with sqlite3.connect(path) as conn:
+        conn.executescript(POS_SCHEMA)
+        conn.executemany("INSERT INTO menu_items (id, name, price_in_paise, category, stock) VALUES (?, ?, ?, ?, ?)",
+                         MENU)
+    return path
+
+
+@pytest.fixture
+def foodiq_db(tmp_path):
+    """foodiq.db surplus_listings with listings 1..5, all AVAILABLE."""
+    path = str(tmp_path / "foodiq.db")
+    with sqlite3.connect(path) as conn:
+        conn.executescript(FOODIQ_SCHEMA)
+        conn.executemany("INSERT INTO surplus_listings (item_name, qty_kg, lat, lng) VALUES (?, ?, ?, ?)",
+                         [(f"item-{i}", 2.5, 19.07, 72.88) for i in range(1, 6)])
+    return path
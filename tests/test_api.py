@@ -0,0 +1,42 @@
+# tests/test_api.py
+import importlib
+import sys
+
+import pytest
+from flask import jsonify
+
+from response_cache import cache
+
+
+@pytest.fixture
+def api(tmp_path, foodiq_db, monkeypatch):
+    """A fresh import of api.py over a small canteen CSV and foodiq_db."""
+    csv_path = tmp_path / "canteen_data.csv"
+    csv_path.write_text("date,dish_name,quantity_prepared,quantity_consumed\n"
+                        "2024-01-01,Dosa,40,31\n2024-01-01,Idli,30,27\n2024-01-02,Poha,20,12.5\n")
+    monkeypatch.setenv("CANTEEN_CSV", str(csv_path))
+    monkeypatch.setenv("FOODIQ_DB", foodiq_db)
+    monkeypatch.setenv("SURPLUS_CLAIM_SWEEPER", "0")
+    monkeypatch.delitem(sys.modules, "api", raising=False)
+    module = importlib.import_module("api")
+    cache.clear()
+    yield module
+    cache.clear()
+    sys.modules.pop("api", None)
+
+
+@pytest.mark.parametrize("debug", [False, True])
+def test_rollup_bodies_match_jsonify(api, debug):
+    api.app.debug = debug       # jsonify pretty-prints in debug mode
+    client = api.app.test_client()
+    expected = {
+        "/api/overall": api.svc.overall_summary(),
+        "/api/daily": api.svc.daily_stats(),
+        "/api/dishes": api.svc.dish_wise_stats(),
+        "/api/dishes?top=1": api.svc.dish_wise_stats(top_n=1),
+        "/api/weekday": api.svc.weekday_trends(),
+    }
+    for path, data in expected.items():
+        with api.app.app_context():
+            body = jsonify(data).get_data()
+        assert client.get(path).data == body, path
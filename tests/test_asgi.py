@@ -0,0 +1,57 @@
+# tests/test_asgi.py
+import importlib
+import sys
+
+import pytest
+from flask import Flask
+
+APP_MODULES = ("asgi", "Billing_app", "app", "api")
+
+
+@pytest.fixture
+def asgi(tmp_path, pos_db, foodiq_db, monkeypatch):
+    """A fresh import of asgi.py (and the three apps) over test databases."""
+    csv_path = tmp_path / "canteen_data.csv"
+    csv_path.write_text("date,dish_name,quantity_prepared,quantity_consumed\n2024-01-01,Dosa,40,31\n")
+    monkeypatch.setenv("POS_DB", pos_db)
+    monkeypatch.setenv("FOODIQ_DB", foodiq_db)
+    monkeypatch.setenv("CANTEEN_CSV", str(csv_path))
+    monkeypatch.setenv("SURPLUS_CLAIM_SWEEPER", "0")
+    for name in APP_MODULES:
+        monkeypatch.delitem(sys.modules, name, raising=False)
+    module = importlib.import_module("asgi")
+    yield module
+    module.application.shutdown()
+    sys.modules["Billing_app"].pool.close()
+    for name in APP_MODULES:
+        sys.modules.pop(name, None)
+
+
+def _app(name, *rules):
+    flask_app = Flask(name)
+    for rule in rules:
+        flask_app.add_url_rule(rule, rule, lambda **kwargs: "")
+    return flask_app
+
+
+@pytest.mark.parametrize("path, lane", [
+    ("/", "stats"), ("/health", "stats"), ("/api/business_stats", "stats"),
+    ("/api/menu", "pos"), ("/api/events", "events"), ("/api/overall", "canteen"), ("/api/listings/nearby", "canteen"),
+])
+def test_each_route_goes_to_its_app(asgi, path, lane):
+    assert asgi.application._lane_for(path, "GET").name == lane
+
+
+def test_route_collisions(asgi):
+    first = _app("first", "/", "/api/<name>")
+    second = _app("second", "/", "/api/overall", "/api/<name>", "/health")
+    assert sorted(asgi.route_collisions([("a", first, set()), ("b", second, set())])) == [
+        "/ (a and b)", "/api/<name> (a and b)", "/api/overall (a and b)", "/static/<path:filename> (a and b)"]
+    shadowed = {"/", "/api/<name>", "/api/overall", "/static/<path:filename>"}
+    assert asgi.route_collisions([("a", first, set()), ("b", second, shadowed)]) == []
+
+
+def test_startup_fails_on_an_unshadowed_collision(asgi, monkeypatch):
+    monkeypatch.setattr(asgi, "SHADOWED", {"stats": asgi.SHADOWED["stats"]})
+    with pytest.raises(RuntimeError, match=r"/ \(stats and canteen\)"):
+        asgi.build_application()
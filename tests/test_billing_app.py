@@ -0,0 +1,45 @@
+# tests/test_billing_app.py
+import importlib
+import sqlite3
+import sys
+
+import pytest
+
+
+@pytest.fixture
+def billing(pos_db, monkeypatch):
+    """A fresh import of Billing_app over pos_db."""
+    monkeypatch.setenv("POS_DB", pos_db)
+    monkeypatch.setenv("POS_SALES_PROJECTION", "1")
+    monkeypatch.delitem(sys.modules, "Billing_app", raising=False)
+    module = importlib.import_module("Billing_app")
+    yield module
+    module.pool.close()
+    sys.modules.pop("Billing_app", None)
+
+
+def _has_outbox(path):
+    with sqlite3.connect(path) as conn:
+        return conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'order_item_outbox'").fetchone() is not None
+
+
+def test_projector_starts_on_the_first_request_not_at_import(billing, pos_db):
+    assert not _has_outbox(pos_db)
+    client = billing.app.test_client()
+    resp = client.post("/api/checkout", json={"cart": [{"id": 101, "qty": 2}], "paymentMode": "UPI"})
+    assert resp.status_code == 201
+    assert _has_outbox(pos_db)
+
+    billing.projector.drain()
+    daily = client.get("/api/sales/daily").get_json()
+    assert [d["quantity"] for d in daily["days"]] == [2]
+    assert daily["projection"]["pending"] == 0
+
+
+def test_daily_sales_reports_a_failing_metrics_read(billing, monkeypatch):
+    def broken():
+        raise sqlite3.DatabaseError("disk I/O error")
+
+    monkeypatch.setattr(billing.projector, "metrics", broken)
+    resp = billing.app.test_client().get("/api/sales/daily")
+    assert resp.status_code == 500 and resp.get_json() == {"error": "System Error"}
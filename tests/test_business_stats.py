@@ -0,0 +1,131 @@
+# tests/test_business_stats.py
+import sqlite3
+from datetime import date
+
+import pytest
+
+from business_stats import (TRANSACTIONS_SCHEMA, BusinessStatsAggregator, StatsFilter, compute_business_stats,
+                            load_business_stats, load_expenses_from_db, load_transactions_from_db,
+                            range_business_stats)
+from business_summaries import ensure_summary_schema
+
+# (stored date, the day it means, item, category, price, cost, customer)
+MIXED_TRANSACTIONS = [
+    ("2024-01-05", date(2024, 1, 5), "Tea", "beverages", 20.0, 5.0, "Asha"),
+    ("13-01-2024", date(2024, 1, 13), "Dosa", "breakfast", 60.0, 25.0, "Ravi"),
+    ("2024/01/20", date(2024, 1, 20), "Thali", "lunch", 120.0, 70.0, "Asha"),
+    ("25-01-2024", date(2024, 1, 25), "Tea", "beverages", 20.0, 5.0, "Meera"),
+    ("2023/12/31", date(2023, 12, 31), "Thali", "lunch", 120.0, 70.0, "Ravi"),
+    ("15-02-2024", date(2024, 2, 15), "Dosa", "breakfast", 60.0, 25.0, "Meera"),
+    ("2024-02-01 09:30:00", date(2024, 2, 1), "Tea", "beverages", 20.0, 5.0, "Asha"),
+]
+MIXED_EXPENSES = [
+    ("2024-01-10", date(2024, 1, 10), 300.0),
+    ("28-01-2024", date(2024, 1, 28), 150.0),
+    ("2024/02/02", date(2024, 2, 2), 80.0),
+]
+EXPENSES_SCHEMA = "CREATE TABLE expenses (id INTEGER PRIMARY KEY AUTOINCREMENT, date TEXT NOT NULL, expense REAL NOT NULL)"
+
+
+@pytest.fixture
+def mixed_db(tmp_path):
+    """transactions/expenses whose dates mix ISO, DD-MM-YYYY and YYYY/MM/DD."""
+    path = str(tmp_path / "mixed.db")
+    with sqlite3.connect(path) as conn:
+        conn.execute(TRANSACTIONS_SCHEMA)
+        conn.execute(EXPENSES_SCHEMA)
+        conn.executemany("INSERT INTO transactions (date, item, category, price, cost, customer) VALUES (?, ?, ?, ?, ?, ?)",
+                         [(raw, *rest) for raw, _, *rest in MIXED_TRANSACTIONS])
+        conn.executemany("INSERT INTO expenses (date, expense) VALUES (?, ?)",
+                         [(raw, amount) for raw, _, amount in MIXED_EXPENSES])
+    return path
+
+
+def _expected(filters: StatsFilter):
+    """compute_business_stats over the rows in range, filtered in Python on the true dates."""
+    def in_range(d):
+        return (filters.start is None or d >= filters.start) and (filters.end is None or d <= filters.end)
+
+    rows = [{"date": d, "item": item, "category": category, "price": price, "cost": cost, "customer": customer}
+            for _, d, item, category, price, cost, customer in MIXED_TRANSACTIONS
+            if in_range(d) and filters.category in (None, category)]
+    expenses = [{"expense": amount} for _, d, amount in MIXED_EXPENSES if in_range(d)]
+    return compute_business_stats(rows, expenses)
+
+
+FILTERS = [
+    StatsFilter(date(2024, 1, 1), date(2024, 1, 31)),
+    StatsFilter(date(2024, 1, 13), date(2024, 2, 1)),
+    StatsFilter(start=date(2024, 1, 21)),
+    StatsFilter(end=date(2024, 1, 13)),
+    StatsFilter(date(2024, 1, 1), date(2024, 2, 29), category="beverages"),
+]
+
+
+@pytest.mark.parametrize("filters", FILTERS)
+def test_range_filter_on_mixed_date_formats_matches_python(mixed_db, filters):
+    assert range_business_stats(mixed_db, filters=filters) == _expected(filters)
+
+
+@pytest.mark.parametrize("filters", FILTERS)
+def test_summary_filter_on_mixed_date_formats_matches_python(mixed_db, filters):
+    with sqlite3.connect(mixed_db) as conn:
+        assert ensure_summary_schema(conn)
+    assert load_business_stats(mixed_db, filters=filters) == _expected(filters)
+
+
+def test_rows_appended_after_a_check_are_checked_too(mixed_db):
+    filters = StatsFilter(date(2024, 1, 1), date(2024, 1, 31))
+    with sqlite3.connect(mixed_db) as conn:
+        conn.execute("DELETE FROM transactions WHERE date NOT GLOB '[0-9][0-9][0-9][0-9]-*'")
+        conn.execute("DELETE FROM expenses WHERE date NOT GLOB '[0-9][0-9][0-9][0-9]-*'")
+    iso_only = range_business_stats(mixed_db, filters=filters)
+    assert iso_only["total_revenue"] == 20.0
+
+    with sqlite3.connect(mixed_db) as conn:
+        conn.execute("INSERT INTO transactions (date, item, category, price, cost, customer) "
+                     "VALUES ('18-01-2024', 'Dosa', 'breakfast', 60.0, 25.0, 'Ravi')")
+    assert range_business_stats(mixed_db, filters=filters)["total_revenue"] == 80.0
+
+
+# ---- BusinessStatsAggregator ----
+def _full_scan(db):
+    return compute_business_stats(load_transactions_from_db(db), load_expenses_from_db(db))
+
+
+def _insert(db, rows):
+    with sqlite3.connect(db) as conn:
+        conn.executemany("INSERT INTO transactions (date, item, category, price, cost, customer) VALUES (?, ?, ?, ?, ?, ?)",
+                         rows)
+
+
+def test_aggregator_folds_appended_rows(mixed_db):
+    agg = BusinessStatsAggregator(mixed_db)
+    assert agg.stats() == _full_scan(mixed_db)
+
+    _insert(mixed_db, [("2024-03-01", "Vada", "breakfast", 30.0, 10.0, "Ravi"),
+                       ("02-03-2024", "Tea", "beverages", 20.0, 5.0, "Nisha")])
+    with sqlite3.connect(mixed_db) as conn:
+        conn.execute("INSERT INTO expenses (date, expense) VALUES ('2024-03-01', 40.0)")
+    assert agg.stats() == _full_scan(mixed_db)
+    assert agg.stats()["total_revenue"] == sum(t[4] for t in MIXED_TRANSACTIONS) + 50.0
+
+
+def test_aggregator_rebuilds_after_the_table_is_recreated(mixed_db):
+    agg = BusinessStatsAggregator(mixed_db)
+    agg.stats()
+    with sqlite3.connect(mixed_db) as conn:
+        conn.execute("DROP TABLE transactions")
+        conn.execute(TRANSACTIONS_SCHEMA)
+    # fewer rows than the watermark
+    _insert(mixed_db, [("2024-01-05", "Idli", "breakfast", 40.0, 15.0, "Asha")])
+    assert agg.stats() == _full_scan(mixed_db)
+    assert agg.stats()["total_revenue"] == 40.0
+
+    with sqlite3.connect(mixed_db) as conn:
+        conn.execute("DROP TABLE transactions")
+        conn.execute(TRANSACTIONS_SCHEMA)
+    # same row count, different row at the watermark: only the fingerprint tells
+    _insert(mixed_db, [("2024-01-06", "Poha", "breakfast", 35.0, 12.0, "Meera")])
+    assert agg.stats() == _full_scan(mixed_db)
+    assert agg.stats()["total_revenue"] == 35.0
@@ -0,0 +1,89 @@
+# tests/test_business_summaries.py
+import sqlite3
+
+import pytest
+
+from business_stats import TRANSACTIONS_SCHEMA
+from business_summaries import SUMMARY_TABLES, check, ensure_summary_schema, rebuild
+
+EXPENSES_SCHEMA = "CREATE TABLE expenses (id INTEGER PRIMARY KEY AUTOINCREMENT, date TEXT NOT NULL, expense REAL NOT NULL)"
+TRANSACTIONS = [
+    ("2024-01-05", "Tea", "beverages", 20.0, 5.0, "Asha"),
+    ("2024-01-05", " Tea ", "beverages", 20.0, 5.0, None),
+    ("2024-01-06", "Dosa", "", 60.0, 25.0, "Ravi"),
+]
+
+
+def _installed(path):
+    conn = sqlite3.connect(path, isolation_level=None)
+    conn.execute(TRANSACTIONS_SCHEMA)
+    conn.execute(EXPENSES_SCHEMA)
+    conn.executemany("INSERT INTO transactions (date, item, category, price, cost, customer) VALUES (?, ?, ?, ?, ?, ?)",
+                     TRANSACTIONS)
+    assert ensure_summary_schema(conn)
+    assert not ensure_summary_schema(conn)      # idempotent
+    return conn
+
+
+def _assert_clean(conn):
+    report = check(conn)
+    assert set(report) == set(SUMMARY_TABLES)
+    assert all(r["missing"] == r["extra"] == r["different"] == 0 for r in report.values()), report
+
+
+def _summaries(conn):
+    return {table: sorted(conn.execute(f"SELECT * FROM {table}")) for table in SUMMARY_TABLES}
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = _installed(str(tmp_path / "pos.db"))
+    yield conn
+    conn.close()
+
+
+def test_install_fills_from_existing_rows(conn):
+    _assert_clean(conn)
+    assert conn.execute("SELECT item, revenue, lines FROM daily_item_sales WHERE day = '2024-01-05'").fetchall() == \
+        [("Tea", 40.0, 2)]
+    assert conn.execute("SELECT customer FROM daily_customer_spend ORDER BY customer").fetchall() == \
+        [("Anonymous",), ("Asha",), ("Ravi",)]
+
+
+def test_triggers_follow_inserts_updates_and_deletes(conn):
+    conn.execute("INSERT INTO transactions (date, item, category, price, cost, customer) "
+                 "VALUES ('2024-01-07', 'Thali', 'lunch', 120, 70, 'Meera')")
+    conn.execute("INSERT INTO expenses (date, expense) VALUES ('2024-01-05', 300), ('2024-01-06', 80)")
+    _assert_clean(conn)
+
+    # moves the row to another day / item / category / customer
+    conn.execute("UPDATE transactions SET date = '2024-01-06', item = 'Idli', category = NULL, customer = 'Ravi' "
+                 "WHERE id = 1")
+    conn.execute("UPDATE transactions SET price = price + 5 WHERE item = 'Dosa'")
+    conn.execute("UPDATE expenses SET date = '2024-01-06' WHERE date = '2024-01-05'")
+    _assert_clean(conn)
+
+    conn.execute("DELETE FROM transactions WHERE date = '2024-01-05'")
+    conn.execute("DELETE FROM expenses")
+    _assert_clean(conn)
+    assert conn.execute("SELECT COUNT(*) FROM daily_item_sales WHERE day = '2024-01-05'").fetchone()[0] == 0
+    assert conn.execute("SELECT COUNT(*) FROM daily_expenses").fetchone()[0] == 0
+
+    maintained = _summaries(conn)
+    rebuild(conn)
+    assert _summaries(conn) == maintained
+
+
+def test_check_reports_drift_and_rebuild_repairs_it(conn):
+    conn.execute("UPDATE daily_item_sales SET revenue = revenue + 1 WHERE item = 'Tea'")
+    conn.execute("DELETE FROM daily_customer_spend WHERE customer = 'Ravi'")
+    conn.execute("INSERT INTO daily_expenses (day, expense, lines) VALUES ('2024-02-01', 10, 1)")
+
+    report = check(conn)
+    assert report["daily_item_sales"]["different"] == 1
+    assert report["daily_item_sales"]["samples"] == [["2024-01-05", "Tea"]]
+    assert report["daily_customer_spend"]["missing"] == 1
+    assert report["daily_expenses"]["extra"] == 1
+
+    rebuild(conn)
+    _assert_clean(conn)
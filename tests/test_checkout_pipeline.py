@@ -0,0 +1,145 @@
+# tests/test_checkout_pipeline.py
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from checkout_pipeline import CartError, CheckoutError, GroupCommitWriter, apply_checkout, checkout, parse_cart
+from db_pool import ConnectionPool
+
+
+def _stock(path):
+    with sqlite3.connect(path) as conn:
+        return dict(conn.execute("SELECT id, stock FROM menu_items"))
+
+
+def _order_count(path):
+    with sqlite3.connect(path) as conn:
+        return conn.execute("SELECT COUNT(*) FROM orders").fetchone()[0]
+
+
+# ---- parse_cart ----
+def test_parse_cart_string_and_int_ids_are_the_same_item():
+    lines = parse_cart([{"id": "101", "qty": 1}, {"id": 101, "qty": "2"}, {"id": 103, "qty": 0}])
+    assert lines == [(101, 1), (101, 2)]
+
+
+@pytest.mark.parametrize("line", [{"id": "dosa", "qty": 1}, {"id": None, "qty": 1}, {"qty": 1}, {"id": 101}])
+def test_parse_cart_rejects_malformed_lines(line):
+    with pytest.raises(CartError):
+        parse_cart([line])
+
+
+# ---- apply_checkout ----
+def test_checkout_writes_order_lines_and_stock(pos_db):
+    conn = sqlite3.connect(pos_db)
+    result = checkout(conn, parse_cart([{"id": "101", "qty": 2}, {"id": 103, "qty": 1}]), "UPI")
+    conn.close()
+
+    assert result["total_paise"] == 2 * 6000 + 12000
+    assert result["stock"] == {101: 8, 103: 4}
+    assert _stock(pos_db) == {101: 8, 102: 2, 103: 4}
+    with sqlite3.connect(pos_db) as conn:
+        assert conn.execute("SELECT menu_item_id, quantity FROM order_items ORDER BY menu_item_id").fetchall() == \
+            [(101, 2), (103, 1)]
+
+
+def test_duplicate_lines_are_checked_against_stock_together(pos_db):
+    # "102" and 102 add up to 3 against a stock of 2
+    conn = sqlite3.connect(pos_db)
+    with pytest.raises(CheckoutError):
+        checkout(conn, parse_cart([{"id": "102", "qty": 2}, {"id": 102, "qty": 1}]), "CASH")
+    conn.close()
+    assert _stock(pos_db)[102] == 2
+
+
+def test_insufficient_stock_rolls_back_the_whole_order(pos_db):
+    conn = sqlite3.connect(pos_db)
+    with pytest.raises(CheckoutError, match="Only 2 left"):
+        checkout(conn, [(101, 3), (102, 5)], "UPI")
+    assert not conn.in_transaction
+    conn.close()
+
+    assert _stock(pos_db) == {101: 10, 102: 2, 103: 5}
+    assert _order_count(pos_db) == 0
+
+
+def test_unknown_item_is_rejected(pos_db):
+    conn = sqlite3.connect(pos_db)
+    with pytest.raises(CheckoutError, match="999"):
+        checkout(conn, [(101, 1), (999, 1)], "UPI")
+    conn.close()
+    assert _order_count(pos_db) == 0
+
+
+def test_apply_checkout_leaves_rollback_to_the_caller(pos_db):
+    conn = sqlite3.connect(pos_db)
+    conn.execute("BEGIN IMMEDIATE")
+    with pytest.raises(CheckoutError):
+        apply_checkout(conn, [(102, 3)], "UPI")
+    assert conn.in_transaction
+    conn.rollback()
+    conn.close()
+
+
+# ---- GroupCommitWriter ----
+def test_failing_order_does_not_affect_the_rest_of_its_batch(pos_db):
+    pool = ConnectionPool(pos_db)
+    orders = [[(101, 1)], [(102, 5)], [(103, 2)], [(101, 2), (103, 1)]]     # the second exceeds stock
+    # max_wait is generous so all four orders land in one batch
+    writer = GroupCommitWriter(pool.writer, max_batch=len(orders), max_wait=2.0)
+    start = threading.Barrier(len(orders))
+    outcomes = [None] * len(orders)
+
+    def terminal(i):
+        start.wait()
+        try:
+            outcomes[i] = writer.submit(orders[i], "UPI", timeout=10.0)
+        except CheckoutError as e:
+            outcomes[i] = e
+
+    threads = [threading.Thread(target=terminal, args=(i,)) for i in range(len(orders))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    pool.close()
+
+    assert writer.batches == 1 and writer.orders == len(orders)
+    assert isinstance(outcomes[1], CheckoutError)
+    committed = [outcomes[i] for i in (0, 2, 3)]
+    assert all(isinstance(r, dict) for r in committed)
+    assert len({r["orderId"] for r in committed}) == 3
+
+    assert _stock(pos_db) == {101: 7, 102: 2, 103: 2}
+    assert _order_count(pos_db) == 3
+    with sqlite3.connect(pos_db) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM order_items WHERE menu_item_id = 102").fetchone()[0] == 0
+
+
+def test_timeout_withdraws_queued_orders_but_waits_for_claimed_ones(pos_db):
+    pool = ConnectionPool(pos_db)
+    with pool.writer():
+        pass        # switch to WAL before the lock below is taken
+    blocker = sqlite3.connect(pos_db)
+    blocker.execute("BEGIN IMMEDIATE")      # the writer's batch waits on this lock
+    writer = GroupCommitWriter(pool.writer)
+    outcome = {}
+    claimed = threading.Thread(target=lambda: outcome.update(a=writer.submit([(101, 1)], "UPI", timeout=0.2)))
+    claimed.start()
+    time.sleep(0.1)     # order a is now in the blocked batch
+
+    with pytest.raises(CheckoutError, match="not saved"):
+        writer.submit([(103, 1)], "UPI", timeout=0.2)
+    blocker.rollback()
+    blocker.close()
+    claimed.join()
+    time.sleep(0.1)     # the writer has moved past the withdrawn order
+    pool.close()
+
+    # a timed out while its batch was blocked, but it committed and was reported as such
+    assert isinstance(outcome["a"], dict)
+    assert writer.orders == 1
+    assert _stock(pos_db) == {101: 9, 102: 2, 103: 5}
+    assert _order_count(pos_db) == 1
@@ -0,0 +1,48 @@
+# tests/test_event_feed.py
+import json
+
+from event_feed import EventBroker
+
+
+def _events(messages):
+    out = []
+    for message in messages:
+        lines = dict(line.split(": ", 1) for line in message.strip().splitlines())
+        out.append((lines["event"], json.loads(lines["data"])))
+    return out
+
+
+def _drain(sub):
+    return _events(sub.drain(timeout=0, coalesce=0))
+
+
+def test_out_of_order_pushes_never_send_stock_backwards():
+    sub = EventBroker().subscribe()
+    sub.push_stock({101: 8, 102: 1}, 5)
+    sub.push_stock({101: 9}, 4)             # committed before version 5, published after it
+    sub.push_stock({103: 4}, 3)             # older, but 103 has no newer level
+    assert _drain(sub) == [("stock", {"version": 5, "stock": {"101": 8, "102": 1, "103": 4}})]
+    assert sub.sent_stock_version == 5
+
+    sub.push_stock({101: 10}, 4)            # already superseded by what was sent
+    assert _drain(sub) == []
+    sub.push_stock({101: 7}, 6)
+    assert _drain(sub) == [("stock", {"version": 6, "stock": {"101": 7}})]
+
+
+def test_snapshot_covers_older_pending_levels():
+    sub = EventBroker().subscribe()
+    sub.push_stock({101: 8}, 5)
+    sub.push_stock({102: 1}, 8)
+    sub.sent_snapshot(6)        # full map at version 6 already includes 101's level
+    sub.push_stock({103: 2}, 6) # not newer than the snapshot
+    assert _drain(sub) == [("stock", {"version": 8, "stock": {"102": 1}})]
+    assert sub.sent_stock_version == 8
+
+
+def test_orders_overflow_into_a_resync():
+    broker = EventBroker(max_orders=2)
+    sub = broker.subscribe()
+    for order_id in range(1, 5):
+        broker.publish_order({"orderId": order_id})
+    assert _drain(sub) == [("resync", {"dropped": 2}), ("order", {"orderId": 3}), ("order", {"orderId": 4})]
@@ -0,0 +1,72 @@
+# tests/test_ingest_transactions.py
+import sqlite3
+
+import pytest
+
+import ingest_transactions
+from business_stats import TRANSACTIONS_SCHEMA, ensure_date_indexes
+from business_summaries import check, ensure_summary_schema
+from ingest_transactions import ingest
+
+
+def _rows(db):
+    with sqlite3.connect(db) as conn:
+        return conn.execute("SELECT date, item, category, price, cost, customer FROM transactions ORDER BY id").fetchall()
+
+
+def test_missing_columns_stay_empty_when_the_export_has_extra_columns(tmp_path):
+    csv_path = tmp_path / "export.csv"
+    csv_path.write_text("date,item,price,notes\n"
+                        "2024-01-01,Tea,10,paid late\n"
+                        "02-01-2024,Dosa,\"₹1,299.00\",\n"
+                        "2024/01/03,Thali,120\n")
+    db = str(tmp_path / "pos.db")
+
+    report = ingest(str(csv_path), db, processes=1)
+
+    assert report.rows == 3 and report.rejected == 0
+    assert _rows(db) == [
+        ("2024-01-01", "Tea", None, 10.0, 0.0, None),
+        ("2024-01-02", "Dosa", None, 1299.0, 0.0, None),
+        ("2024-01-03", "Thali", None, 120.0, 0.0, None),
+    ]
+
+
+def _objects(db):
+    with sqlite3.connect(db) as conn:
+        return {name for (name,) in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type IN ('index', 'trigger') AND tbl_name = 'transactions'")}
+
+
+def test_restart_after_an_interrupted_deferred_load_recreates_triggers_and_indexes(tmp_path, monkeypatch):
+    db = str(tmp_path / "pos.db")
+    with sqlite3.connect(db, isolation_level=None) as conn:
+        conn.execute(TRANSACTIONS_SCHEMA)
+        conn.execute("INSERT INTO transactions (date, item, category, price, cost, customer) "
+                     "VALUES ('2023-12-31', 'Tea', 'beverages', 20, 5, 'Asha')")
+        ensure_date_indexes(conn)
+        ensure_summary_schema(conn)
+    installed = _objects(db)
+    assert "idx_transactions_date" in installed and "transactions_summary_insert" in installed
+
+    csv_path = tmp_path / "export.csv"
+    csv_path.write_text("date,item,category,price,cost,customer\n" +
+                        "".join(f"2024-01-{d:02d},Dosa,breakfast,60,25,Ravi\n" for d in range(1, 21)))
+    monkeypatch.setattr(ingest_transactions, "DEFER_MIN_BYTES", 0)     # defer even a small load
+
+    def interrupt(rows, rate):
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        ingest(str(csv_path), db, chunk_rows=5, processes=1, progress=interrupt)
+    assert not installed & _objects(db)     # dropped for the load, not back yet
+
+    report = ingest(str(csv_path), db, chunk_rows=5, processes=1, restart=True)
+
+    assert report.resumed_from == 0 and report.rows == 20
+    assert _objects(db) == installed
+    with sqlite3.connect(db, isolation_level=None) as conn:
+        # the first chunk was loaded twice (rows from earlier runs stay); the summaries count both
+        assert conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0] == 1 + 5 + 20
+        report = check(conn)
+    assert all(r["missing"] == r["extra"] == r["different"] == 0 for r in report.values()), report
@@ -0,0 +1,85 @@
+# tests/test_nearby_listings.py
+import math
+import random
+import sqlite3
+
+import pytest
+
+from nearby_listings import EARTH_RADIUS_KM, ListingLocator, bounding_box, ensure_geo_schema, nearby
+
+CENTRE = (19.07, 72.88)
+
+
+def _haversine(lat1, lng1, lat2, lng2):
+    a = (math.sin(math.radians(lat2 - lat1) / 2) ** 2
+         + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(math.radians(lng2 - lng1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _brute_force(conn, lat, lng, radius_km, limit):
+    rows = conn.execute("SELECT id, lat, lng, is_urgent FROM surplus_listings "
+                        "WHERE status = 'AVAILABLE' AND lat IS NOT NULL AND lng IS NOT NULL").fetchall()
+    hits = [(-(u > 0), _haversine(lat, lng, a, b), i) for i, a, b, u in rows]
+    return [(i, d) for u, d, i in sorted(h for h in hits if h[1] <= radius_km)][:limit]
+
+
+@pytest.fixture
+def listings(foodiq_db):
+    """foodiq_db plus 3000 listings scattered up to ~60 km around CENTRE (some urgent, claimed or unplaced)."""
+    rng = random.Random(7)
+    rows = []
+    for n in range(3000):
+        lat = CENTRE[0] + rng.uniform(-0.5, 0.5) * rng.random()     # denser towards the centre
+        lng = CENTRE[1] + rng.uniform(-0.5, 0.5) * rng.random()
+        rows.append((f"dish-{n}", lat, lng, int(rng.random() < 0.1), "CLAIMED" if rng.random() < 0.2 else "AVAILABLE"))
+    rows.append(("no-location", None, None, 1, "AVAILABLE"))
+    conn = sqlite3.connect(foodiq_db, isolation_level=None)
+    conn.execute("BEGIN")
+    conn.executemany("INSERT INTO surplus_listings (item_name, lat, lng, is_urgent, status) VALUES (?, ?, ?, ?, ?)",
+                     rows)
+    conn.execute("COMMIT")
+    assert ensure_geo_schema(conn)
+    yield conn
+    conn.close()
+
+
+@pytest.mark.parametrize("radius_km, limit", [(0.5, 50), (2, 10), (10, 50), (10, 500), (80, 20), (80, 5000)])
+def test_nearby_matches_brute_force(listings, radius_km, limit):
+    for lat, lng in [CENTRE, (19.2, 72.7), (18.5, 73.4)]:
+        got = nearby(listings, lat, lng, radius_km, limit)
+        expected = _brute_force(listings, lat, lng, radius_km, limit)
+        assert [r["id"] for r in got] == [i for i, _ in expected]
+        assert [r["distance_km"] for r in got] == pytest.approx([d for _, d in expected])
+
+
+def test_triggers_keep_the_index_in_step(listings):
+    listings.execute("UPDATE surplus_listings SET status = 'CLAIMED' WHERE id IN (1, 2)")
+    listings.execute("UPDATE surplus_listings SET is_urgent = 1, lat = ?, lng = ? WHERE id = 5", CENTRE)
+    listings.execute("DELETE FROM surplus_listings WHERE id = 4")
+    for radius_km, limit in [(1, 5), (30, 200)]:
+        got = nearby(listings, *CENTRE, radius_km, limit)
+        assert [r["id"] for r in got] == [i for i, _ in _brute_force(listings, *CENTRE, radius_km, limit)]
+    assert 5 in [r["id"] for r in nearby(listings, *CENTRE, radius_km=0.1, limit=50) if r["is_urgent"]]
+
+
+def test_locator_installs_the_index_on_first_use(foodiq_db):
+    got = ListingLocator(foodiq_db).nearby(*CENTRE, radius_km=1, limit=2)
+    assert [r["id"] for r in got] == [1, 2] and got[0]["distance_km"] == 0.0
+
+
+def test_bounding_box_contains_the_circle():
+    for lat, lng, radius_km in [(19.07, 72.88, 10), (60.0, 10.0, 300), (-33.9, 151.2, 50)]:
+        min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, radius_km)
+        for bearing in range(0, 360, 5):
+            b = math.radians(bearing)
+            d = radius_km / EARTH_RADIUS_KM
+            p_lat = math.asin(math.sin(math.radians(lat)) * math.cos(d)
+                              + math.cos(math.radians(lat)) * math.sin(d) * math.cos(b))
+            p_lng = math.radians(lng) + math.atan2(math.sin(b) * math.sin(d) * math.cos(math.radians(lat)),
+                                                   math.cos(d) - math.sin(math.radians(lat)) * math.sin(p_lat))
+            # up to rounding: the R*Tree query widens the box anyway
+            assert min_lat - 1e-9 <= math.degrees(p_lat) <= max_lat + 1e-9
+            assert min_lng - 1e-9 <= math.degrees(p_lng) <= max_lng + 1e-9
+    assert bounding_box(89.9, 0.0, 50)[2:] == (-180.0, 180.0)
+    with pytest.raises(ValueError):
+        bounding_box(91.0, 0.0, 1)
@@ -0,0 +1,76 @@
+# tests/test_response_cache.py
+import sqlite3
+
+import pytest
+from flask import Flask, jsonify, request
+
+from response_cache import cache, cached_json, csv_source, invalidate_source, sqlite_source
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def _app(source, read):
+    app = Flask(__name__)
+    calls = []
+
+    @app.route("/api/data")
+    @cached_json(sources=[source])
+    def data():
+        calls.append(request.full_path)
+        return jsonify(read())
+
+    return app.test_client(), calls
+
+
+def _menu_count(path):
+    with sqlite3.connect(path) as conn:
+        return {"items": conn.execute("SELECT COUNT(*) FROM menu_items").fetchone()[0]}
+
+
+def test_hit_is_served_without_the_view_and_revalidates_with_304(pos_db):
+    client, calls = _app(sqlite_source(pos_db), lambda: _menu_count(pos_db))
+    first = client.get("/api/data")
+    assert first.status_code == 200 and first.get_json() == {"items": 3}
+    etag = first.headers["ETag"].strip('"')
+
+    again = client.get("/api/data")
+    assert again.data == first.data and again.headers["ETag"] == first.headers["ETag"]
+    not_modified = client.get("/api/data", headers={"If-None-Match": f'"{etag}"'})
+    assert not_modified.status_code == 304 and not_modified.data == b""
+    assert len(calls) == 1
+
+    # the query string is part of the key
+    client.get("/api/data?from=2024-01-01")
+    assert len(calls) == 2
+
+
+def test_commit_by_another_connection_invalidates(pos_db):
+    client, calls = _app(sqlite_source(pos_db), lambda: _menu_count(pos_db))
+    first = client.get("/api/data")
+    with sqlite3.connect(pos_db) as conn:
+        conn.execute("INSERT INTO menu_items (id, name, price_in_paise) VALUES (104, 'Vada', 3000)")
+
+    stale = client.get("/api/data", headers={"If-None-Match": first.headers["ETag"]})
+    assert stale.status_code == 200 and stale.get_json() == {"items": 4}
+    assert stale.headers["ETag"] != first.headers["ETag"]
+    assert len(calls) == 2
+
+
+def test_csv_rewrite_and_invalidate_source(tmp_path):
+    path = tmp_path / "canteen.csv"
+    path.write_text("date,item\n2024-01-01,Tea\n")
+    client, calls = _app(csv_source(str(path)), lambda: {"rows": len(path.read_text().splitlines()) - 1})
+    assert client.get("/api/data").get_json() == {"rows": 1}
+
+    path.write_text("date,item\n2024-01-01,Tea\n2024-01-02,Dosa\n")
+    assert client.get("/api/data").get_json() == {"rows": 2}
+    assert len(calls) == 2
+
+    invalidate_source(str(path))
+    client.get("/api/data")
+    assert len(calls) == 3
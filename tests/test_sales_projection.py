@@ -0,0 +1,98 @@
+# tests/test_sales_projection.py
+import sqlite3
+import threading
+
+import pytest
+
+from checkout_pipeline import CheckoutError, checkout
+from db_pool import ConnectionPool
+from sales_projection import SalesProjector, daily_sales, enqueue_backfill, ensure_projection_schema, project_batch
+
+
+def _connect(path):
+    return sqlite3.connect(path, isolation_level=None)
+
+
+def _sell(path, lines):
+    conn = sqlite3.connect(path)
+    try:
+        return checkout(conn, lines, "UPI")
+    finally:
+        conn.close()
+
+
+def _projected(path):
+    with _connect(path) as conn:
+        return (conn.execute("SELECT item, price FROM transactions ORDER BY id").fetchall(),
+                conn.execute("SELECT COUNT(*) FROM order_item_outbox").fetchone()[0])
+
+
+def test_capture_projects_committed_lines_only(pos_db):
+    _sell(pos_db, [(101, 1)])       # before capture: left to --backfill
+    with _connect(pos_db) as conn:
+        ensure_projection_schema(conn)
+        ensure_projection_schema(conn)      # idempotent
+
+    _sell(pos_db, [(101, 2), (103, 1)])
+    with pytest.raises(CheckoutError):
+        _sell(pos_db, [(103, 1), (102, 9)])  # rolled back: nothing captured
+    with _connect(pos_db) as conn:
+        assert project_batch(conn) == 2
+        assert project_batch(conn) == 0
+    assert _projected(pos_db) == ([("Masala Dosa", 120.0), ("Veg Thali", 120.0)], 0)
+
+    with _connect(pos_db) as conn:
+        assert enqueue_backfill(conn) == 1
+        assert enqueue_backfill(conn) == 0     # only once
+        assert project_batch(conn) == 1
+        days = daily_sales(conn)
+    assert len(days) == 1
+    assert days[0]["quantity"] == 4 and days[0]["revenue"] == 300.0 and days[0]["lines"] == 3
+
+
+def test_concurrent_consumers_project_each_line_exactly_once(pos_db):
+    with _connect(pos_db) as conn:
+        conn.execute("UPDATE menu_items SET stock = 1000")
+        ensure_projection_schema(conn)
+    for _ in range(40):
+        _sell(pos_db, [(101, 1), (102, 1)])
+
+    counts = []
+
+    def consumer():
+        conn = _connect(pos_db)
+        n = 0
+        while True:
+            batch = project_batch(conn, batch_size=3)
+            if not batch:
+                break
+            n += batch
+        conn.close()
+        counts.append(n)
+
+    threads = [threading.Thread(target=consumer) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert sum(counts) == 80
+    rows, pending = _projected(pos_db)
+    assert len(rows) == 80 and pending == 0
+    with _connect(pos_db) as conn:
+        assert conn.execute("SELECT SUM(quantity), SUM(revenue_in_paise), SUM(lines) FROM sales_daily").fetchone() == \
+            (80, 40 * (6000 + 2000), 80)
+
+
+def test_projector_drain_and_metrics(pos_db):
+    pool = ConnectionPool(pos_db)
+    projector = SalesProjector(pool, batch_size=2)
+    assert projector.metrics()["pending"] is None      # schema not installed yet
+    projector.drain()
+    for _ in range(3):
+        _sell(pos_db, [(103, 1)])
+    assert projector.metrics()["pending"] == 3
+
+    assert projector.drain() == 3
+    assert projector.metrics() == {"projected": 3, "batches": 2, "errors": 0, "pending": 0}
+    pool.close()
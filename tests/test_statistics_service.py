@@ -0,0 +1,72 @@
+# tests/test_statistics_service.py
+import pytest
+
+from statistics_service import ROLLUP_NAMES, StatisticsService
+
+HEADER = "date,dish_name,quantity_prepared,quantity_consumed\n"
+FIRST = [
+    ("2024-01-01", "Dosa", 40, 31), ("2024-01-01", "Idli", 30, 27), ("2024-01-02", "Dosa", 45, 40),
+    ("2024-01-03", "Poha", 20, 12), ("2024-01-06", "Idli", 35, 30),
+]
+# a late row for a (date, dish) already loaded, a new spelling of a known dish, new days and a new dish
+LATER = [
+    ("2024-01-02", "Dosa", 5, 5), ("2024-01-07", " idli ", 25, 24), ("2024-01-08", "Upma", 18, 11),
+    ("2024-01-08", "Dosa", 50, 44),
+]
+
+
+def _csv(rows):
+    return "".join(f"{d},{dish},{p},{c}\n" for d, dish, p, c in rows)
+
+
+def _results(svc):
+    return (svc.overall_summary(), svc.daily_stats(), svc.dish_wise_stats(), svc.weekday_trends(),
+            [svc.rollup_json(name) for name in ROLLUP_NAMES])
+
+
+@pytest.fixture
+def full(tmp_path):
+    path = tmp_path / "full.csv"
+    path.write_text(HEADER + _csv(FIRST + LATER))
+    return str(path)
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_append_matches_a_full_load(tmp_path, full, compact):
+    path = tmp_path / "canteen.csv"
+    path.write_text(HEADER + _csv(FIRST))
+    svc = StatisticsService(str(path), compact=compact)
+    expected_before = _results(svc)     # rollup_json is cached per data version
+
+    rows = [{"date": d, "dish_name": dish, "quantity_prepared": p, "quantity_consumed": c} for d, dish, p, c in LATER]
+    assert svc.append(rows) == len(LATER)
+
+    assert _results(svc) == _results(StatisticsService(full, compact=compact))
+    assert _results(svc) != expected_before
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_refresh_reads_only_complete_appended_lines(tmp_path, full, compact):
+    path = tmp_path / "canteen.csv"
+    path.write_text(HEADER + _csv(FIRST))
+    svc = StatisticsService(str(path), compact=compact)
+
+    *complete, last = LATER
+    with open(path, "a") as f:
+        f.write(_csv(complete) + _csv([last]).rstrip("\n"))   # last line still being written
+    assert svc.refresh() == len(complete)
+    with open(path, "a") as f:
+        f.write("\n")
+    assert svc.refresh() == 1
+
+    assert _results(svc) == _results(StatisticsService(full, compact=compact))
+
+
+def test_rewritten_csv_is_reloaded(tmp_path, full):
+    path = tmp_path / "canteen.csv"
+    path.write_text(HEADER + _csv(FIRST))
+    svc = StatisticsService(str(path))
+    path.write_text(HEADER + _csv(FIRST[:2] + LATER) + _csv(FIRST[2:]))     # same prefix length, new bytes
+
+    svc.refresh()
+    assert _results(svc) == _results(StatisticsService(full))
@@ -0,0 +1,61 @@
+# tests/test_surplus_claims.py
+import sqlite3
+import threading
+
+from surplus_claims import SurplusClaims
+
+
+def _listings(path):
+    with sqlite3.connect(path) as conn:
+        return {row[0]: row[1:] for row in conn.execute("SELECT id, status, claimed_by FROM surplus_listings")}
+
+
+def test_reserve_then_release(foodiq_db):
+    claims = SurplusClaims(foodiq_db)
+    r = claims.reserve("ngo-a", [1, 2])
+    assert r.claimed == [1, 2] and r.unavailable == [] and r.reserved_until
+
+    assert claims.reserve("ngo-b", ["2", 3]).claimed == [3]
+    assert claims.release("ngo-b", [2]).claimed == []       # not ngo-b's reservation
+    assert claims.release("ngo-a", [2]).claimed == [2]
+    assert _listings(foodiq_db)[2] == ("AVAILABLE", None)
+
+
+def test_two_ngos_racing_for_the_same_listings_exactly_one_wins(foodiq_db):
+    claims = SurplusClaims(foodiq_db)
+    wanted = [1, 2, 3]
+    for attempt in range(20):
+        start = threading.Barrier(2)
+        results = {}
+
+        def ngo(name):
+            start.wait()
+            results[name] = claims.reserve(name, wanted)
+
+        threads = [threading.Thread(target=ngo, args=(name,)) for name in ("ngo-a", "ngo-b")]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        winners = [name for name, r in results.items() if r.claimed]
+        assert len(winners) == 1, results
+        winner, loser = winners[0], next(name for name in results if name != winners[0])
+        assert results[winner].claimed == wanted
+        assert results[loser].claimed == [] and results[loser].unavailable == wanted
+        assert all(_listings(foodiq_db)[i] == ("RESERVED", winner) for i in wanted)
+
+        assert claims.release(winner, wanted).claimed == wanted
+
+
+def test_confirm_after_the_hold_expired_fails_even_before_the_sweep(foodiq_db):
+    claims = SurplusClaims(foodiq_db)
+    assert claims.reserve("ngo-a", [1, 2]).claimed == [1, 2]
+    with sqlite3.connect(foodiq_db) as conn:
+        conn.execute("UPDATE surplus_listings SET reserved_until = datetime('now', '-1 seconds') WHERE id = 2")
+
+    r = claims.confirm("ngo-a", [1, 2])
+    assert r.claimed == [1] and r.unavailable == [2]
+    assert _listings(foodiq_db)[1] == ("CLAIMED", "ngo-a")
+    assert claims.sweep() == 1
+    assert _listings(foodiq_db)[2] == ("AVAILABLE", None)
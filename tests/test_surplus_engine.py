@@ -0,0 +1,40 @@
+# tests/test_surplus_engine.py
+import sqlite3
+
+import pandas as pd
+
+from nearby_listings import ListingLocator
+from surplus_engine import SurplusEngine
+
+THRESHOLDS_SCHEMA = """
+CREATE TABLE threshold_configs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    item_name TEXT,
+    warn_limit REAL NOT NULL,
+    auto_notify BOOLEAN DEFAULT 1,
+    UNIQUE(item_name)
+)
+"""
+CANTEEN = (19.10, 72.85)
+
+
+def test_written_counts_listings_not_trigger_writes(foodiq_db):
+    with sqlite3.connect(foodiq_db) as conn:
+        conn.execute(THRESHOLDS_SCHEMA)
+        conn.executemany("INSERT INTO threshold_configs (item_name, warn_limit) VALUES (?, ?)",
+                         [("Rice", 5.0), ("Dal", 3.0)])
+    locator = ListingLocator(foodiq_db)
+    locator.nearby(*CANTEEN, 1)     # installs the listings_geo triggers on surplus_listings
+    engine = SurplusEngine(foodiq_db, location=CANTEEN)
+    frame = pd.DataFrame({"canteen_id": [1, 1, 2], "date": ["2024-06-01"] * 3,
+                          "dish_name": ["rice ", "Dal", "Rice"], "surplus": [8.0, 2.0, 6.5]})
+
+    report = engine.evaluate([frame])
+    assert (report.hits, report.written) == (2, 2)
+
+    frame.loc[2, "surplus"] = 7.0
+    assert engine.evaluate([frame]).written == 1        # only the listing whose quantity changed
+
+    # published listings carry the canteen's position, so the NGO map finds them
+    found = locator.nearby(*CANTEEN, 1)
+    assert sorted((row["item_name"], row["qty_kg"]) for row in found) == [("Rice", 7.0), ("Rice", 8.0)]